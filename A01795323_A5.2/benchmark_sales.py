@@ -0,0 +1,70 @@
+"""Measures the records per second of the sales total engines.
+
+The synthetic records are created in batches of a fixed size and each
+batch is given to every engine, so the memory used doesn't grow with the
+number of records and only the engines are timed.
+"""
+
+import os
+import random
+import sys
+import time
+
+import compute_sales
+import sales_report
+
+CATALOGUE_PATH = os.path.join(compute_sales.BASE_DIR, "data_source", "TC1",
+                              "TC1.ProductList.json")
+DEFAULT_RECORDS = 10_000_000
+RECORDS_BATCH_SIZE = 100_000
+ENGINES = (("per-record", compute_sales.get_total_cost),
+           ("vectorized", compute_sales.get_total_cost_vectorized))
+
+
+def create_synthetic_sales(titles, records, first_index=0):
+    """Creates a list of random sales records over the catalogue titles."""
+    products = titles + ["Elotes", "Frijoles"]
+    return [{"SALE_ID": index // 3,
+             "SALE_Date": f"{1 + index % 28:02d}/12/23",
+             "Product": random.choice(products),
+             "Quantity": random.randint(-2, 10)}
+            for index in range(first_index, first_index + records)]
+
+
+def generate_synthetic_batches(titles, records,
+                               batch_size=RECORDS_BATCH_SIZE):
+    """Yields the random sales records in lists of at most batch_size."""
+    for first_index in range(0, records, batch_size):
+        yield create_synthetic_sales(
+            titles, min(batch_size, records - first_index), first_index)
+
+
+def measure(engine, prices, sales):
+    """Runs an engine silently and returns its total and elapsed seconds."""
+    reporter = sales_report.SalesReporter("silent")
+    start_time = time.perf_counter()
+    total = engine(prices, sales, reporter)
+    return total, time.perf_counter() - start_time
+
+
+def main():
+    """Compares the per-record engine against the vectorized engine."""
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RECORDS
+    prices = compute_sales.get_prices_from_file(CATALOGUE_PATH)
+    totals = dict.fromkeys(dict(ENGINES), 0)
+    elapsed_times = dict.fromkeys(dict(ENGINES), 0.0)
+    for sales in generate_synthetic_batches(list(prices), records):
+        for name, engine in ENGINES:
+            total, elapsed_time = measure(engine, prices, sales)
+            totals[name] += total
+            elapsed_times[name] += elapsed_time
+    print(f"Benchmark over {records} synthetic sales records, "
+          f"in batches of {RECORDS_BATCH_SIZE}")
+    for name, _ in ENGINES:
+        speed = records / elapsed_times[name] if elapsed_times[name] else 0
+        print(f"{name:>12}: {speed:,.0f} records/s "
+              f"(total ${totals[name]:.2f})")
+
+
+if __name__ == '__main__':
+    main()
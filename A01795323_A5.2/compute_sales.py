@@ -1,30 +1,197 @@
 """This program calculates the total sales from a list in json format."""
 
+import codecs
+import importlib.util
+import itertools
 import json
+import multiprocessing
 import os
+import re
 import sys
 import time
+from collections import Counter
+from decimal import Decimal
+
+import price_cache
+import product_matcher
+import sales_report
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CODEC_PATH = os.path.join(BASE_DIR, os.pardir, "A01795323_A6.2", "models",
+                          "codec.py")
+CODEC_MODULE_NAME = "hotel_models_codec"
 OUTPUT_FILE_PATH = os.path.join(BASE_DIR, "SalesResults.txt")
+STREAM_CHUNK_SIZE = 1024 * 1024
+BATCH_SIZE = 65536
+MIN_SHARD_SIZE = 1024 * 1024
+SHARDS_PER_WORKER = 4
+RECORD_BOUNDARY = re.compile(rb"\}\s*,\s*(\{)")
+WHITESPACE = re.compile(r"\s*")
+VALUE_START_CHARACTERS = '{["-0123456789tfn'
+NUMBER_CHARACTERS = "0123456789.eE+-"
+# A decoding error this close to the end of the buffer may be a value cut
+# by the chunk boundary, like "-1." or "\\u00", so it is retried
+CUT_VALUE_MARGIN = 6
+
+
+def get_prices_from_file(file_path, use_cache=True, fuzzy=False):
+    """Get list of prices from a file in json format.
+
+    Unless disabled, the catalogue is compiled into a binary cache the first
+    time it is read, and later runs load the cache instead of the json.
+    With fuzzy enabled, misspelled product names resolve to their title.
+    """
+    prices = price_cache.load_price_cache(file_path) if use_cache else None
+    if prices is None:
+        file_content = read_json_file(file_path)
+        prices = convert_json_to_dict(file_content, "title")
+        if use_cache:
+            price_cache.write_price_cache(file_path, prices)
+    if fuzzy:
+        return product_matcher.FuzzyPriceCatalogue(prices)
+    return prices
 
 
-def get_prices_from_file(file_path):
-    """Get list of prices from a file in json format."""
-    file_content = read_json_file(file_path)
-    return convert_json_to_dict(file_content, "title")
+def get_codec():
+    """Gets the codec of the db files of the hotel models, or None.
+
+    It decodes json with orjson when it is installed, and also reads the
+    binary formats of the codec. The module is loaded from its file, so
+    sys.path is left as it is and no other "models" package is shadowed.
+    """
+    if CODEC_MODULE_NAME in sys.modules:
+        return sys.modules[CODEC_MODULE_NAME]
+    spec = importlib.util.spec_from_file_location(CODEC_MODULE_NAME,
+                                                  CODEC_PATH)
+    if spec is None or not os.path.isfile(CODEC_PATH):
+        return None
+    codec = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(codec)
+    except ImportError:
+        return None
+    sys.modules[CODEC_MODULE_NAME] = codec
+    return codec
 
 
 def read_json_file(file_path):
-    """Reads a file in json format."""
+    """Reads a file in json format, or a format of the shared codec."""
+    codec = get_codec()
     try:
-        with open(file_path, 'r', encoding="UTF-8") as json_file:
-            return json.load(json_file)
+        with open(file_path, 'rb') as json_file:
+            data = json_file.read()
+        return json.loads(data) if codec is None else codec.decode(data)
     except ValueError:
         print(f"Decoding JSON file {file_path} has failed")
         sys.exit(1)
 
 
+def read_json_stream(file_path, start=0, end=None):
+    """Yields the records of a json array file one at a time.
+
+    A byte range from split_file_in_shards only has the opening "[" if it
+    starts the file and the closing "]" if it ends it.
+    """
+    try:
+        ends_array = end is None or end >= os.path.getsize(file_path)
+        yield from parse_json_records(read_file_chunks(file_path, start, end),
+                                      starts_array=start == 0,
+                                      ends_array=ends_array)
+    except OSError:
+        print(f"Reading file {file_path} has failed")
+        sys.exit(1)
+    except ValueError:
+        print(f"Decoding JSON file {file_path} has failed")
+        sys.exit(1)
+
+
+def read_file_chunks(file_path, start=0, end=None,
+                     chunk_size=STREAM_CHUNK_SIZE):
+    """Yields the decoded text of a file byte range in chunks."""
+    decoder = codecs.getincrementaldecoder("UTF-8")()
+    try:
+        with open(file_path, 'rb') as file:
+            file.seek(start)
+            remaining = end - start if end is not None else None
+            while remaining is None or remaining > 0:
+                size = chunk_size if remaining is None \
+                    else min(chunk_size, remaining)
+                data = file.read(size)
+                if not data:
+                    break
+                if remaining is not None:
+                    remaining -= len(data)
+                yield decoder.decode(data)
+            yield decoder.decode(b"", final=True)
+    except (FileNotFoundError, PermissionError):
+        print(f"Reading file {file_path} has failed")
+        sys.exit(1)
+
+
+def parse_json_records(chunks, starts_array=True, ends_array=True):
+    """Incrementally decodes the values of a top-level json array.
+
+    Only the record being decoded and the unread tail of the current chunk
+    are kept in memory, so the memory used does not depend on the file size.
+    The array grammar is checked as json.load does, raising ValueError on a
+    missing bracket or separator, or on data after the array. Without the
+    start or the end of the array, the data must start with a value or end
+    with a separator instead.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    offset = 0
+    # Expected next: "[", the "first" value or "]", a "value", a
+    # "separator" ("," or "]"), or only whitespace at the "end"
+    state = "[" if starts_array else "value"
+    for chunk in itertools.chain(chunks, [None]):
+        is_last_chunk = chunk is None
+        buffer += chunk or ""
+        position = WHITESPACE.match(buffer).end()
+        while position < len(buffer):
+            character = buffer[position]
+            if state == "[" and character == "[":
+                state = "first"
+            elif state == "separator" and character == ",":
+                state = "value"
+            elif state in ("first", "separator") and character == "]":
+                state = "end"
+            elif state in ("first", "value") and \
+                    character in VALUE_START_CHARACTERS:
+                try:
+                    record, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError as error:
+                    if is_last_chunk or \
+                            error.pos < len(buffer) - CUT_VALUE_MARGIN and \
+                            not error.msg.startswith("Unterminated string"):
+                        raise ValueError(f"Invalid value at "
+                                         f"{offset + error.pos}") from error
+                    break
+                if not is_last_chunk and (end == len(buffer) or (
+                        end >= len(buffer) - CUT_VALUE_MARGIN
+                        and buffer[end] in NUMBER_CHARACTERS)):
+                    # A number or literal may go on in the next chunk
+                    break
+                yield record
+                state = "separator"
+                position = end
+            else:
+                raise ValueError(f"Unexpected {character!r} at "
+                                 f"{offset + position}")
+            if state != "separator":
+                position += 1
+            position = WHITESPACE.match(buffer, position).end()
+        offset += position
+        buffer = buffer[position:]
+    if state != ("end" if ends_array else "value"):
+        raise ValueError(f"Unexpected end of data in state {state!r}")
+
+
 def convert_json_to_dict(json_content, key):
     """Converts a json object to a dictionary."""
     response = {}
@@ -47,39 +214,291 @@ def get_file_path(filename):
         path = f"{main_directory}/TC2/{filename}"
     elif "TC3" in filename:
         path = f"{main_directory}/TC3/{filename}"
+    else:
+        path = filename
     return path
 
 
 def read_filename_from_params(index):
     """Reads a file name by index from the command-line arguments."""
-    if len(sys.argv) != 3:
+    return read_filenames_from_params()[index - 1]
+
+
+def read_filenames_from_params():
+    """Reads all the file names provided in the command-line arguments."""
+    file_names = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(file_names) < 2:
         print("Invalid program call"
               "\nExample of usage: "
-              "python compute_sales.py priceCatalogue.json salesRecord.json")
+              "python compute_sales.py priceCatalogue.json salesRecord.json"
+              " [moreSales.json ...] [--stream] [--vectorized] [--workers=N]"
+              " [--no-cache] [--fuzzy] [--report=silent|summary|detailed]"
+              " [--details=details.jsonl|details.csv]")
         sys.exit(1)
-    return sys.argv[index]
+    return file_names
+
+
+def read_flag_from_params(flag_name):
+    """Checks if an optional --flag was provided in the command-line."""
+    return f"--{flag_name}" in sys.argv[1:]
+
+
+def read_option_from_params(option_name, default=None):
+    """Reads the value of an optional --option=value command-line argument."""
+    prefix = f"--{option_name}="
+    for arg in sys.argv[1:]:
+        if arg.startswith(prefix):
+            return arg[len(prefix):]
+    return default
+
+
+def read_sales_records(file_path, stream=False):
+    """Reads the sales records of a file, streaming them if requested."""
+    if stream:
+        return read_json_stream(file_path)
+    return read_json_file(file_path)
+
+
+def split_file_in_shards(file_path, shard_size):
+    """Splits a json array file in byte ranges starting at a record.
+
+    Sales records are flat objects, so a record starts at the first "{"
+    that follows a "}," separator after the approximate shard offset.
+    """
+    file_size = os.path.getsize(file_path)
+    boundaries = [0]
+    with open(file_path, 'rb') as file:
+        while boundaries[-1] + shard_size < file_size:
+            boundary = find_record_boundary(file, boundaries[-1] + shard_size)
+            if boundary is None:
+                break
+            boundaries.append(boundary)
+    boundaries.append(file_size)
+    return [(file_path, start, end)
+            for start, end in zip(boundaries, boundaries[1:])]
+
+
+def find_record_boundary(file, offset):
+    """Finds the offset of the first record starting after a given offset."""
+    file.seek(offset)
+    tail = b""
+    while data := file.read(STREAM_CHUNK_SIZE):
+        block = tail + data
+        match = RECORD_BOUNDARY.search(block)
+        if match:
+            return offset - len(tail) + match.start(1)
+        offset += len(data)
+        tail = block[-64:]
+    return None
+
+
+def evaluate_sale(prices, sale):
+    """Returns the quantity, product and price of a sale without printing.
 
+    Any of the returned values is False when the sale is not valid.
+    """
+    if not isinstance(sale, dict):
+        return False, False, False
+    qty = process_qty(sale.get("Quantity"))
+    product = sale.get("Product") or False
+    price_record = prices.get(product) if isinstance(product, str) else None
+    price = process_price(price_record.get("price") if price_record else None)
+    return qty, product, price
 
-def get_total_cost(prices, sales):
+
+_shard_state = {}
+
+
+def init_shard_worker(prices_file_path, catalogue_options,
+                      keep_details=False):
+    """Loads the price catalogue once in each worker process.
+
+    With keep_details, the workers also return the outcome of each sale.
+    """
+    _shard_state["prices"] = get_prices_from_file(prices_file_path,
+                                                  **catalogue_options)
+    _shard_state["keep_details"] = keep_details
+
+
+def compute_shard_quantities(shard):
+    """Sums the quantity sold per product within a shard of a sales file.
+
+    Quantities are integers, so partial results from different shards
+    can be merged exactly in any order. The details are the (is valid,
+    quantity, product, price) of each sale, when the worker keeps them.
+    """
+    file_path, start, end = shard
+    quantities = Counter()
+    valid_count = 0
+    invalid_count = 0
+    details = []
+    for sale in read_json_stream(file_path, start, end):
+        qty, product, price = evaluate_sale(_shard_state["prices"], sale)
+        is_valid = bool(qty and product and price)
+        if is_valid:
+            quantities[product] += qty
+            valid_count += 1
+        else:
+            invalid_count += 1
+        if _shard_state.get("keep_details"):
+            details.append((is_valid, qty, product, price))
+    return quantities, valid_count, invalid_count, details
+
+
+def get_total_cost_parallel(prices_file_path, sales_file_paths, workers,
+                            reporter, catalogue_options=None):
+    """Calculates the total cost of many sales files with a process pool
+
+    The catalogue options are the keyword arguments of get_prices_from_file.
+    """
+    catalogue_options = catalogue_options or {}
+    prices = get_prices_from_file(prices_file_path, **catalogue_options)
+    total_size = sum(os.path.getsize(path) for path in sales_file_paths)
+    shard_size = max(MIN_SHARD_SIZE,
+                     total_size // (workers * SHARDS_PER_WORKER) + 1)
+    shards = [shard for path in sales_file_paths
+              for shard in split_file_in_shards(path, shard_size)]
+    quantities = Counter()
+    keep_details = reporter.keeps_details
+    with multiprocessing.Pool(workers, initializer=init_shard_worker,
+                              initargs=(prices_file_path, catalogue_options,
+                                        keep_details)) as pool:
+        # The details are reported in the order of the sales in the files
+        results = pool.imap(compute_shard_quantities, shards) \
+            if keep_details \
+            else pool.imap_unordered(compute_shard_quantities, shards)
+        for result in results:
+            quantities.update(result[0])
+            report_shard_result(result, reporter)
+    total = sum((Decimal(qty) * Decimal(str(prices[product]["price"]))
+                 for product, qty in quantities.items()), Decimal(0))
+    reporter.record_note(f"Processed {len(shards)} shards with {workers} "
+                         f"workers, {sum(quantities.values())} units sold")
+    return total
+
+
+def report_shard_result(result, reporter):
+    """Records the counts or details returned by a shard worker."""
+    _, valid_count, invalid_count, details = result
+    if not reporter.keeps_details:
+        reporter.record_valid_sales(valid_count)
+        reporter.record_invalid_sales(invalid_count)
+        return
+    for is_valid, qty, product, price in details:
+        if is_valid:
+            reporter.record_sale(qty, product, price)
+        else:
+            reporter.record_invalid(qty, product, price)
+
+
+def get_total_cost(prices, sales, reporter=None):
     """Calculates the total cost of sales"""
+    owns_reporter = reporter is None
+    if owns_reporter:
+        reporter = sales_report.SalesReporter()
     total = 0
-    print("::Details of sales::\n")
     for sale in sales:
-        qty = process_qty(validate_field(sale, "Quantity"))
-        product = validate_field(sale, "Product")
-        price_record = validate_field(prices, product)
-        price = process_price(validate_field(price_record, "price"))
+        qty = process_qty(validate_field(sale, "Quantity", reporter))
+        product = validate_field(sale, "Product", reporter)
+        price_record = validate_field(prices, product, reporter)
+        price = process_price(validate_field(price_record, "price", reporter))
         if qty and product and price:
-            print(f"Compute Qty: {qty} of product: \"{product}\" "
-                  f"at price: ${price}")
+            reporter.record_sale(qty, product, price)
             total += (qty * price)
         else:
-            print(f"Invalid record: Qty = {qty}, Price = {price}, "
-                  f"Product: {product}")
-    print("\n")
+            reporter.record_invalid(qty, product, price)
+    if owns_reporter:
+        reporter.close()
     return total
 
 
+def build_price_table(prices):
+    """Builds an array of prices indexed by the code of each product title.
+
+    The last position of the table holds NaN, so the code -1 used for
+    products missing in the catalogue resolves to an invalid price.
+    """
+    if isinstance(prices, product_matcher.FuzzyPriceCatalogue):
+        title_codes, table = build_price_table(prices.catalogue)
+        return product_matcher.ResolvedTitleCodes(title_codes, prices), table
+    if isinstance(prices, price_cache.PriceCatalogue):
+        table = np.append(np.frombuffer(prices.price_array), np.nan)
+        table[table == 0] = np.nan
+        return prices.title_codes, table
+    title_codes = {}
+    table = []
+    for title, price_record in prices.items():
+        price = price_record.get("price") if price_record else None
+        title_codes[title] = len(table)
+        table.append(float(price) if price else np.nan)
+    table.append(np.nan)
+    return title_codes, np.array(table, dtype=np.float64)
+
+
+def convert_sales_to_columns(sales, title_codes):
+    """Converts a batch of sales records into product code and qty columns."""
+    records = [sale if isinstance(sale, dict) else {} for sale in sales]
+    product_codes = np.fromiter(
+        (title_codes.get(sale.get("Product"), -1) for sale in records),
+        dtype=np.intp, count=len(records))
+    quantities = np.fromiter(
+        (process_qty(sale.get("Quantity")) or 0 for sale in records),
+        dtype=np.int64, count=len(records))
+    return product_codes, quantities
+
+
+def compute_batch_total(price_table, product_codes, quantities):
+    """Computes the total of a batch and the mask of its invalid records."""
+    batch_prices = price_table[product_codes]
+    invalid_mask = (quantities == 0) | np.isnan(batch_prices)
+    batch_prices[invalid_mask] = 0.0
+    return float(np.dot(quantities, batch_prices)), invalid_mask
+
+
+def get_total_cost_vectorized(prices, sales, reporter=None,
+                              batch_size=BATCH_SIZE):
+    """Calculates the total cost of sales in columnar batches with numpy"""
+    if np is None:
+        print("The numpy package is required to use --vectorized")
+        sys.exit(1)
+    owns_reporter = reporter is None
+    if owns_reporter:
+        reporter = sales_report.SalesReporter()
+    title_codes, price_table = build_price_table(prices)
+    total = 0.0
+    sales = iter(sales)
+    while batch := list(itertools.islice(sales, batch_size)):
+        product_codes, quantities = convert_sales_to_columns(batch,
+                                                             title_codes)
+        batch_total, invalid_mask = compute_batch_total(
+            price_table, product_codes, quantities)
+        total += batch_total
+        report_batch(reporter, batch, quantities, price_table[product_codes],
+                     invalid_mask)
+    if owns_reporter:
+        reporter.close()
+    return total
+
+
+def report_batch(reporter, batch, quantities, batch_prices, invalid_mask):
+    """Reports the valid and invalid records of a batch."""
+    if not reporter.keeps_details:
+        reporter.record_valid_sales(len(batch) -
+                                    int(np.count_nonzero(invalid_mask)))
+    for position, sale in enumerate(batch):
+        if not invalid_mask[position] and not reporter.keeps_details:
+            continue
+        product = sale.get("Product", False) if isinstance(sale, dict) \
+            else False
+        price = float(batch_prices[position])
+        qty = int(quantities[position])
+        if invalid_mask[position]:
+            reporter.record_invalid(qty or False, product,
+                                    False if np.isnan(price) else price)
+        else:
+            reporter.record_sale(qty, product, price)
+
+
 def process_qty(qty):
     """Returns a valid quantity of int type"""
     if not qty:
@@ -104,33 +523,72 @@ def create_file_with_results(filename, results):
         sys.exit(1)
 
 
-def validate_field(obj, field_name):
+def validate_field(obj, field_name, reporter=None):
     """Validates that a dictionary contains a given key"""
     if not obj:
-        print("Error: Dictionary provided doesn't exist")
+        report_error("Dictionary provided doesn't exist", reporter)
         return False
     if field_name in obj:
         return obj[field_name]
 
-    print(f"Error: {field_name} not found in Dictionary")
+    report_error(f"{field_name} not found in Dictionary", reporter)
     return False
 
 
+def report_error(message, reporter=None):
+    """Reports a validation error through the reporter or the console"""
+    if reporter is None:
+        print(f"Error: {message}")
+    else:
+        reporter.record_error(message)
+
+
 def main():
     """Main method to orchestrate reading, calculation and output of sales"""
     start_time = time.time()
-    prices_file_name = read_filename_from_params(1)
-    sales_file_name = read_filename_from_params(2)
-    prices = get_prices_from_file(get_file_path(prices_file_name))
-    sales = read_json_file(get_file_path(sales_file_name))
-    total_cost = get_total_cost(prices, sales)
+    prices_file_path = get_file_path(read_filename_from_params(1))
+    sales_file_paths = [get_file_path(file_name)
+                        for file_name in read_filenames_from_params()[1:]]
+    reporter = create_reporter_from_params()
+    catalogue_options = {"use_cache": not read_flag_from_params("no-cache"),
+                         "fuzzy": read_flag_from_params("fuzzy")}
+    workers = int(read_option_from_params("workers", 0))
+    if workers > 0:
+        total_cost = get_total_cost_parallel(prices_file_path,
+                                             sales_file_paths, workers,
+                                             reporter, catalogue_options)
+    else:
+        prices = get_prices_from_file(prices_file_path, **catalogue_options)
+        stream = read_flag_from_params("stream")
+        sales = itertools.chain.from_iterable(
+            read_sales_records(path, stream) for path in sales_file_paths)
+        if read_flag_from_params("vectorized"):
+            total_cost = get_total_cost_vectorized(prices, sales, reporter)
+        else:
+            total_cost = get_total_cost(prices, sales, reporter)
+        if catalogue_options["fuzzy"]:
+            reporter.record_note(f"Resolved {len(prices.resolved)} "
+                                 f"misspelled product names")
+    reporter.close()
     elapsed_time = time.time() - start_time
     sales_results = (f"Total cost for all sales: ${total_cost:.2f}"
                      f"\nElapsed Time: {elapsed_time:.8f} seconds")
 
-    print(sales_results)
     create_file_with_results(OUTPUT_FILE_PATH, sales_results)
-    print(f"Results exported to file {OUTPUT_FILE_PATH}")
+    if reporter.level != "silent":
+        print(sales_results)
+        print(f"Results exported to file {OUTPUT_FILE_PATH}")
+
+
+def create_reporter_from_params():
+    """Creates the sales reporter from the --report and --details options."""
+    level = read_option_from_params("report", "detailed")
+    if level not in sales_report.REPORT_LEVELS:
+        print(f"Invalid report level {level}, use one of: "
+              f"{', '.join(sales_report.REPORT_LEVELS)}")
+        sys.exit(1)
+    return sales_report.SalesReporter(level,
+                                      read_option_from_params("details"))
 
 
 if __name__ == '__main__':
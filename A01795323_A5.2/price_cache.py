@@ -0,0 +1,126 @@
+"""Compiled binary cache of a price catalogue in json format.
+
+The cache stores a table with each product title once and a packed
+float64 array of prices next to the source catalogue. Warm runs memory-map
+the cache instead of decoding the json file, and the cache is discarded
+when the mtime, size and content hash no longer match the source file.
+The cache is only mapped for reading, a cache with an old mtime but the
+same content is written again to a new file that replaces it.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+
+CACHE_EXTENSION = ".pricecache"
+MAGIC = b"PRICECAT"
+VERSION = 1
+HEADER = struct.Struct("<8sIIqq32sQQ")
+TITLE_SEPARATOR = "\0"
+
+
+class PriceCatalogue(Mapping):
+    """Read-only title to price record mapping backed by a cache file"""
+
+    def __init__(self, titles, price_array):
+        self.title_codes = dict(zip(titles, range(len(titles))))
+        self.price_array = price_array
+
+    def __getitem__(self, title):
+        price = self.price_array[self.title_codes[title]]
+        if math.isnan(price):
+            return {"title": title}
+        return {"title": title, "price": price}
+
+    def __contains__(self, title):
+        return title in self.title_codes
+
+    def __iter__(self):
+        return iter(self.title_codes)
+
+    def __len__(self):
+        return len(self.title_codes)
+
+
+def get_cache_path(source_path):
+    """Gets the path of the cache file of a catalogue."""
+    return source_path + CACHE_EXTENSION
+
+
+def get_file_digest(file_path):
+    """Computes the sha256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        while data := file.read(1024 * 1024):
+            digest.update(data)
+    return digest.digest()
+
+
+def load_price_cache(source_path):
+    """Loads the cache of a catalogue, or None if it is missing or stale."""
+    cache_path = get_cache_path(source_path)
+    try:
+        source_stat = os.stat(source_path)
+        with open(cache_path, 'rb') as cache_file:
+            cache = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(cache) < HEADER.size:
+        return None
+    (magic, version, _, mtime_ns, size, digest,
+     count, titles_size) = HEADER.unpack_from(cache)
+    if magic != MAGIC or version != VERSION or size != source_stat.st_size \
+            or len(cache) != HEADER.size + 8 * count + titles_size:
+        return None
+    if mtime_ns != source_stat.st_mtime_ns \
+            and get_file_digest(source_path) != digest:
+        return None
+    titles_start = HEADER.size + 8 * count
+    titles = cache[titles_start:].decode("UTF-8")
+    catalogue = PriceCatalogue(
+        titles.split(TITLE_SEPARATOR) if count else [],
+        memoryview(cache)[HEADER.size:titles_start].cast('d'))
+    if mtime_ns != source_stat.st_mtime_ns:
+        write_price_cache(source_path, catalogue)
+    return catalogue
+
+
+def write_price_cache(source_path, prices):
+    """Compiles a title to price record dictionary into a cache file."""
+    titles = list(prices)
+    if any(not isinstance(title, str) or TITLE_SEPARATOR in title
+           for title in titles):
+        return False
+    price_values = [get_price_value(prices[title]) for title in titles]
+    titles_blob = TITLE_SEPARATOR.join(titles).encode("UTF-8")
+    cache_path = get_cache_path(source_path)
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        source_stat = os.stat(source_path)
+        header = HEADER.pack(MAGIC, VERSION, 0, source_stat.st_mtime_ns,
+                             source_stat.st_size,
+                             get_file_digest(source_path),
+                             len(titles), len(titles_blob))
+        with open(temp_path, 'wb') as cache_file:
+            cache_file.write(header)
+            cache_file.write(struct.pack(f"<{len(price_values)}d",
+                                         *price_values))
+            cache_file.write(titles_blob)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+    return True
+
+
+def get_price_value(price_record):
+    """Returns the price of a catalogue record as float, or NaN if absent."""
+    price = price_record.get("price") if price_record else None
+    try:
+        return float(price)
+    except (TypeError, ValueError):
+        return math.nan
@@ -0,0 +1,156 @@
+"""This module matches misspelled product names against the catalogue titles.
+
+Titles are first looked up by a normalized key (case, whitespace and accent
+folding). Names that still don't match are corrected word by word with a
+deletion index over the words of the catalogue titles, so a lookup costs a
+few dictionary reads instead of a scan of the whole catalogue. Resolved
+names are kept in an LRU cache.
+"""
+
+import functools
+import itertools
+import unicodedata
+from collections.abc import Mapping
+
+DEFAULT_CACHE_SIZE = 65536
+MAX_WORD_CANDIDATES = 3
+SHORT_WORD_LENGTH = 4
+
+
+def normalize_title(title):
+    """Folds case, accents and whitespace of a product title."""
+    decomposed = unicodedata.normalize("NFKD", title)
+    without_accents = "".join(c for c in decomposed
+                              if not unicodedata.combining(c))
+    return " ".join(without_accents.casefold().split())
+
+
+def get_deletes(word):
+    """Gets the variants of a word with one character removed."""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def get_edit_distance(source, target):
+    """Computes the optimal string alignment distance between two words."""
+    row = list(range(len(target) + 1))
+    previous_row = row
+    for i, source_char in enumerate(source, 1):
+        two_rows_back, previous_row = previous_row, row
+        row = [i] + [0] * len(target)
+        for j, target_char in enumerate(target, 1):
+            cost = 0 if source_char == target_char else 1
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1,
+                         previous_row[j - 1] + cost)
+            if i > 1 and j > 1 and source_char == target[j - 2] \
+                    and source[i - 2] == target_char:
+                row[j] = min(row[j], two_rows_back[j - 2] + 1)
+    return row[-1]
+
+
+def get_max_distance(word):
+    """Gets the number of typos tolerated in a word by its length."""
+    return 1 if len(word) <= SHORT_WORD_LENGTH else 2
+
+
+class ProductMatcher:
+    """Resolves product names to catalogue titles"""
+
+    def __init__(self, titles, cache_size=DEFAULT_CACHE_SIZE):
+        self.normalized_index = {}
+        self.words = set()
+        self.deletes_index = {}
+        for title in titles:
+            normalized = normalize_title(title)
+            self.normalized_index.setdefault(normalized, title)
+            self.words.update(normalized.split())
+        for word in self.words:
+            for variant in get_deletes(word):
+                self.deletes_index.setdefault(variant, []).append(word)
+        self.find_title = functools.lru_cache(maxsize=cache_size)(
+            self._find_title)
+
+    def _find_title(self, product):
+        """Finds the catalogue title of a product name, or None."""
+        normalized = normalize_title(product)
+        title = self.normalized_index.get(normalized)
+        if title is not None:
+            return title
+        word_candidates = [self.get_word_candidates(word)
+                           for word in normalized.split()]
+        combinations = sorted(
+            itertools.product(*word_candidates),
+            key=lambda words: sum(distance for distance, _ in words))
+        for words in combinations:
+            title = self.normalized_index.get(
+                " ".join(word for _, word in words))
+            if title is not None:
+                return title
+        return None
+
+    def get_word_candidates(self, word):
+        """Gets the closest catalogue words to a word with their distance."""
+        candidates = set(self.deletes_index.get(word, ()))
+        if word in self.words:
+            candidates.add(word)
+        for variant in get_deletes(word):
+            if variant in self.words:
+                candidates.add(variant)
+            candidates.update(self.deletes_index.get(variant, ()))
+        max_distance = get_max_distance(word)
+        scored = [(get_edit_distance(word, candidate), candidate)
+                  for candidate in candidates]
+        return sorted(candidate for candidate in scored
+                      if candidate[0] <= max_distance)[:MAX_WORD_CANDIDATES]
+
+    def get_stats(self):
+        """Gets the hits and misses of the resolved names cache."""
+        cache_info = self.find_title.cache_info()
+        return {"hits": cache_info.hits, "misses": cache_info.misses,
+                "cached": cache_info.currsize}
+
+
+class FuzzyPriceCatalogue(Mapping):
+    """Price catalogue that resolves misspelled product names"""
+
+    def __init__(self, catalogue, matcher=None):
+        self.catalogue = catalogue
+        self.matcher = matcher or ProductMatcher(catalogue)
+        self.resolved = set()
+
+    def resolve(self, product):
+        """Gets the catalogue title of a product name, or None."""
+        if not isinstance(product, str):
+            return None
+        if product in self.catalogue:
+            return product
+        title = self.matcher.find_title(product)
+        if title is not None:
+            self.resolved.add(product)
+        return title
+
+    def __getitem__(self, product):
+        title = self.resolve(product)
+        if title is None:
+            raise KeyError(product)
+        return self.catalogue[title]
+
+    def __contains__(self, product):
+        return self.resolve(product) is not None
+
+    def __iter__(self):
+        return iter(self.catalogue)
+
+    def __len__(self):
+        return len(self.catalogue)
+
+
+class ResolvedTitleCodes(dict):
+    """Title to code dictionary that resolves misspelled product names"""
+
+    def __init__(self, title_codes, catalogue):
+        super().__init__(title_codes)
+        self.catalogue = catalogue
+
+    def get(self, key, default=None):
+        title = self.catalogue.resolve(key)
+        return default if title is None else self[title]
@@ -0,0 +1,160 @@
+"""This module contains the reporting layer used while computing sales.
+
+Instead of printing every processed record, the reporter keeps counters
+and buffers the details in memory, writing them in bulk chunks to the
+console or to a JSON Lines / CSV detail file depending on the report level.
+"""
+
+import csv
+import json
+import sys
+from collections import Counter
+
+REPORT_LEVELS = ("silent", "summary", "detailed")
+DETAIL_CHUNK_SIZE = 10000
+DETAIL_FIELDS = ("status", "quantity", "product", "price", "message")
+
+
+class ConsoleDetailSink:
+    """Writes chunks of sale details to the console as text"""
+
+    def __init__(self):
+        self.has_header = False
+
+    def write(self, details):
+        """Writes a chunk of details."""
+        lines = [] if self.has_header else ["::Details of sales::\n\n"]
+        self.has_header = True
+        for status, qty, product, price, message in details:
+            if status == "valid":
+                lines.append(f"Compute Qty: {qty} of product: \"{product}\" "
+                             f"at price: ${price}\n")
+            elif status == "invalid":
+                lines.append(f"Invalid record: Qty = {qty}, Price = {price}, "
+                             f"Product: {product}\n")
+            else:
+                lines.append(f"Error: {message}\n")
+        sys.stdout.write("".join(lines))
+
+    def close(self):
+        """Ends the details section."""
+        if self.has_header:
+            sys.stdout.write("\n\n")
+
+
+class FileDetailSink:
+    """Writes chunks of sale details to a JSON Lines or CSV file"""
+
+    def __init__(self, detail_path):
+        self.detail_path = detail_path
+        self.is_csv = detail_path.endswith(".csv")
+        self.is_started = False
+
+    def write(self, details):
+        """Appends a chunk of details, creating the file on the first one."""
+        try:
+            with open(self.detail_path, 'a' if self.is_started else 'w',
+                      encoding="UTF-8", newline="") as detail_file:
+                if self.is_csv:
+                    writer = csv.writer(detail_file)
+                    if not self.is_started:
+                        writer.writerow(DETAIL_FIELDS)
+                    writer.writerows(details)
+                else:
+                    detail_file.write("".join(
+                        json.dumps(dict(zip(DETAIL_FIELDS, detail))) + "\n"
+                        for detail in details))
+        except OSError as e:
+            print(f"Error writing the details file: {e.strerror}")
+            sys.exit(1)
+        self.is_started = True
+
+    def close(self):
+        """Creates the details file even if there were no details."""
+        if not self.is_started:
+            self.write([])
+
+
+class SalesReporter:
+    """Collects the outcome of each sale and reports it by level"""
+
+    def __init__(self, level="detailed", detail_path=None):
+        if level not in REPORT_LEVELS:
+            raise ValueError(f"Invalid report level {level}")
+        self.level = level
+        self.sink = None
+        if detail_path is not None:
+            self.sink = FileDetailSink(detail_path)
+        elif level == "detailed":
+            self.sink = ConsoleDetailSink()
+        self.counts = Counter()
+        self.errors = Counter()
+        self.notes = []
+        self._details = []
+
+    @property
+    def keeps_details(self):
+        """Tells if the details of each sale are collected."""
+        return self.sink is not None
+
+    def record_sale(self, qty, product, price):
+        """Records a sale included in the total."""
+        self.counts["valid"] += 1
+        if self.sink is not None:
+            self._add_detail(("valid", qty, product, price, None))
+
+    def record_valid_sales(self, count):
+        """Records several sales included in the total without details."""
+        self.counts["valid"] += count
+
+    def record_invalid(self, qty, product, price):
+        """Records a sale excluded from the total."""
+        self.counts["invalid"] += 1
+        if self.sink is not None:
+            self._add_detail(("invalid", qty, product, price, None))
+
+    def record_invalid_sales(self, count):
+        """Records several sales excluded from the total without details."""
+        self.counts["invalid"] += count
+
+    def record_error(self, message):
+        """Records a validation error found while processing a sale."""
+        self.errors[message] += 1
+        if self.sink is not None:
+            self._add_detail(("error", None, None, None, message))
+
+    def record_note(self, message):
+        """Records a message to be shown in the summary."""
+        self.notes.append(message)
+
+    def _add_detail(self, detail):
+        """Buffers a detail and writes the buffer once a chunk is full."""
+        self._details.append(detail)
+        if len(self._details) >= DETAIL_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered details to the sink."""
+        if self._details:
+            self.sink.write(self._details)
+            self._details = []
+
+    def close(self):
+        """Writes the pending details and prints the summary."""
+        if self.sink is not None:
+            self.flush()
+            self.sink.close()
+        if self.level != "silent":
+            print(self.format_summary())
+
+    def format_summary(self):
+        """Builds the summary of the processed sales."""
+        lines = ["::Summary of sales::\n"]
+        lines += self.notes
+        lines.append(f"Valid records: {self.counts['valid']}")
+        lines.append(f"Invalid records: {self.counts['invalid']}")
+        lines += [f"Error \"{message}\": {count} times"
+                  for message, count in self.errors.most_common()]
+        if isinstance(self.sink, FileDetailSink):
+            lines.append(f"Details exported to file {self.sink.detail_path}")
+        return "\n".join(lines) + "\n"
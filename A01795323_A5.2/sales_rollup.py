@@ -0,0 +1,198 @@
+"""This program computes sales totals per date, product and sale ID.
+
+The aggregates of every processed sales file are kept in a checkpoint, so
+later runs only read the files that are new or changed since the last run.
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import compute_sales
+import price_cache
+
+CHECKPOINT_FILE_PATH = os.path.join(compute_sales.BASE_DIR,
+                                    "SalesRollup.checkpoint.json")
+OUTPUT_FILE_PATH = os.path.join(compute_sales.BASE_DIR, "SalesRollup.txt")
+CHECKPOINT_VERSION = 1
+
+
+def load_checkpoint(checkpoint_path, catalogue_digest):
+    """Loads the checkpoint, or an empty one if it is missing or outdated."""
+    empty_checkpoint = {"version": CHECKPOINT_VERSION,
+                        "catalogue": catalogue_digest, "files": {}}
+    if not os.path.exists(checkpoint_path):
+        return empty_checkpoint
+    try:
+        with open(checkpoint_path, 'r', encoding="UTF-8") as json_file:
+            checkpoint = json.load(json_file)
+    except ValueError:
+        print(f"Invalid checkpoint file {checkpoint_path}, rebuilding it")
+        return empty_checkpoint
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        return empty_checkpoint
+    if checkpoint.get("catalogue") != catalogue_digest:
+        print("The price catalogue has changed, "
+              "previously processed files will be read again")
+        checkpoint["catalogue"] = catalogue_digest
+        for file_rollup in checkpoint["files"].values():
+            file_rollup["size"] = None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path, checkpoint):
+    """Stores the checkpoint replacing the previous one atomically."""
+    temp_path = f"{checkpoint_path}.tmp"
+    try:
+        with open(temp_path, 'w', encoding="UTF-8") as json_file:
+            json.dump(checkpoint, json_file)
+        os.replace(temp_path, checkpoint_path)
+    except OSError as e:
+        print(f"Error saving the checkpoint file: {e.strerror}")
+        sys.exit(1)
+
+
+def is_file_up_to_date(file_path, file_rollup):
+    """Checks if a file is unchanged since its rollup was computed."""
+    if file_rollup is None:
+        return False
+    file_stat = os.stat(file_path)
+    return (file_rollup["size"] == file_stat.st_size
+            and file_rollup["mtime_ns"] == file_stat.st_mtime_ns)
+
+
+def compute_file_rollup(prices, file_path):
+    """Aggregates the sales of a file per date, product and sale ID."""
+    file_stat = os.stat(file_path)
+    rollup = {"dates": {}, "products": {}, "sales": {}}
+    unit_prices = {}
+    valid_count = 0
+    invalid_count = 0
+    for sale in compute_sales.read_json_stream(file_path):
+        qty, product, price = compute_sales.evaluate_sale(prices, sale)
+        if not (qty and product and price):
+            invalid_count += 1
+            continue
+        if product not in unit_prices:
+            unit_prices[product] = Decimal(str(price))
+        add_sale_to_rollup(rollup, sale, qty, qty * unit_prices[product])
+        valid_count += 1
+    return {"size": file_stat.st_size,
+            "mtime_ns": file_stat.st_mtime_ns,
+            "valid": valid_count,
+            "invalid": invalid_count,
+            "dates": {key: str(value)
+                      for key, value in rollup["dates"].items()},
+            "products": {key: [units, str(amount)]
+                         for key, (units, amount)
+                         in rollup["products"].items()},
+            "sales": {key: str(value)
+                      for key, value in rollup["sales"].items()}}
+
+
+def add_sale_to_rollup(rollup, sale, qty, amount):
+    """Adds the amount of a valid sale to its date, product and sale ID."""
+    dates = rollup["dates"]
+    products = rollup["products"]
+    sales = rollup["sales"]
+    date = str(sale.get("SALE_Date"))
+    sale_id = str(sale.get("SALE_ID"))
+    product = sale["Product"]
+    dates[date] = dates.get(date, 0) + amount
+    units, product_amount = products.get(product, (0, 0))
+    products[product] = (units + qty, product_amount + amount)
+    sales[sale_id] = sales.get(sale_id, 0) + amount
+
+
+def update_checkpoint(prices, checkpoint, sales_file_paths):
+    """Computes the rollups of the new, changed or outdated sales files."""
+    file_rollups = checkpoint["files"]
+    outdated_paths = [path for path, file_rollup in file_rollups.items()
+                      if file_rollup["size"] is None]
+    for file_path in dict.fromkeys(sales_file_paths + outdated_paths):
+        if not os.path.exists(file_path):
+            print(f"File {file_path} no longer exists, "
+                  "removing it from the checkpoint")
+            file_rollups.pop(file_path, None)
+        elif is_file_up_to_date(file_path, file_rollups.get(file_path)):
+            print(f"Skipping {file_path}, already in the checkpoint")
+        else:
+            print(f"Processing {file_path}")
+            file_rollups[file_path] = compute_file_rollup(prices, file_path)
+
+
+def merge_rollups(file_rollups):
+    """Merges the rollups of all the files into overall totals."""
+    dates = {}
+    products = {}
+    sales = {}
+    for file_rollup in file_rollups:
+        for date, amount in file_rollup["dates"].items():
+            dates[date] = dates.get(date, 0) + Decimal(amount)
+        for product, (units, amount) in file_rollup["products"].items():
+            total_units, total_amount = products.get(product, (0, 0))
+            products[product] = (total_units + units,
+                                 total_amount + Decimal(amount))
+        for sale_id, amount in file_rollup["sales"].items():
+            sales[sale_id] = sales.get(sale_id, 0) + Decimal(amount)
+    return dates, products, sales
+
+
+def get_date_sort_key(date):
+    """Sorts dates chronologically, leaving unknown formats at the end."""
+    try:
+        return (0, datetime.strptime(date, "%d/%m/%y"), date)
+    except ValueError:
+        return (1, datetime.min, date)
+
+
+def get_sale_id_sort_key(sale_id):
+    """Sorts sale IDs numerically when possible."""
+    return (0, int(sale_id), sale_id) if sale_id.isdigit() else (1, 0, sale_id)
+
+
+def format_rollups(dates, products, sales):
+    """Builds the text report of the rollups."""
+    lines = ["::Sales per date::\n"]
+    lines += [f"{date}: ${dates[date]:.2f}"
+              for date in sorted(dates, key=get_date_sort_key)]
+    lines.append("\n::Sales per product::\n")
+    lines += [f"{product}: {units} units, ${amount:.2f}"
+              for product, (units, amount) in sorted(products.items())]
+    lines.append("\n::Sales per sale ID::\n")
+    lines += [f"Sale {sale_id}: ${sales[sale_id]:.2f}"
+              for sale_id in sorted(sales, key=get_sale_id_sort_key)]
+    total = sum(dates.values(), Decimal(0))
+    lines.append(f"\nTotal cost for all sales: ${total:.2f}")
+    return "\n".join(lines)
+
+
+def main():
+    """Main method to update the checkpoint and report the sales rollups"""
+    start_time = time.time()
+    prices_file_path = compute_sales.get_file_path(
+        compute_sales.read_filename_from_params(1))
+    sales_file_names = compute_sales.read_filenames_from_params()[1:]
+    sales_file_paths = [os.path.abspath(compute_sales.get_file_path(name))
+                        for name in sales_file_names]
+    checkpoint_path = compute_sales.read_option_from_params(
+        "checkpoint", CHECKPOINT_FILE_PATH)
+    prices = compute_sales.get_prices_from_file(prices_file_path)
+    checkpoint = load_checkpoint(
+        checkpoint_path,
+        price_cache.get_file_digest(prices_file_path).hex())
+    update_checkpoint(prices, checkpoint, sales_file_paths)
+    save_checkpoint(checkpoint_path, checkpoint)
+    report = format_rollups(*merge_rollups(checkpoint["files"].values()))
+    elapsed_time = time.time() - start_time
+    report += f"\nElapsed Time: {elapsed_time:.8f} seconds"
+    print(report)
+    compute_sales.create_file_with_results(OUTPUT_FILE_PATH, report)
+    print(f"Results exported to file {OUTPUT_FILE_PATH}")
+
+
+if __name__ == '__main__':
+    main()
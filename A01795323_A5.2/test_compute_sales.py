@@ -0,0 +1,184 @@
+"""Test cases for the streaming decoder of the sales files"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import compute_sales
+import sales_report
+
+RECORDS = [{"SALE_ID": 1, "Product": "Rustic breakfast", "Quantity": 1},
+           {"SALE_ID": 2, "Product": "Café \"con\" leche", "Quantity": -2.5e3},
+           [], {}, 12, -0.5, True, False, None, "text"]
+
+
+def parse(text, chunk_size, **options):
+    """Parses a text cut in chunks of a given size."""
+    chunks = [text[start:start + chunk_size]
+              for start in range(0, len(text), chunk_size)]
+    return list(compute_sales.parse_json_records(chunks, **options))
+
+
+class TestParseJsonRecords(unittest.TestCase):
+    """Test cases for the incremental json array decoder"""
+
+    def test_values_split_across_chunks(self):
+        """Test that every chunk size decodes the same records as json"""
+        for text in (json.dumps(RECORDS), json.dumps(RECORDS, indent=2),
+                     "[]", " [ ] ", "[1e-5,2E+3,\"\\u00e9\"]"):
+            for chunk_size in range(1, 12):
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    self.assertEqual(parse(text, chunk_size), json.loads(text))
+
+    def test_truncated_input(self):
+        """Test that an array without its closing bracket is an error"""
+        text = json.dumps(RECORDS)
+        for end in (0, 1, len(text) // 2, len(text) - 1):
+            with self.subTest(end=end):
+                with self.assertRaises(ValueError):
+                    parse(text[:end], 4)
+        with self.assertRaises(ValueError):
+            parse("[1,2", 1)
+
+    def test_bad_separators(self):
+        """Test that missing, repeated or extra separators are errors"""
+        for text in ("[1 2]", "[1,,2]", "[1,]", "[,1]", "[1]]]", "][1",
+                     '{"Quantity": 1}', "[1,2]x", "[1.x, 2]", '[{"a" 1}]'):
+            for chunk_size in (1, 3, 100):
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    with self.assertRaises(ValueError):
+                        parse(text, chunk_size)
+
+    def test_array_fragments(self):
+        """Test that the shards of an array only need their own brackets"""
+        self.assertEqual(parse('[{"a": 1}, {"b": 2},\n', 3, ends_array=False),
+                         [{"a": 1}, {"b": 2}])
+        self.assertEqual(parse('{"a": 1}, ', 3, starts_array=False,
+                               ends_array=False), [{"a": 1}])
+        self.assertEqual(parse('{"a": 1}]', 3, starts_array=False),
+                         [{"a": 1}])
+        with self.assertRaises(ValueError):
+            parse('{"a": 1}', 3, starts_array=False, ends_array=False)
+
+
+class TestReadJsonStream(unittest.TestCase):
+    """Test cases for the streaming of sales files and their shards"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "sales.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_shards_read_every_record(self):
+        """Test that the shards of a file decode all its records in order"""
+        records = [{"SALE_ID": number, "Product": f"Product {number}",
+                    "Quantity": number % 7} for number in range(500)]
+        with open(self.file_path, 'w', encoding="UTF-8") as file:
+            json.dump(records, file, indent=2)
+        shards = compute_sales.split_file_in_shards(self.file_path, 1000)
+        self.assertGreater(len(shards), 1)
+        streamed = [record for _, start, end in shards
+                    for record in compute_sales.read_json_stream(
+                        self.file_path, start, end)]
+        self.assertEqual(streamed, records)
+
+    def test_truncated_file_fails(self):
+        """Test that a truncated file exits instead of giving a total"""
+        with open(self.file_path, 'w', encoding="UTF-8") as file:
+            file.write(json.dumps(RECORDS)[:-1])
+        with self.assertRaises(SystemExit):
+            list(compute_sales.read_json_stream(self.file_path))
+
+    def test_parallel_details(self):
+        """Test that the workers report the details of every sale in order"""
+        prices_path = os.path.join(self.temp_dir, "products.json")
+        with open(prices_path, 'w', encoding="UTF-8") as file:
+            json.dump([{"title": "Tea", "price": 2.5},
+                       {"title": "Rice", "price": 1.25}], file)
+        sales = [{"SALE_ID": number, "Product": ("Tea", "Rice", "Gum")[
+            number % 3], "Quantity": number % 4} for number in range(300)]
+        with open(self.file_path, 'w', encoding="UTF-8") as file:
+            json.dump(sales, file, indent=2)
+        detail_path = os.path.join(self.temp_dir, "details.jsonl")
+        reporter = sales_report.SalesReporter("silent", detail_path)
+        with mock.patch.object(compute_sales, "MIN_SHARD_SIZE", 1000):
+            total = compute_sales.get_total_cost_parallel(
+                prices_path, [self.file_path], 2, reporter,
+                {"use_cache": False})
+        reporter.close()
+        with open(detail_path, 'r', encoding="UTF-8") as file:
+            details = [json.loads(line) for line in file]
+        self.assertEqual([(detail["product"], detail["quantity"])
+                          for detail in details],
+                         [(sale["Product"], sale["Quantity"] or False)
+                          for sale in sales])
+        self.assertEqual(sum(detail["status"] == "valid"
+                             for detail in details), reporter.counts["valid"])
+        self.assertAlmostEqual(float(total), sum(
+            detail["quantity"] * detail["price"] for detail in details
+            if detail["status"] == "valid"))
+
+    def test_codec_file(self):
+        """Test that a file of the shared codec is read without sys.path"""
+        path = list(sys.path)
+        codec = compute_sales.get_codec()
+        self.assertEqual(sys.path, path)
+        self.assertNotIn("models", sys.modules)
+        self.assertIs(compute_sales.get_codec(), codec)
+        with open(self.file_path, 'wb') as file:
+            file.write(codec.encode(RECORDS, "records"))
+        self.assertEqual(compute_sales.read_json_file(self.file_path),
+                         RECORDS)
+
+
+class TestTotalCost(unittest.TestCase):
+    """Test cases for the per-record and the vectorized sales totals"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.prices_path = os.path.join(self.temp_dir, "products.json")
+        with open(self.prices_path, 'w', encoding="UTF-8") as file:
+            json.dump([{"title": "Tea", "price": 2.5},
+                       {"title": "Rice", "price": 1.25},
+                       {"title": "Sample", "price": 0}], file)
+        products = ("Tea", "Rice", "Gum", "Sample", "Te")
+        self.sales = [{"SALE_ID": number, "Product": products[number % 5],
+                       "Quantity": number % 4} for number in range(500)]
+        self.sales += [{"Product": "Tea"}, {"Quantity": 3}, [], None,
+                       {"Product": "Rice", "Quantity": 2.9}]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def get_total(self, get_total_cost, prices, **options):
+        """Gets the total of an engine and the counts of its reporter."""
+        reporter = sales_report.SalesReporter("silent")
+        return (get_total_cost(prices, self.sales, reporter, **options),
+                reporter.counts)
+
+    def test_vectorized_total(self):
+        """Test that both engines give the same total and record counts"""
+        # The first run with the cache writes it, the second one loads it
+        for use_cache in (False, True, True):
+            for fuzzy in (False, True):
+                with self.subTest(use_cache=use_cache, fuzzy=fuzzy):
+                    prices = compute_sales.get_prices_from_file(
+                        self.prices_path, use_cache, fuzzy)
+                    total, counts = self.get_total(
+                        compute_sales.get_total_cost, prices)
+                    vectorized_total, vectorized_counts = self.get_total(
+                        compute_sales.get_total_cost_vectorized, prices,
+                        batch_size=64)
+                    self.assertAlmostEqual(vectorized_total, total)
+                    self.assertEqual(vectorized_counts, counts)
+                    self.assertEqual(counts["valid"], 226 if fuzzy else 151)
+
+
+if __name__ == '__main__':
+    unittest.main()
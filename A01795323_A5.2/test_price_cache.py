@@ -0,0 +1,65 @@
+"""Test cases for the compiled cache of the price catalogues"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import price_cache
+
+PRODUCTS = [{"title": "Rustic breakfast", "price": 21.32},
+            {"title": "Café con leche", "price": 3.5},
+            {"title": "Sample", "type": "free"}]
+
+
+class TestPriceCache(unittest.TestCase):
+    """Test cases for writing, loading and refreshing a price cache"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source_path = os.path.join(self.temp_dir, "products.json")
+        with open(self.source_path, 'w', encoding="UTF-8") as file:
+            json.dump(PRODUCTS, file)
+        self.prices = {product["title"]: product for product in PRODUCTS}
+        self.cache_path = price_cache.get_cache_path(self.source_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        """Test that a loaded cache has the prices of the catalogue"""
+        self.assertTrue(price_cache.write_price_cache(self.source_path,
+                                                      self.prices))
+        catalogue = price_cache.load_price_cache(self.source_path)
+        self.assertEqual(dict(catalogue), {
+            "Rustic breakfast": {"title": "Rustic breakfast", "price": 21.32},
+            "Café con leche": {"title": "Café con leche", "price": 3.5},
+            "Sample": {"title": "Sample"}})
+
+    def test_touched_source_refreshes_by_replace(self):
+        """Test that a new mtime replaces the cache instead of editing it"""
+        price_cache.write_price_cache(self.source_path, self.prices)
+        old_inode = os.stat(self.cache_path).st_ino
+        stat = os.stat(self.source_path)
+        os.utime(self.source_path, ns=(stat.st_atime_ns,
+                                       stat.st_mtime_ns + 10 ** 9))
+        catalogue = price_cache.load_price_cache(self.source_path)
+        self.assertEqual(catalogue["Café con leche"]["price"], 3.5)
+        self.assertNotEqual(os.stat(self.cache_path).st_ino, old_inode)
+        with open(self.cache_path, 'rb') as cache_file:
+            header = price_cache.HEADER.unpack_from(cache_file.read())
+        self.assertEqual(header[3], os.stat(self.source_path).st_mtime_ns)
+        self.assertEqual(dict(price_cache.load_price_cache(self.source_path)),
+                         dict(catalogue))
+
+    def test_changed_source_is_stale(self):
+        """Test that a cache of a different content is not loaded"""
+        price_cache.write_price_cache(self.source_path, self.prices)
+        with open(self.source_path, 'w', encoding="UTF-8") as file:
+            json.dump(PRODUCTS[::-1], file)
+        self.assertIsNone(price_cache.load_price_cache(self.source_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""Test cases for the matcher of misspelled product names"""
+
+import unittest
+
+import product_matcher
+
+CATALOGUE = {"Rustic breakfast": {"title": "Rustic breakfast", "price": 21.32},
+             "Fresh strawberry": {"title": "Fresh strawberry", "price": 4.5},
+             "Strawberry jelly": {"title": "Strawberry jelly", "price": 2},
+             "Café con leche": {"title": "Café con leche", "price": 3.5},
+             "Green tea": {"title": "Green tea", "price": 1.5}}
+
+
+class TestProductMatcher(unittest.TestCase):
+    """Test cases for the lookups of names with typos"""
+
+    def setUp(self):
+        self.matcher = product_matcher.ProductMatcher(CATALOGUE)
+
+    def test_edit_distance(self):
+        """Test the distance of deletions, insertions, swaps and changes"""
+        for source, target, distance in (("tea", "tea", 0), ("tea", "te", 1),
+                                         ("te", "tea", 1), ("tea", "tae", 1),
+                                         ("tea", "sea", 1), ("", "tea", 3),
+                                         ("jelly", "jlely", 1),
+                                         ("breakfast", "brekafst", 2)):
+            with self.subTest(source=source, target=target):
+                self.assertEqual(product_matcher.get_edit_distance(
+                    source, target), distance)
+
+    def test_normalized_names(self):
+        """Test that case, accents and whitespace are ignored"""
+        for name in ("rustic  BREAKFAST", " Rustic breakfast "):
+            self.assertEqual(self.matcher.find_title(name), "Rustic breakfast")
+        self.assertEqual(self.matcher.find_title("cafe con LECHE"),
+                         "Café con leche")
+
+    def test_typos(self):
+        """Test names with a typo in one or several words"""
+        for name, title in (("Rustic braekfast", "Rustic breakfast"),
+                            ("Rustci brekfast", "Rustic breakfast"),
+                            ("Fresh stawberry", "Fresh strawberry"),
+                            ("Frseh strawberrry", "Fresh strawberry"),
+                            ("Strawbery jely", "Strawberry jelly"),
+                            ("Green te", "Green tea"),
+                            ("Cafe con lehce", "Café con leche")):
+            with self.subTest(name=name):
+                self.assertEqual(self.matcher.find_title(name), title)
+
+    def test_unmatched_names(self):
+        """Test that names too far from every title are not matched"""
+        for name in ("Rstic brkfst", "Green", "Green tea jelly", "Gren tan",
+                     "Sandwich with salad", ""):
+            with self.subTest(name=name):
+                self.assertIsNone(self.matcher.find_title(name))
+
+    def test_cache(self):
+        """Test that resolved names are cached"""
+        self.matcher.find_title("Rustic braekfast")
+        self.matcher.find_title("Rustic braekfast")
+        self.assertEqual(self.matcher.get_stats(),
+                         {"hits": 1, "misses": 1, "cached": 1})
+
+
+class TestFuzzyPriceCatalogue(unittest.TestCase):
+    """Test cases for the catalogue that resolves misspelled names"""
+
+    def test_mapping(self):
+        """Test that misspelled names are looked up as their titles"""
+        catalogue = product_matcher.FuzzyPriceCatalogue(CATALOGUE)
+        self.assertEqual(catalogue["Green te"], CATALOGUE["Green tea"])
+        self.assertEqual(catalogue.get("Gren tan"), None)
+        self.assertIn("Fresh stawberry", catalogue)
+        self.assertNotIn(None, catalogue)
+        with self.assertRaises(KeyError):
+            _ = catalogue["Sandwich"]
+        self.assertEqual(catalogue.resolved, {"Green te", "Fresh stawberry"})
+        self.assertEqual((len(catalogue), list(catalogue)),
+                         (len(CATALOGUE), list(CATALOGUE)))
+
+    def test_resolved_title_codes(self):
+        """Test that misspelled names get the code of their title"""
+        catalogue = product_matcher.FuzzyPriceCatalogue(CATALOGUE)
+        title_codes = product_matcher.ResolvedTitleCodes(
+            {title: code for code, title in enumerate(CATALOGUE)}, catalogue)
+        self.assertEqual(title_codes.get("Strawbery jely"), 2)
+        self.assertEqual(title_codes.get("Sandwich", -1), -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""Test cases for the buffered reporting layer of the sales"""
+
+import contextlib
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import sales_report
+
+
+def record_sales(reporter):
+    """Records a valid sale, an error and an invalid sale."""
+    reporter.record_sale(2, "Tea", 2.5)
+    reporter.record_error("price not found in Dictionary")
+    reporter.record_invalid(1, "Gum", False)
+
+
+class TestSalesReporter(unittest.TestCase):
+    """Test cases for the console output and the details files"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def close(self, reporter):
+        """Closes a reporter, returns what it printed."""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            reporter.close()
+        return output.getvalue()
+
+    def test_detailed_console(self):
+        """Test the details and the summary printed on the console"""
+        reporter = sales_report.SalesReporter()
+        record_sales(reporter)
+        reporter.record_valid_sales(3)
+        reporter.record_note("Resolved 1 product names")
+        self.assertEqual(self.close(reporter), (
+            "::Details of sales::\n\n"
+            "Compute Qty: 2 of product: \"Tea\" at price: $2.5\n"
+            "Error: price not found in Dictionary\n"
+            "Invalid record: Qty = 1, Price = False, Product: Gum\n"
+            "\n\n"
+            "::Summary of sales::\n\n"
+            "Resolved 1 product names\n"
+            "Valid records: 4\n"
+            "Invalid records: 1\n"
+            "Error \"price not found in Dictionary\": 1 times\n\n"))
+
+    def test_levels(self):
+        """Test that the summary level prints no details and silent nothing"""
+        reporter = sales_report.SalesReporter("summary")
+        self.assertFalse(reporter.keeps_details)
+        record_sales(reporter)
+        output = self.close(reporter)
+        self.assertTrue(output.startswith("::Summary of sales::"))
+        self.assertIn("Valid records: 1\nInvalid records: 1\n", output)
+        reporter = sales_report.SalesReporter("silent")
+        record_sales(reporter)
+        self.assertEqual(self.close(reporter), "")
+        self.assertEqual(reporter.counts, {"valid": 1, "invalid": 1})
+        with self.assertRaises(ValueError):
+            sales_report.SalesReporter("verbose")
+
+    def test_detail_files(self):
+        """Test the details written in chunks to a JSON Lines or CSV file"""
+        for extension in ("jsonl", "csv"):
+            with self.subTest(extension=extension), \
+                    mock.patch.object(sales_report, "DETAIL_CHUNK_SIZE", 2):
+                detail_path = os.path.join(self.temp_dir,
+                                           f"details.{extension}")
+                reporter = sales_report.SalesReporter("silent", detail_path)
+                self.assertTrue(reporter.keeps_details)
+                reporter.record_sale(2, "Tea", 2.5)
+                self.assertFalse(os.path.exists(detail_path))
+                reporter.record_error("price not found in Dictionary")
+                self.assertTrue(os.path.exists(detail_path))
+                reporter.record_invalid(1, "Gum", False)
+                self.assertEqual(self.close(reporter), "")
+                with open(detail_path, 'r', encoding="UTF-8",
+                          newline="") as file:
+                    if extension == "csv":
+                        details = list(csv.DictReader(file))
+                    else:
+                        details = [json.loads(line) for line in file]
+                self.assertEqual([detail["status"] for detail in details],
+                                 ["valid", "error", "invalid"])
+                self.assertEqual([detail["product"] for detail in details],
+                                 ["Tea", "" if extension == "csv" else None,
+                                  "Gum"])
+
+    def test_empty_detail_file(self):
+        """Test that a details file is created without details"""
+        detail_path = os.path.join(self.temp_dir, "details.csv")
+        reporter = sales_report.SalesReporter("summary", detail_path)
+        output = self.close(reporter)
+        self.assertIn(f"Details exported to file {detail_path}", output)
+        with open(detail_path, 'r', encoding="UTF-8") as file:
+            self.assertEqual(file.read().splitlines(),
+                             [",".join(sales_report.DETAIL_FIELDS)])
+
+
+if __name__ == '__main__':
+    unittest.main()
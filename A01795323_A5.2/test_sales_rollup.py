@@ -0,0 +1,147 @@
+"""Test cases for the sales rollups and their checkpoint"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+import sales_rollup
+
+PRICES = {"Tea": {"title": "Tea", "price": 2.5},
+          "Rice": {"title": "Rice", "price": 1.1}}
+SALES = [[{"SALE_ID": 1, "SALE_Date": "01/12/23", "Product": "Tea",
+           "Quantity": 2},
+          {"SALE_ID": 1, "SALE_Date": "01/12/23", "Product": "Rice",
+           "Quantity": 3},
+          {"SALE_ID": 2, "SALE_Date": "30/11/23", "Product": "Gum",
+           "Quantity": 1}],
+         [{"SALE_ID": 10, "SALE_Date": "02/01/24", "Product": "Rice",
+           "Quantity": 1},
+          {"SALE_ID": 2, "SALE_Date": "30/11/23", "Product": "Tea",
+           "Quantity": 0}]]
+
+
+class TestSalesRollup(unittest.TestCase):
+    """Test cases for reusing and recomputing the rollups of the files"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.checkpoint_path = os.path.join(self.temp_dir, "checkpoint.json")
+        self.sales_paths = []
+        for number, sales in enumerate(SALES):
+            self.sales_paths.append(os.path.join(self.temp_dir,
+                                                 f"sales{number}.json"))
+            self.write_sales(self.sales_paths[-1], sales)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @staticmethod
+    def write_sales(file_path, sales):
+        """Writes the sales of a file."""
+        with open(file_path, 'w', encoding="UTF-8") as file:
+            json.dump(sales, file)
+
+    def run_rollup(self, sales_paths, catalogue_digest="digest"):
+        """Updates and saves the checkpoint, returns the processed files.
+
+        Also returns the merged rollups of the checkpoint.
+        """
+        compute_file_rollup = mock.Mock(
+            wraps=sales_rollup.compute_file_rollup)
+        with contextlib.redirect_stdout(io.StringIO()), \
+                mock.patch.object(sales_rollup, "compute_file_rollup",
+                                  compute_file_rollup):
+            checkpoint = sales_rollup.load_checkpoint(self.checkpoint_path,
+                                                      catalogue_digest)
+            sales_rollup.update_checkpoint(PRICES, checkpoint, sales_paths)
+            sales_rollup.save_checkpoint(self.checkpoint_path, checkpoint)
+        return ([call.args[1] for call in compute_file_rollup.call_args_list],
+                sales_rollup.merge_rollups(checkpoint["files"].values()))
+
+    def test_rollups(self):
+        """Test the totals per date, product and sale ID of the files"""
+        processed, (dates, products, sales) = self.run_rollup(
+            self.sales_paths)
+        self.assertEqual(processed, self.sales_paths)
+        self.assertEqual(dates, {"01/12/23": Decimal("8.3"),
+                                 "02/01/24": Decimal("1.1")})
+        self.assertEqual(products, {"Tea": (2, Decimal("5.0")),
+                                    "Rice": (4, Decimal("4.4"))})
+        self.assertEqual(sales, {"1": Decimal("8.3"), "10": Decimal("1.1")})
+        checkpoint = sales_rollup.load_checkpoint(self.checkpoint_path,
+                                                  "digest")
+        self.assertEqual([(file_rollup["valid"], file_rollup["invalid"])
+                          for file_rollup in checkpoint["files"].values()],
+                         [(2, 1), (1, 1)])
+
+    def test_checkpoint_reuse(self):
+        """Test that unchanged files are not read again"""
+        _, rollups = self.run_rollup(self.sales_paths)
+        processed, reused_rollups = self.run_rollup(self.sales_paths)
+        self.assertEqual(processed, [])
+        self.assertEqual(reused_rollups, rollups)
+        processed, _ = self.run_rollup(self.sales_paths[:1])
+        self.assertEqual(processed, [])
+
+    def test_changed_file(self):
+        """Test that only a changed file is read again"""
+        self.run_rollup(self.sales_paths)
+        self.write_sales(self.sales_paths[1], SALES[1] + SALES[1][:1])
+        processed, (dates, _, _) = self.run_rollup(self.sales_paths)
+        self.assertEqual(processed, self.sales_paths[1:])
+        self.assertEqual(dates["02/01/24"], Decimal("2.2"))
+
+    def test_changed_catalogue(self):
+        """Test that a new catalogue reads every processed file again"""
+        self.run_rollup(self.sales_paths)
+        processed, _ = self.run_rollup(self.sales_paths[:1], "new digest")
+        self.assertEqual(processed, self.sales_paths)
+        processed, _ = self.run_rollup(self.sales_paths, "new digest")
+        self.assertEqual(processed, [])
+
+    def test_removed_file(self):
+        """Test that a removed file is dropped from the checkpoint"""
+        self.run_rollup(self.sales_paths)
+        os.remove(self.sales_paths[0])
+        processed, (dates, _, _) = self.run_rollup(self.sales_paths)
+        self.assertEqual(processed, [])
+        self.assertEqual(dates, {"02/01/24": Decimal("1.1")})
+
+    def test_invalid_checkpoint(self):
+        """Test that an invalid or outdated checkpoint is rebuilt"""
+        for content in ("{", json.dumps({"version": 0, "files": {}})):
+            with self.subTest(content=content):
+                with open(self.checkpoint_path, 'w',
+                          encoding="UTF-8") as file:
+                    file.write(content)
+                processed, _ = self.run_rollup(self.sales_paths)
+                self.assertEqual(processed, self.sales_paths)
+
+    def test_format_rollups(self):
+        """Test that dates and sale IDs are sorted by value in the report"""
+        report = sales_rollup.format_rollups(
+            {"02/01/24": Decimal("1.1"), "bad date": Decimal(1),
+             "01/12/23": Decimal("8.3")},
+            {"Tea": (2, Decimal(5))},
+            {"10": Decimal("1.1"), "9": Decimal("8.3"), "x": Decimal(1)})
+        lines = report.splitlines()
+        self.assertLess(lines.index("01/12/23: $8.30"),
+                        lines.index("02/01/24: $1.10"))
+        self.assertLess(lines.index("02/01/24: $1.10"),
+                        lines.index("bad date: $1.00"))
+        self.assertLess(lines.index("Sale 9: $8.30"),
+                        lines.index("Sale 10: $1.10"))
+        self.assertLess(lines.index("Sale 10: $1.10"),
+                        lines.index("Sale x: $1.00"))
+        self.assertIn("Tea: 2 units, $5.00", lines)
+        self.assertEqual(lines[-1], "Total cost for all sales: $10.40")
+
+
+if __name__ == '__main__':
+    unittest.main()
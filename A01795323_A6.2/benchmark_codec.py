@@ -0,0 +1,91 @@
+"""Measures the save and load times of the db file formats."""
+
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmark_search import create_synthetic_hotels
+from models import codec, storage
+
+DEFAULT_RECORDS = 1_000_000
+
+
+def save_stdlib(file_path, records):
+    """Saves records as compact json with the json module."""
+    with open(file_path, "w", encoding="UTF-8") as db_file:
+        json.dump(records, db_file, separators=(",", ":"))
+
+
+def load_stdlib(file_path):
+    """Loads records with the json module."""
+    with open(file_path, "r", encoding="UTF-8") as db_file:
+        return json.load(db_file)
+
+
+def save_pretty(file_path, records):
+    """Saves records as the indented json of the export."""
+    codec.write_file(file_path, records, pretty=True)
+
+
+def get_format_saver(file_format, compress=False):
+    """Gets a function that saves records in a format of the codec."""
+    def save(file_path, records):
+        data = codec.encode(records, file_format)
+        if compress:
+            data = gzip.compress(data, compresslevel=6, mtime=0)
+        storage.write_atomically(file_path, data)
+    return save
+
+
+def load_snapshot(file_path):
+    """Loads records of any format as the json store does."""
+    with open(file_path, "rb") as db_file:
+        return storage.decode_snapshot(db_file.read())
+
+
+FORMATS = {
+    "json, stdlib": (save_stdlib, load_stdlib),
+    f"json, {codec.get_json_library()}": (get_format_saver("json"),
+                                          load_snapshot),
+    "json, indented export": (save_pretty, load_snapshot),
+    "json, gzip": (get_format_saver("json", True), load_snapshot),
+    "records": (get_format_saver("records"), load_snapshot),
+    "msgpack": (get_format_saver("msgpack"), load_snapshot),
+}
+
+
+def measure(function, *arguments):
+    """Gets the seconds of a function and its result."""
+    start_time = time.perf_counter()
+    result = function(*arguments)
+    return time.perf_counter() - start_time, result
+
+
+def main():
+    """Compares the save and load times of every format."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RECORDS
+    records = create_synthetic_hotels(count)
+    temp_dir = tempfile.mkdtemp()
+    print(f"Benchmark over {count} synthetic hotels")
+    try:
+        for name, (save, load) in FORMATS.items():
+            if name == "msgpack" and codec.msgpack is None:
+                print(f"{name:>24}: skipped, msgpack is not installed")
+                continue
+            file_path = os.path.join(temp_dir, "hotels.db")
+            save_time, _ = measure(save, file_path, records)
+            load_time, loaded = measure(load, file_path)
+            print(f"{name:>24}: save {save_time:.2f} s, load "
+                  f"{load_time:.2f} s, {os.path.getsize(file_path) / 1e6:.1f}"
+                  f" MB ({'same' if loaded == records else 'DIFFERENT'} "
+                  f"records)")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
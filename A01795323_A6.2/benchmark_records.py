@@ -0,0 +1,68 @@
+"""Measures the memory per record of the json store record types."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from models.hotel import Hotel
+from models.reservation import Reservation
+from models.storage import JsonStore
+
+DEFAULT_RECORDS = 100_000
+
+
+def create_synthetic_records(records):
+    """Creates hotel and reservation records with distinct values."""
+    hotels = [{"hotel_id": index, "name": f"Hotel {index}",
+               "country": "México", "address": f"Av. Juárez {index}",
+               "phone": f"55{index:08d}", "category": str(1 + index % 5),
+               "reserved_rooms": index % 40, "rooms": 40}
+              for index in range(records)]
+    reservations = [{"reservation_id": index, "customer_id": index % 997,
+                     "hotel_id": index % 1009, "room_id": 1 + index % 40,
+                     "nights": 1 + index % 7, "price_per_night": 1500,
+                     "check_in": "2024-05-01", "check_out": "2024-05-03"}
+                    for index in range(records)]
+    return hotels, reservations
+
+
+def measure(file_path, key, record_type):
+    """Loads a json file in a store and returns its bytes per record."""
+    start_time = time.perf_counter()
+    JsonStore(file_path, key, record_type)
+    elapsed_time = time.perf_counter() - start_time
+    tracemalloc.start()
+    store = JsonStore(file_path, key, record_type)
+    used_bytes = sum(stat.size for stat in
+                     tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    return used_bytes / len(store.records), elapsed_time
+
+
+def main():
+    """Compares dictionaries against slots records in memory."""
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RECORDS
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print(f"Benchmark over {records} synthetic records")
+        for (model, key), data in zip(
+                ((Hotel, "hotel_id"), (Reservation, "reservation_id")),
+                create_synthetic_records(records)):
+            file_path = os.path.join(temp_dir, f"{model.__name__}.json")
+            with open(file_path, "w", encoding="UTF-8") as db_file:
+                json.dump(data, db_file)
+            for name, record_type in (("dict", None), ("slots", model)):
+                size, elapsed_time = measure(file_path, key, record_type)
+                print(f"{model.__name__:>12} {name:>6}: "
+                      f"{size:,.0f} bytes/record, "
+                      f"loaded in {elapsed_time:.2f} s")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
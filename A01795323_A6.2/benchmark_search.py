@@ -0,0 +1,96 @@
+"""Measures the indexed hotel searches of the json store against scans."""
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from models import query
+from models.hotel import Hotel
+from models.storage import JsonStore
+
+DEFAULT_RECORDS = 1_000_000
+REPETITIONS = 100
+SCAN_REPETITIONS = 3
+COUNTRIES = ("México", "Canada", "Perú", "Chile", "Colombia", "España",
+             "Argentina", "Brasil", "Cuba", "Uruguay")
+NAMES = ("Hyatt", "Hilton", "Marriott", "Fiesta Inn", "Camino Real",
+         "Presidente", "Westin", "Sheraton")
+SEARCHES = {
+    "country + category, page of 10": (
+        [("country", "=", "Perú"), ("category", "=", "4")], None, 10),
+    "country + category, all": (
+        [("country", "=", "Perú"), ("category", "=", "4")], None, None),
+    "name prefix sorted by name, page of 10": (
+        [("name", "prefix", "Hy")], "name", 10),
+    "country sorted by name, page of 10": (
+        [("country", "=", "Chile")], "-name", 10),
+}
+
+
+def create_synthetic_hotels(records):
+    """Creates hotel records with distinct names."""
+    generator = random.Random(1)
+    return [{"hotel_id": index,
+             "name": f"{generator.choice(NAMES)} {index}",
+             "country": generator.choice(COUNTRIES),
+             "address": f"Av. Juárez {index}",
+             "phone": f"55{index:08d}",
+             "category": str(generator.randint(1, 5)),
+             "reserved_rooms": 0, "rooms": 40}
+            for index in range(records)]
+
+
+def scan(store, predicates, order_by, limit):
+    """Searches the records of a store without indexes."""
+    records = [record for record in store.records.values()
+               if query.matches(record, predicates)]
+    if order_by is not None:
+        records = query.sort_records(records, order_by.lstrip("-"),
+                                     order_by.startswith("-"), limit)
+    return [record.to_dict() for record in records[:limit]]
+
+
+def search(store, predicates, order_by, limit):
+    """Searches the records of a store with its indexes."""
+    return list(store.search(predicates, order_by, limit=limit))
+
+
+def measure(function, arguments, repetitions=REPETITIONS):
+    """Gets the mean seconds of a function and its last result."""
+    start_time = time.perf_counter()
+    for _ in range(repetitions):
+        result = function(*arguments)
+    return (time.perf_counter() - start_time) / repetitions, result
+
+
+def main():
+    """Compares indexed searches with scans of the records."""
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RECORDS
+    temp_dir = tempfile.mkdtemp()
+    try:
+        file_path = os.path.join(temp_dir, "hotels.json")
+        with open(file_path, "w", encoding="UTF-8") as db_file:
+            json.dump(create_synthetic_hotels(records), db_file)
+        start_time = time.perf_counter()
+        store = JsonStore(file_path, "hotel_id", Hotel,
+                          Hotel.INDEXED_FIELDS, Hotel.SORTED_FIELDS)
+        print(f"Benchmark over {records} synthetic hotels, loaded and "
+              f"indexed in {time.perf_counter() - start_time:.2f} s")
+        for name, (predicates, order_by, limit) in SEARCHES.items():
+            arguments = (store, predicates, order_by, limit)
+            search_time, found = measure(search, arguments)
+            scan_time, scanned = measure(scan, arguments, SCAN_REPETITIONS)
+            print(f"{name:>40}: {len(found):>7} hotels, indexed "
+                  f"{search_time * 1e6:,.1f} µs, scan "
+                  f"{scan_time * 1e6:,.0f} µs "
+                  f"({'same' if found == scanned else 'DIFFERENT'} results)")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Temporary db directory and disk failures used by the test cases."""
+
+import errno
+import os
+import tempfile
+from unittest import mock
+
+from models import sqlite_store, storage
+from models.customer import Customer
+from models.hotel import Hotel
+from models.reservation import Reservation
+
+MODELS = (Hotel, Customer, Reservation)
+
+
+def use_temp_db(test_case):
+    """Points the db files of the models at a new temporary directory.
+
+    The directory, its stores and its sqlite connection are removed when
+    the test case ends, so the tests never touch the db directory.
+    """
+    temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+    test_case.addCleanup(temp_dir.cleanup)
+    for model in MODELS:
+        file_path = os.path.join(temp_dir.name,
+                                 os.path.basename(model.FILE_PATH))
+        patcher = mock.patch.object(model, "FILE_PATH", file_path)
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+        test_case.addCleanup(storage.forget_store, file_path)
+    test_case.addCleanup(sqlite_store.close_connection, os.path.join(
+        temp_dir.name, sqlite_store.DB_FILE_NAME))
+    return temp_dir.name
+
+
+def fail_appends(path):
+    """Makes the storage fail to append to a file as if the disk was full."""
+    def open_file(file, *args, **kwargs):
+        if file == path and args[:1] == ("ab",):
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC), file)
+        return open(file, *args, **kwargs)  # pylint: disable=W1514
+    return mock.patch("models.storage.open", open_file, create=True)
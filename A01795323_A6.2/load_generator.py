@@ -0,0 +1,142 @@
+"""Load generator of the hotel reservation service.
+
+Creates some hotels, then sends a mix of reads and writes through several
+keep-alive connections to a service running on localhost, and reports the
+p50 and p99 latency and the requests per second. The hotels are deleted
+when it ends.
+
+Run "python service.py" first, then "python load_generator.py".
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from models import codec
+from service import DEFAULT_PORT
+
+FIRST_HOTEL_ID = 1_000_000
+
+
+class HttpClient:
+    """Keep-alive HTTP/JSON connection to the service"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=DEFAULT_PORT):
+        """Opens a connection to the service."""
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, method, path, data=None):
+        """Sends a request, returns the status and json of its response."""
+        body = b"" if data is None else codec.dumps(data)
+        self.writer.write(f"{method} {path} HTTP/1.1\r\n"
+                          f"Host: localhost\r\n"
+                          f"Content-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n"
+                          f"\r\n".encode("ascii") + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        size = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                size = int(value)
+        return status, codec.loads(await self.reader.readexactly(size))
+
+    async def close(self):
+        """Closes the connection."""
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def get_percentile(sorted_values, percentile):
+    """Gets the nearest-rank percentile of some sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(round(percentile / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+async def send_requests(client, requests, hotel_ids, write_ratio,
+                        latencies):
+    """Sends requests from a shared counter until they run out.
+
+    Returns the number of responses that weren't successful.
+    """
+    errors = 0
+    for _ in requests:
+        hotel_id = random.choice(hotel_ids)
+        if random.random() < write_ratio:
+            request = ("PATCH", f"/hotels/{hotel_id}",
+                       {"phone": f"55{random.randrange(10 ** 8):08d}"})
+        else:
+            request = ("GET", f"/hotels/{hotel_id}")
+        start_time = time.perf_counter()
+        status, _ = await client.request(*request)
+        latencies.append(time.perf_counter() - start_time)
+        errors += status >= 400
+    return errors
+
+
+async def run_load(port=DEFAULT_PORT, requests=10_000, connections=50,
+                   write_ratio=0.1, hotels=100):
+    """Runs the load against the service, returns its statistics."""
+    hotel_ids = list(range(FIRST_HOTEL_ID, FIRST_HOTEL_ID + hotels))
+    clients = [await HttpClient.connect(port=port)
+               for _ in range(connections)]
+    try:
+        for hotel_id in hotel_ids:
+            await clients[0].request("POST", "/hotels", {
+                "hotel_id": hotel_id, "name": f"Load {hotel_id}",
+                "country": "México", "address": "Av. Reforma",
+                "phone": "5500000000", "category": "3",
+                "reserved_rooms": 0, "rooms": 10})
+        latencies = []
+        counter = iter(range(requests))
+        start_time = time.perf_counter()
+        errors = await asyncio.gather(*(
+            send_requests(client, counter, hotel_ids, write_ratio,
+                          latencies)
+            for client in clients))
+        elapsed_time = time.perf_counter() - start_time
+        for hotel_id in hotel_ids:
+            await clients[0].request("DELETE", f"/hotels/{hotel_id}")
+    finally:
+        for client in clients:
+            await client.close()
+    latencies.sort()
+    return {"requests": len(latencies), "errors": sum(errors),
+            "seconds": elapsed_time,
+            "requests_per_second": len(latencies) / elapsed_time,
+            "p50_ms": get_percentile(latencies, 50) * 1000,
+            "p99_ms": get_percentile(latencies, 99) * 1000}
+
+
+def main():
+    """Main method to run the load generator"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--hotels", type=int, default=100)
+    arguments = parser.parse_args()
+    stats = asyncio.run(run_load(arguments.port, arguments.requests,
+                                 arguments.connections,
+                                 arguments.write_ratio, arguments.hotels))
+    print(f"{stats['requests']} requests ({stats['errors']} errors) "
+          f"in {stats['seconds']:.2f} s")
+    print(f"{stats['requests_per_second']:,.0f} requests/s, "
+          f"p50 {stats['p50_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
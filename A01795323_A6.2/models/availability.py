@@ -0,0 +1,162 @@
+"""This module contains the room availability index of the hotels.
+
+Every room keeps its stays sorted by check-in day. Since the stays of a
+room don't overlap, their check-out days are sorted too, and a new stay
+overlaps a booking only if it overlaps the last stay that starts before
+it ends, which is found with a binary search. Days are date ordinals and
+a stay goes from its check-in day up to, but not including, its check-out
+day. The rooms of a hotel without a number of rooms aren't checked.
+"""
+
+import bisect
+from datetime import date
+
+
+def to_day(value):
+    """Converts an ISO date string or a date to its ordinal day."""
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        return date.fromisoformat(value).toordinal()
+    except TypeError as e:
+        raise ValueError(f"Invalid date {value!r}") from e
+
+
+def get_stay(reservation):
+    """Gets the hotel, room, check-in and check-out days of a reservation.
+
+    Returns None if the reservation has no dates.
+    """
+    if reservation.get("check_in") is None \
+            or reservation.get("check_out") is None:
+        return None
+    start = to_day(reservation["check_in"])
+    end = to_day(reservation["check_out"])
+    if end <= start:
+        raise ValueError("The check-out must be after the check-in")
+    return reservation["hotel_id"], reservation["room_id"], start, end
+
+
+def check_stay(reservation):
+    """Raises ValueError if a reservation has no valid stay.
+
+    The stay needs a check-in and a check-out, and its nights must be the
+    days between them.
+    """
+    stay = get_stay(reservation)
+    if stay is None:
+        raise ValueError("The check-in and check-out dates are required")
+    nights = reservation.get("nights")
+    if isinstance(nights, bool) or nights != stay[3] - stay[2]:
+        raise ValueError(f"{nights!r} nights don't match the "
+                         f"{stay[3] - stay[2]} nights between the check-in "
+                         f"and the check-out")
+
+
+class RoomCalendar:
+    """Stays of a room sorted by check-in day"""
+
+    def __init__(self):
+        self.starts = []
+        self.stays = []
+
+    def find_overlap(self, start, end):
+        """Gets the reservation of a stay overlapping some days, or None."""
+        i = bisect.bisect_left(self.starts, end)
+        if i and self.stays[i - 1][1] > start:
+            return self.stays[i - 1][2]
+        return None
+
+    def add(self, start, end, reservation_id):
+        """Adds the stay of a reservation."""
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.stays.insert(i, (start, end, reservation_id))
+
+    def remove(self, start, reservation_id):
+        """Removes the stay of a reservation."""
+        i = bisect.bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] == start:
+            if self.stays[i][2] == reservation_id:
+                del self.starts[i]
+                del self.stays[i]
+                return
+            i += 1
+
+
+class AvailabilityIndex:
+    """Room calendars of all the hotels built from their reservations"""
+
+    def __init__(self, hotels, reservations):
+        self.rooms = {hotel["hotel_id"]: hotel.get("rooms")
+                      for hotel in hotels}
+        self.calendars = {}
+        self.overlaps = []
+        for reservation in reservations:
+            conflict = self.find_conflict(reservation)
+            if conflict is not None:
+                self.overlaps.append((conflict,
+                                      reservation["reservation_id"]))
+            self.add(reservation)
+
+    def check_room(self, reservation):
+        """Raises ValueError if the room of a reservation isn't in its hotel.
+
+        The rooms of a hotel are numbered from 1 to its number of rooms,
+        any room number is accepted if the hotel has no number of rooms.
+        """
+        room_id = reservation["room_id"]
+        if isinstance(room_id, bool) or not isinstance(room_id, int) \
+                or room_id < 1:
+            raise ValueError(f"Room {room_id!r} is not a room number")
+        rooms = self.rooms.get(reservation["hotel_id"])
+        if rooms is not None and room_id > rooms:
+            raise ValueError(f"Room {room_id!r} is not one of the {rooms} "
+                             f"rooms of hotel {reservation['hotel_id']}")
+
+    def find_conflict(self, reservation):
+        """Gets the reservation overlapping the stay of another, or None."""
+        stay = get_stay(reservation)
+        if stay is None:
+            return None
+        hotel_id, room_id, start, end = stay
+        calendar = self.calendars.get((hotel_id, room_id))
+        if calendar is None:
+            return None
+        return calendar.find_overlap(start, end)
+
+    def add(self, reservation):
+        """Adds the stay of a reservation to the calendar of its room."""
+        stay = get_stay(reservation)
+        if stay is not None:
+            hotel_id, room_id, start, end = stay
+            self.calendars.setdefault((hotel_id, room_id), RoomCalendar()) \
+                .add(start, end, reservation["reservation_id"])
+
+    def remove(self, reservation):
+        """Removes the stay of a reservation from the calendar of its room."""
+        stay = get_stay(reservation)
+        if stay is not None:
+            hotel_id, room_id, start, _ = stay
+            calendar = self.calendars.get((hotel_id, room_id))
+            if calendar is not None:
+                calendar.remove(start, reservation["reservation_id"])
+
+    def find_free_rooms(self, hotel_id, check_in, check_out):
+        """Gets the rooms of a hotel without stays between two dates.
+
+        Raises ValueError if the hotel has no number of rooms.
+        """
+        start = to_day(check_in)
+        end = to_day(check_out)
+        if end <= start:
+            raise ValueError("The check-out must be after the check-in")
+        rooms = self.rooms.get(hotel_id)
+        if rooms is None:
+            raise ValueError(f"Hotel {hotel_id} has no number of rooms")
+        free_rooms = []
+        for room_id in range(1, rooms + 1):
+            calendar = self.calendars.get((hotel_id, room_id))
+            if calendar is None or calendar.find_overlap(start, end) is None:
+                free_rooms.append(room_id)
+        return free_rooms
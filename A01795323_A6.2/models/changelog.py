@@ -0,0 +1,229 @@
+"""This module contains the change feed of the json db files.
+
+The write-ahead log of a db file and its archived segments are an
+append-only, newline-delimited list of the changes, each with its
+sequence number. A segment begins with a "base" entry holding the number
+the snapshot was taken at, so a base entry after a number that wasn't
+read means the changes in between are only in the snapshot.
+
+The replay command rebuilds the records of a db file from its snapshot
+and the tail of its log, and writes them to a new compact snapshot. The
+follow command keeps a copy of a db file up to date by appending the new
+lines of its log to the copy, and copies the snapshot only when the log
+was compacted, so a service can start from the copy with a small delta.
+The prune command deletes the oldest archived segments, keeping a number
+of them or the ones with the changes after the lowest sequence number
+that a reader still needs.
+
+Run "python -m models.changelog replay db/hotels.json replica/hotels.json",
+"python -m models.changelog follow db/hotels.json replica/hotels.json" or
+"python -m models.changelog prune db/hotels.json --before-lsn=5000".
+"""
+
+import argparse
+import os
+import time
+
+from models import codec, storage
+from models.storage import JsonStore
+
+DEFAULT_INTERVAL = 0.5
+
+
+def get_model_key(file_path):
+    """Gets the primary key of the model stored in a db file."""
+    # pylint: disable=import-outside-toplevel,cyclic-import
+    from models.customer import Customer
+    from models.hotel import Hotel
+    from models.reservation import Reservation
+    for model_class in (Hotel, Customer, Reservation):
+        if os.path.basename(model_class.FILE_PATH) \
+                == os.path.basename(file_path):
+            return model_class.PRIMARY_KEY
+    raise ValueError(f"Unknown db file {file_path}, give its --key")
+
+
+def list_log_segments(file_path):
+    """Gets the paths of the archived log segments and the log, in order."""
+    wal_path = file_path + storage.WAL_EXTENSION
+    return [*storage.list_archived_logs(wal_path), wal_path]
+
+
+def read_log_lines(path, offset=0):
+    """Yields the complete lines of a log after an offset, with their ends.
+
+    A partially written last line is left for a later read.
+    """
+    try:
+        log_file = open(path, "rb")  # pylint: disable=R1732
+    except FileNotFoundError:
+        return
+    with log_file:
+        log_file.seek(offset)
+        for line in log_file:
+            if not line.endswith(b"\n"):
+                return
+            offset += len(line)
+            yield line, offset
+
+
+def read_changes(file_path, after_lsn=0):
+    """Yields the log entries of a db file after a sequence number.
+
+    The base entries are only yielded when they skip some numbers.
+    """
+    last_lsn = after_lsn
+    for path in list_log_segments(file_path):
+        for line, _ in read_log_lines(path):
+            try:
+                entry = codec.loads(line)
+            except ValueError:
+                break
+            if entry.get("lsn", 0) > last_lsn:
+                last_lsn = entry["lsn"]
+                yield entry
+
+
+def prune(file_path, keep=None, before_lsn=None):
+    """Deletes the oldest archived segments of the log of a db file.
+
+    See storage.prune_archived_logs. Returns the paths deleted.
+    """
+    return storage.prune_archived_logs(file_path + storage.WAL_EXTENSION,
+                                       keep, before_lsn)
+
+
+def replay(file_path, output_path, key, compress=None):
+    """Rebuilds the records from the snapshot and log into a new snapshot.
+
+    The new snapshot gets a log with the base entry of the number reached,
+    so it is a db file of its own. Returns the records and that number.
+    """
+    store = JsonStore(file_path, key)
+    records = store.all()
+    lsn = store.log["lsn"]
+    storage.write_atomically(output_path,
+                             storage.encode_snapshot(records, compress))
+    storage.write_atomically(
+        output_path + storage.WAL_EXTENSION,
+        codec.dumps({"op": "base", "lsn": lsn}) + b"\n")
+    return len(records), lsn
+
+
+class Follower:
+    """Copy of a db file kept up to date by tailing its log"""
+
+    def __init__(self, file_path, replica_path, key, **store_options):
+        self.file_path = file_path
+        self.replica_path = replica_path
+        self.wal = {"inode": None, "offset": 0, "snapshot": None}
+        self.copy_snapshot()
+        self.store = JsonStore(replica_path, key, **store_options)
+
+    @property
+    def replica_wal_path(self):
+        """Path of the log of the copy"""
+        return self.replica_path + storage.WAL_EXTENSION
+
+    def copy_snapshot(self):
+        """Copies the snapshot and the log, again if one was replaced."""
+        wal_path = self.file_path + storage.WAL_EXTENSION
+        while True:
+            signature = storage.get_file_signature(self.file_path)
+            wal_signature = storage.get_file_signature(wal_path)
+            try:
+                with open(self.file_path, "rb") as db_file:
+                    storage.write_atomically(self.replica_path,
+                                             db_file.read())
+            except FileNotFoundError:
+                storage.write_atomically(self.replica_path, "[]")
+            lines = list(read_log_lines(wal_path))
+            storage.write_atomically(self.replica_wal_path,
+                                     b"".join(line for line, _ in lines))
+            if storage.get_file_signature(self.file_path) == signature \
+                    and storage.get_file_signature(wal_path) \
+                    == wal_signature:
+                break
+        self.wal = {"inode": None if wal_signature is None
+                    else wal_signature[0],
+                    "offset": lines[-1][1] if lines else 0,
+                    "snapshot": signature}
+
+    def poll(self):
+        """Copies the new changes, returns the number of new log lines.
+
+        The snapshot is copied again when the log was compacted.
+        """
+        wal_path = self.file_path + storage.WAL_EXTENSION
+        wal_signature = storage.get_file_signature(wal_path)
+        if (None if wal_signature is None else wal_signature[0]) \
+                != self.wal["inode"] or self.wal["snapshot"] \
+                != storage.get_file_signature(self.file_path):
+            self.copy_snapshot()
+            self.store.refresh()
+            return self.store.log["entries"]
+        lines = list(read_log_lines(wal_path, self.wal["offset"]))
+        if lines:
+            try:
+                with open(self.replica_wal_path, "ab") as wal_file:
+                    wal_file.write(b"".join(line for line, _ in lines))
+            except OSError as e:
+                storage.handle_storage_error("Follower.poll()", e)
+            self.wal["offset"] = lines[-1][1]
+        self.store.refresh()
+        return len(lines)
+
+    def run(self, interval=DEFAULT_INTERVAL):
+        """Polls the log until the process is stopped."""
+        while True:
+            if self.poll():
+                print(f"{len(self.store.records)} records at change "
+                      f"{self.store.log['lsn']}")
+            time.sleep(interval)
+
+
+def main():
+    """Main method of the replay and follow commands"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("replay", "follow", "prune"))
+    parser.add_argument("file_path", help="db file to read")
+    parser.add_argument("output_path", nargs="?",
+                        help="db file to write, except for prune")
+    parser.add_argument("--key", help="primary key of the records")
+    parser.add_argument("--gzip", action="store_true",
+                        help="compress the snapshot written by replay")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="seconds between polls of the log")
+    parser.add_argument("--keep", type=int,
+                        help="archived segments kept by prune")
+    parser.add_argument("--before-lsn", type=int,
+                        help="prune the segments with no change after it")
+    arguments = parser.parse_args()
+    if arguments.command == "prune":
+        if arguments.keep is None and arguments.before_lsn is None:
+            parser.error("prune needs --keep or --before-lsn")
+        deleted = prune(arguments.file_path, arguments.keep,
+                        arguments.before_lsn)
+        print(f"{len(deleted)} archived segments of {arguments.file_path} "
+              f"deleted")
+        return
+    if arguments.output_path is None:
+        parser.error(f"{arguments.command} needs an output_path")
+    key = arguments.key or get_model_key(arguments.file_path)
+    if arguments.command == "replay":
+        start_time = time.perf_counter()
+        records, lsn = replay(arguments.file_path, arguments.output_path,
+                              key, arguments.gzip or None)
+        print(f"{records} records at change {lsn} written to "
+              f"{arguments.output_path} in "
+              f"{time.perf_counter() - start_time:.2f} s")
+    else:
+        try:
+            Follower(arguments.file_path, arguments.output_path,
+                     key).run(arguments.interval)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""This module contains the codecs of the db files and the sales files.
+
+The json codec uses orjson when it is installed, and the json module of
+the standard library otherwise, or when orjson can't encode a value. The
+output is compact, and only the export to json is indented.
+
+The db files can also use binary formats, written after a short header
+that identifies them, so a file is decoded without knowing its format:
+
+    "records"  each record as compact json after its length in 4 bytes,
+               so the records can be read one at a time
+    "msgpack"  MessagePack, when the msgpack package is installed
+
+Run "python -m models.codec input output [--format F] [--pretty]" to
+convert a file between formats, or to export it as indented json.
+"""
+
+import argparse
+import json
+import struct
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+RECORDS_HEADER = b"HREC\x01\n"
+MSGPACK_HEADER = b"HMPK\x01\n"
+RECORD_LENGTH = struct.Struct("<I")
+FORMATS = ("json", "records", "msgpack")
+
+
+def get_json_library():
+    """Gets the name of the library used to encode and decode json."""
+    return "stdlib" if orjson is None else "orjson"
+
+
+def dumps(value, pretty=False):
+    """Encodes a value as json bytes, indented by 4 spaces if pretty."""
+    if pretty:
+        return json.dumps(value, indent=4, ensure_ascii=False).encode("UTF-8")
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)  # pylint: disable=no-member
+        except TypeError:
+            pass
+    return json.dumps(value, separators=(",", ":"),
+                      ensure_ascii=False).encode("UTF-8")
+
+
+def loads(data):
+    """Decodes json bytes or text."""
+    if orjson is not None:
+        return orjson.loads(data)  # pylint: disable=no-member
+    return json.loads(data)
+
+
+def check_format(file_format):
+    """Checks that a format is known and its library is installed."""
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format {file_format}, "
+                         f"expected one of {FORMATS}")
+    if file_format == "msgpack" and msgpack is None:
+        raise ValueError("The msgpack format needs the msgpack package")
+
+
+def encode(value, file_format="json", pretty=False):
+    """Encodes a value, or a list of records, in a format."""
+    check_format(file_format)
+    if file_format == "records":
+        return RECORDS_HEADER + b"".join(
+            RECORD_LENGTH.pack(len(data)) + data
+            for data in map(dumps, value))
+    if file_format == "msgpack":
+        return MSGPACK_HEADER + msgpack.packb(value)
+    return dumps(value, pretty)
+
+
+def iterate_records(data):
+    """Yields the records of data in the records format."""
+    position = len(RECORDS_HEADER)
+    while position < len(data):
+        (size,) = RECORD_LENGTH.unpack_from(data, position)
+        position += RECORD_LENGTH.size
+        if position + size > len(data):
+            raise ValueError("Truncated record at the end of the data")
+        yield loads(data[position:position + size])
+        position += size
+
+
+def decode(data):
+    """Decodes data of any format, found from its header."""
+    if data.startswith(RECORDS_HEADER):
+        return list(iterate_records(data))
+    if data.startswith(MSGPACK_HEADER):
+        check_format("msgpack")
+        return msgpack.unpackb(data[len(MSGPACK_HEADER):])
+    return loads(data)
+
+
+def read_file(file_path):
+    """Reads and decodes a file of any format."""
+    with open(file_path, "rb") as data_file:
+        return decode(data_file.read())
+
+
+def write_file(file_path, value, file_format="json", pretty=False):
+    """Encodes a value in a format and writes it to a file."""
+    data = encode(value, file_format, pretty)
+    with open(file_path, "wb") as data_file:
+        data_file.write(data)
+
+
+def main():
+    """Main method to convert or export a file"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input_path")
+    parser.add_argument("output_path")
+    parser.add_argument("--format", choices=FORMATS, default="json")
+    parser.add_argument("--pretty", action="store_true",
+                        help="indent the json output")
+    arguments = parser.parse_args()
+    write_file(arguments.output_path, read_file(arguments.input_path),
+               arguments.format, arguments.pretty)
+
+
+if __name__ == '__main__':
+    main()
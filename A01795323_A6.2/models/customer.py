@@ -1,14 +1,20 @@
 """This model contains the Customer class and its CRUD methods"""
 
-import json
 import os
-import sys
 
+from models import storage
+from models.messages import report
+from models.record import Record
 
-class Customer:
+
+class Customer(Record):
     """This class represents a Hotel's customer and all the CRUD actions"""
     BASE_DIR = os.path.dirname(os.path.abspath("main.py"))
     FILE_PATH = os.path.join(BASE_DIR, "db", "customers.json")
+    PRIMARY_KEY = "customer_id"
+    FIELDS = ("customer_id", "name", "phone", "address", "credit_card")
+    INDEXED_FIELDS = ()
+    __slots__ = FIELDS
 
     def __init__(self, customer_data):
         self.customer_id = customer_data['customer_id']
@@ -16,71 +22,89 @@ class Customer:
         self.phone = customer_data['phone']
         self.address = customer_data['address']
         self.credit_card = customer_data['credit_card']
+        self._extra = None
 
-    def map_to_dict(self):
-        """Creates a dictionary representation of an object"""
-        return self.__dict__
+    @classmethod
+    def store(cls):
+        """Gets the storage engine of the customers records"""
+        return storage.get_store(cls.FILE_PATH, cls.PRIMARY_KEY,
+                                 cls.FIELDS, cls.INDEXED_FIELDS,
+                                 record_type=cls)
 
     @classmethod
     def create(cls, customer):
         """Add a customer to the customers.json file"""
-        all_customers = cls.load()
-        all_customers.append(customer.map_to_dict())
-        cls.save(all_customers)
-        print(f"Customer {customer.name} created successfully")
+        cls.store().insert(customer.map_to_dict())
+        report(f"Customer {customer.name} created successfully")
+
+    @classmethod
+    def create_many(cls, customers):
+        """Adds several customers to the customers.json file at once"""
+        customers = list(customers)
+        cls.store().insert_many(customer.map_to_dict()
+                                for customer in customers)
+        report(f"{len(customers)} customers created successfully")
+
+    @classmethod
+    def transaction(cls):
+        """Groups customer changes that are saved together or not at all"""
+        return cls.store().transaction()
 
     @classmethod
     def save(cls, customers):
         """Receives a list of customers and stores them in a json file"""
-        try:
-            with open(cls.FILE_PATH, "w", encoding="UTF-8") as db_file:
-                json.dump(customers, db_file, indent=4)
-        except (IOError, FileNotFoundError) as e:
-            print(f"Exception in Customer.save(): {e.strerror}")
-            sys.exit(1)
+        cls.store().replace_all(customers)
 
     @classmethod
     def load(cls):
         """Loads all the customers stored in customers.json file"""
-        try:
-            if not os.path.exists(cls.FILE_PATH):
-                return []
-            with open(cls.FILE_PATH, "r", encoding="UTF-8") as db_file:
-                return json.load(db_file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            print("Exception in load(): Invalid Customer DB file")
-            return []
+        return cls.store().all()
+
+    @classmethod
+    def delete_customers(cls, customer_ids):
+        """Removes customers applying the ON_DELETE rule of reservations
+
+        Returns the number of removed customers. The reservations are
+        deleted first (see Reservation.delete_references).
+        """
+        # pylint: disable-next=import-outside-toplevel,cyclic-import
+        from models.reservation import Reservation
+        if not Reservation.delete_references("customer_id", customer_ids):
+            return 0
+        return cls.store().delete_many(customer_ids)
 
     @classmethod
     def delete(cls, customer_id):
         """Removes a customer by id"""
-        all_customers = cls.load()
-        updated_list = [c for c in all_customers
-                        if c['customer_id'] != customer_id]
-        cls.save(updated_list)
+        return cls.delete_customers([customer_id]) > 0
+
+    @classmethod
+    def delete_where(cls, predicate):
+        """Removes the customers for which a function returns True"""
+        return cls.delete_customers([customer[cls.PRIMARY_KEY]
+                                     for customer in cls.load()
+                                     if predicate(customer)])
 
     @classmethod
     def edit(cls, customer_id, field_name, value):
         """Edits a customer attribute by customer id"""
-        all_customers = cls.load()
-        for customer in all_customers:
-            if customer['customer_id'] == customer_id:
-                customer[field_name] = value
-                cls.save(all_customers)
-                return True
-        return False
+        return cls.store().update(customer_id, {field_name: value})
+
+    @classmethod
+    def edit_many(cls, changes_by_id):
+        """Edits several attributes of several customers by customer id"""
+        return cls.store().update_many(changes_by_id)
 
     @classmethod
     def display(cls, customer_id):
         """Displays all the customer information in the console"""
-        all_customers = cls.load()
-        for customer in all_customers:
-            if customer['customer_id'] == customer_id:
-                print(f"ID: {customer['customer_id']}"
-                      f" | Name: {customer['name']}"
-                      f" | Phone: {customer['phone']}"
-                      f" | Address: {customer['address']}"
-                      f" | Credit Card: {customer['credit_card']}")
-                return True
+        customer = cls.store().get(customer_id)
+        if customer is not None:
+            print(f"ID: {customer['customer_id']}"
+                  f" | Name: {customer['name']}"
+                  f" | Phone: {customer['phone']}"
+                  f" | Address: {customer['address']}"
+                  f" | Credit Card: {customer['credit_card']}")
+            return True
         print(f"Customer with ID {customer_id} not found")
         return False
@@ -1,14 +1,22 @@
 """This module contains a Hotel class and all its CRUD actions"""
 
-import json
 import os
-import sys
 
+from models import storage
+from models.messages import report
+from models.record import Record
 
-class Hotel:
+
+class Hotel(Record):  # pylint: disable=too-many-instance-attributes
     """Represents a Hotel and all its CRUD actions"""
     BASE_DIR = os.path.dirname(os.path.abspath("main.py"))
     FILE_PATH = os.path.join(BASE_DIR, "db", "hotels.json")
+    PRIMARY_KEY = "hotel_id"
+    FIELDS = ("hotel_id", "name", "country", "address", "phone",
+              "category", "reserved_rooms", "rooms")
+    INDEXED_FIELDS = ("name", "country", "category", ("country", "category"))
+    SORTED_FIELDS = ("name",)
+    __slots__ = FIELDS
 
     def __init__(self, hotel_data):
         self.hotel_id = hotel_data['hotel_id']
@@ -18,84 +26,86 @@ class Hotel:
         self.phone = hotel_data['phone']
         self.category = hotel_data['category']
         self.reserved_rooms = hotel_data['reserved_rooms']
+        self.rooms = hotel_data.get('rooms')
+        self._extra = None
 
-    def map_to_dict(self):
-        """Creates a dictionary representation of an object"""
-        return self.__dict__
+    @classmethod
+    def store(cls):
+        """Gets the storage engine of the hotels records"""
+        return storage.get_store(cls.FILE_PATH, cls.PRIMARY_KEY,
+                                 cls.FIELDS, cls.INDEXED_FIELDS,
+                                 record_type=cls,
+                                 sorted_fields=cls.SORTED_FIELDS)
 
     @classmethod
     def save(cls, hotels):
         """Receives a list of hotels and stores them in a json file"""
-        try:
-            with open(cls.FILE_PATH, "w", encoding="UTF-8") as db_file:
-                json.dump(hotels, db_file, indent=4)
-        except (IOError, FileNotFoundError) as e:
-            print(f"Exception in Hotel.save(): {e.strerror}")
-            sys.exit(1)
+        cls.store().replace_all(hotels)
 
     @classmethod
     def reserve_room(cls, hotel_id):
         """Reserves a hotel's room"""
-        all_hotels = cls.load()
-        for hotel in all_hotels:
-            if hotel['hotel_id'] == hotel_id:
-                hotel['reserved_rooms'] = hotel['reserved_rooms'] + 1
-                cls.save(all_hotels)
-                return True
-        return False
+        return cls.store().update_with(
+            hotel_id,
+            lambda hotel: {'reserved_rooms': hotel['reserved_rooms'] + 1})
 
     @classmethod
     def cancel_reservation(cls, hotel_id):
         """Cancels a hotel's reservation"""
-        all_hotels = cls.load()
-        for hotel in all_hotels:
-            if hotel['hotel_id'] == hotel_id:
-                hotel['reserved_rooms'] = hotel['reserved_rooms'] - 1
-                if hotel['reserved_rooms'] < 0:
-                    hotel['reserved_rooms'] = 0
-                cls.save(all_hotels)
-                return True
-        return False
+        return cls.store().update_with(
+            hotel_id,
+            lambda hotel: {
+                'reserved_rooms': max(hotel['reserved_rooms'] - 1, 0)})
 
     @classmethod
     def create(cls, hotel):
         """Add a hotel to the hotels.json file"""
-        all_hotels = cls.load()
-        all_hotels.append(hotel.map_to_dict())
-        cls.save(all_hotels)
-        print(f"Hotel {hotel.name} created successfully")
+        cls.store().insert(hotel.map_to_dict())
+        report(f"Hotel {hotel.name} created successfully")
+
+    @classmethod
+    def create_many(cls, hotels):
+        """Adds several hotels to the hotels.json file in a single write"""
+        hotels = list(hotels)
+        cls.store().insert_many(hotel.map_to_dict() for hotel in hotels)
+        report(f"{len(hotels)} hotels created successfully")
+
+    @classmethod
+    def transaction(cls):
+        """Groups hotel changes that are saved together or not at all"""
+        return cls.store().transaction()
 
     @classmethod
     def load(cls):
         """Loads all the hotels stored in hotels.json file"""
-        if not os.path.exists(cls.FILE_PATH):
-            return []
-        try:
-            with open(cls.FILE_PATH, "r", encoding="UTF-8") as db_file:
-                return json.load(db_file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            print("Exception in load(): Invalid Hotel DB file")
-            return []
+        return cls.store().all()
 
     @classmethod
     def modify(cls, hotel_id, field_to_modify, value):
         """Modifies a hotel field by its hotel id"""
-        all_hotels = cls.load()
-        for hotel in all_hotels:
-            if hotel['hotel_id'] == hotel_id:
-                hotel[field_to_modify] = value
-                cls.save(all_hotels)
-                return True
-        return False
+        return cls.store().update(hotel_id, {field_to_modify: value})
+
+    @classmethod
+    def modify_many(cls, changes_by_id):
+        """Modifies several fields of several hotels by their hotel ids"""
+        return cls.store().update_many(changes_by_id)
 
     @classmethod
     def search_by(cls, field_name, value):
-        """Searches a hotel by a given field name"""
-        all_hotels = cls.load()
-        for hotel in all_hotels:
-            if hotel[field_name] == value:
-                return hotel
-        return "Hotel not found"
+        """Searches a hotel by a given field name, returns None if missing"""
+        return next(cls.store().search([(field_name, "=", value)], limit=1),
+                    None)
+
+    @classmethod
+    def search(cls, predicates, order_by=None, offset=0, limit=None):
+        """Gets an iterator of the hotels matching some predicates
+
+        For example, the first 10 hotels of a country and category with a
+        name starting with "Hy", sorted by name:
+        Hotel.search([("country", "=", "México"), ("category", "=", "5"),
+                      ("name", "prefix", "Hy")], order_by="name", limit=10)
+        """
+        return cls.store().search(predicates, order_by, offset, limit)
 
     @classmethod
     def display_by_name(cls, name):
@@ -110,7 +120,7 @@ class Hotel:
     @classmethod
     def display(cls, hotel):
         """Displays a hotel's information in the console"""
-        if hotel == "not found" or hotel is None:
+        if hotel is None:
             print("No hotel information was found!")
             return False
         print(f"ID: {hotel['hotel_id']}"
@@ -128,10 +138,34 @@ class Hotel:
         for hotel in all_hotels:
             cls.display(hotel)
 
+    @classmethod
+    def delete_hotels(cls, hotel_ids):
+        """Deletes hotels applying the ON_DELETE rule of their reservations
+
+        Returns the number of deleted hotels. The reservations are deleted
+        first (see Reservation.delete_references).
+        """
+        # pylint: disable-next=import-outside-toplevel,cyclic-import
+        from models.reservation import Reservation
+        if not Reservation.delete_references("hotel_id", hotel_ids):
+            return 0
+        return cls.store().delete_many(hotel_ids)
+
     @classmethod
     def delete_by(cls, field_name, value):
         """Deletes a hotel by a given field name"""
-        all_hotels = cls.load()
-        update_list = [h for h in all_hotels if h[field_name] != value]
-        cls.save(update_list)
-        print(f"Hotel with {field_name}: {value} was deleted")
+        hotels = cls.store().find(field_name, value)
+        if hotels and not cls.delete_hotels(
+                [hotel[cls.PRIMARY_KEY] for hotel in hotels]):
+            return False
+        report(f"Hotel with {field_name}: {value} was deleted")
+        return True
+
+    @classmethod
+    def delete_where(cls, predicate):
+        """Deletes the hotels for which a function returns True"""
+        deleted = cls.delete_hotels([hotel[cls.PRIMARY_KEY]
+                                     for hotel in cls.load()
+                                     if predicate(hotel)])
+        report(f"{deleted} hotels were deleted")
+        return deleted
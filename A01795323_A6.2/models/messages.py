@@ -0,0 +1,43 @@
+"""This module contains the messages reported by the model methods.
+
+The messages are printed in the console, unless the thread that runs the
+model methods collects them, like the HTTP service does to return them in
+its responses. Each thread collects its own messages, so the console and
+the messages of other threads are left alone.
+"""
+
+import contextlib
+import threading
+
+
+class CollectedMessages(threading.local):  # pylint: disable=R0903
+    """Messages collected by a thread, or None if they are printed"""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = None
+
+
+_collected = CollectedMessages()
+
+
+def report(message):
+    """Prints a message, or keeps it if the thread collects its messages."""
+    if _collected.messages is None:
+        print(message)
+    else:
+        _collected.messages.append(message)
+
+
+@contextlib.contextmanager
+def collect_messages():
+    """Context manager that keeps the messages reported by the thread.
+
+    It yields the list of messages, which grows while it runs.
+    """
+    previous = _collected.messages
+    _collected.messages = []
+    try:
+        yield _collected.messages
+    finally:
+        _collected.messages = previous
@@ -0,0 +1,124 @@
+"""This module contains the searches of the stores of the models.
+
+A search has a list of predicates (field name, operator, value) that a
+record must all match, where the operator is "=" or "prefix", a field to
+sort by, with a "-" before it for descending order, and an offset and a
+limit to get a page of the results. The records are returned by an
+iterator, so only the records of the page are ever copied.
+
+Fields with a sorted index keep their text values in order, so a prefix
+is a range of the index found with a binary search, and a search sorted
+by the field reads the index in order instead of sorting the records.
+"""
+
+import bisect
+import heapq
+import itertools
+
+OPERATORS = ("=", "prefix")
+
+
+def parse_search(predicates, order_by):
+    """Validates a search, returns the field to sort by and its order."""
+    for predicate in predicates:
+        if len(predicate) != 3 or predicate[1] not in OPERATORS:
+            raise ValueError(f"Invalid predicate {predicate}, expected "
+                             f"(field name, one of {OPERATORS}, value)")
+    if order_by is None:
+        return None, False
+    return order_by.lstrip("-"), order_by.startswith("-")
+
+
+def get_prefix_end(prefix):
+    """Gets the first string after all the strings with a prefix, or None."""
+    prefix = prefix.rstrip(chr(0x10FFFF))
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def matches(record, predicates):
+    """Checks if a record matches all the predicates."""
+    for field_name, operator, value in predicates:
+        field_value = record.get(field_name)
+        if operator == "=":
+            if field_value != value:
+                return False
+        elif not isinstance(field_value, str) \
+                or not field_value.startswith(value):
+            return False
+    return True
+
+
+def get_sort_key(field_name):
+    """Gets the sort key of a field, with the empty values last."""
+    def sort_key(record):
+        value = record.get(field_name)
+        return value is None, value
+    return sort_key
+
+
+def sort_records(records, field_name, descending, count=None):
+    """Sorts records by a field, keeping only the first ones if counted."""
+    sort_key = get_sort_key(field_name)
+    if count is None:
+        return sorted(records, key=sort_key, reverse=descending)
+    if descending:
+        return heapq.nlargest(count, records, key=sort_key)
+    return heapq.nsmallest(count, records, key=sort_key)
+
+
+def paginate(records, offset, limit):
+    """Gets an iterator of a page of records."""
+    return itertools.islice(records, offset,
+                            None if limit is None else offset + limit)
+
+
+class SortedIndex:
+    """Primary keys of the records sorted by the text value of a field"""
+
+    def __init__(self):
+        self.values = []
+        self.keys = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def build(self, items):
+        """Replaces the index with the (value, key) pairs of some records."""
+        items = sorted(((value, key) for value, key in items
+                        if isinstance(value, str)), key=lambda item: item[0])
+        self.values = [value for value, _ in items]
+        self.keys = [key for _, key in items]
+
+    def add(self, value, key):
+        """Adds the value of a record."""
+        if isinstance(value, str):
+            i = bisect.bisect_right(self.values, value)
+            self.values.insert(i, value)
+            self.keys.insert(i, key)
+
+    def remove(self, value, key):
+        """Removes the value of a record."""
+        if not isinstance(value, str):
+            return
+        i = bisect.bisect_left(self.values, value)
+        while i < len(self.values) and self.values[i] == value:
+            if self.keys[i] == key:
+                del self.values[i]
+                del self.keys[i]
+                return
+            i += 1
+
+    def find_range(self, prefix=""):
+        """Gets the positions of the values with a prefix."""
+        end = get_prefix_end(prefix)
+        return (bisect.bisect_left(self.values, prefix),
+                len(self.values) if end is None
+                else bisect.bisect_left(self.values, end))
+
+    def iterate(self, start, end, descending=False):
+        """Gets an iterator of the keys between two positions."""
+        if descending:
+            return (self.keys[i] for i in range(end - 1, start - 1, -1))
+        return (self.keys[i] for i in range(start, end))
@@ -0,0 +1,96 @@
+"""This module contains the base class of the model records.
+
+The fields of a record are stored in slots instead of a __dict__. With
+100k records of benchmark_records.py, a hotel takes 521 bytes instead of
+769 and a reservation 372 bytes instead of 620, a third to two fifths
+less, most of the rest being the values of the fields. Fields outside the
+declared ones are kept in a small dictionary that only exists when they
+are used.
+
+Loading the records takes about 1.8 times as long as loading the
+dictionaries, since every decoded dictionary becomes a record. Every model
+gets a function that creates a record assigning all its slots from a
+dictionary, used when the dictionary has exactly the declared fields.
+"""
+
+_MISSING = object()
+
+
+def compile_create_record(record_type):
+    """Creates a function that creates a record from a dictionary.
+
+    It raises KeyError if the dictionary lacks one of the fields.
+    """
+    lines = [f"    record.{name} = data[{name!r}]\n"
+             for name in record_type.FIELDS]
+    namespace = {"new": record_type.__new__, "record_type": record_type}
+    exec(  # pylint: disable=exec-used
+        "def create_record(data):\n"
+        "    record = new(record_type)\n" + "".join(lines)
+        + "    record._extra = None\n"
+        "    return record\n", namespace)
+    return namespace["create_record"]
+
+
+class Record:  # pylint: disable=attribute-defined-outside-init
+    """Base of the models whose fields are declared in FIELDS"""
+    __slots__ = ("_extra",)
+    FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._create_record = staticmethod(compile_create_record(cls))
+
+    @classmethod
+    def from_dict(cls, data):
+        """Creates a record from a dictionary without copying it."""
+        if len(data) == len(cls.FIELDS):
+            try:
+                return cls._create_record(data)
+            except KeyError:
+                pass
+        record = cls.__new__(cls)
+        record._extra = None
+        for name, value in data.items():
+            try:
+                setattr(record, name, value)
+            except AttributeError:
+                record.update({name: value})
+        return record
+
+    @classmethod
+    def validate(cls, data):
+        """Raises ValueError if the data of a new record is invalid."""
+
+    def to_dict(self):
+        """Creates a dictionary with the fields of the record."""
+        data = {}
+        for name in self.FIELDS:
+            value = getattr(self, name, _MISSING)
+            if value is not _MISSING:
+                data[name] = value
+        extra = getattr(self, "_extra", None)
+        if extra:
+            data.update(extra)
+        return data
+
+    def map_to_dict(self):
+        """Creates a dictionary representation of an object"""
+        return self.to_dict()
+
+    def get(self, name, default=None):
+        """Gets the value of a field, or a default if it isn't set."""
+        if name in self.FIELDS:
+            return getattr(self, name, default)
+        extra = getattr(self, "_extra", None)
+        return default if extra is None else extra.get(name, default)
+
+    def update(self, changes):
+        """Sets the values of several fields."""
+        for name, value in changes.items():
+            if name in self.FIELDS:
+                setattr(self, name, value)
+            else:
+                if getattr(self, "_extra", None) is None:
+                    self._extra = {}
+                self._extra[name] = value
@@ -1,16 +1,43 @@
 """This module contains a class Reservation"""
 
-import json
 import os
-import sys
+import threading
 
+from models import storage
+from models.availability import AvailabilityIndex, check_stay
+from models.customer import Customer
+from models.hotel import Hotel
+from models.messages import report
+from models.record import Record
 
-class Reservation:
+
+class AvailabilityCache(threading.local):  # pylint: disable=R0903
+    """Availability index of a thread and the generation it was built from
+
+    A write changes the index of its thread, so another thread reading
+    the rooms at the same time never sees a half-booked index.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.generation = None
+        self.index = None
+
+
+class Reservation(Record):  # pylint: disable=too-many-instance-attributes
     """Represents a Hotel's reservation and its Create and Delete methods"""
     BASE_DIR = os.path.dirname(os.path.abspath("main.py"))
     FILE_PATH = os.path.join(BASE_DIR, "db", "reservations.json")
+    PRIMARY_KEY = "reservation_id"
+    FIELDS = ("reservation_id", "customer_id", "hotel_id", "room_id",
+              "nights", "price_per_night", "check_in", "check_out")
+    INDEXED_FIELDS = ("customer_id", "hotel_id")
+    FOREIGN_KEYS = (("customer_id", Customer), ("hotel_id", Hotel))
+    ON_DELETE = "cascade"
+    __slots__ = FIELDS
     CUSTOMERS_FILE_PATH = os.path.join(BASE_DIR, "db", "customers.json")
     HOTELS_FILE_PATH = os.path.join(BASE_DIR, "db", "hotels.json")
+    _availability = AvailabilityCache()
 
     def __init__(self, reservation_data):
         self.reservation_id = reservation_data['reservation_id']
@@ -19,46 +46,184 @@ class Reservation:
         self.room_id = reservation_data['room_id']
         self.nights = reservation_data['nights']
         self.price_per_night = reservation_data['price_per_night']
+        self.check_in = reservation_data.get('check_in')
+        self.check_out = reservation_data.get('check_out')
+        self._extra = None
+
+    @classmethod
+    def store(cls):
+        """Gets the storage engine of the reservations records"""
+        return storage.get_store(cls.FILE_PATH, cls.PRIMARY_KEY,
+                                 cls.FIELDS, cls.INDEXED_FIELDS,
+                                 record_type=cls)
 
     @classmethod
     def load(cls):
         """Loads all the reservations stored in reservations.json file"""
-        if not os.path.exists(cls.FILE_PATH):
-            print("Reservation path is not found")
-            return []
-        try:
-            with open(cls.FILE_PATH, "r", encoding="UTF-8") as db_file:
-                return json.load(db_file)
-        except FileNotFoundError:
-            return []
+        return cls.store().all()
+
+    @classmethod
+    def get_generation(cls):
+        """Gets the generations of the hotels and reservations records"""
+        return Hotel.store().generation(), cls.store().generation()
 
-    def map_to_dict(self):
-        """Creates a dictionary representation of an object"""
-        return self.__dict__
+    @classmethod
+    def availability(cls):
+        """Gets the room availability index, rebuilt if the DB changed"""
+        generation = cls.get_generation()
+        if cls._availability.generation != generation:
+            cls._availability.generation = generation
+            cls._availability.index = AvailabilityIndex(Hotel.load(),
+                                                        cls.load())
+        return cls._availability.index
+
+    @classmethod
+    def find_free_rooms(cls, hotel_id, check_in, check_out):
+        """Gets the rooms of a hotel that are free between two dates"""
+        return cls.availability().find_free_rooms(hotel_id, check_in,
+                                                  check_out)
+
+    @classmethod
+    def validate(cls, data):
+        """Raises ValueError if a reservation has no valid stay"""
+        check_stay(data)
+
+    @classmethod
+    def book_rooms(cls, records):
+        """Adds the stays of new reservations to the availability index
+
+        Returns False without booking any room if a stay is missing or
+        invalid, its room isn't one of the rooms of its hotel, or it
+        overlaps another reservation of its room.
+        """
+        index = cls.availability()
+        for record in records:
+            previous = cls.store().get(record['reservation_id'])
+            if previous is not None:
+                index.remove(previous)
+            try:
+                cls.validate(record)
+                index.check_room(record)
+                conflict = index.find_conflict(record)
+            except ValueError as e:
+                report(f"Invalid reservation {record['reservation_id']}: {e}")
+                cls._availability.generation = None
+                return False
+            if conflict is not None:
+                report(f"Room {record['room_id']} of hotel "
+                       f"{record['hotel_id']} is already booked by "
+                       f"reservation {conflict}")
+                cls._availability.generation = None
+                return False
+            index.add(record)
+        return True
+
+    @classmethod
+    def check_references(cls, records):
+        """Checks that the customers and hotels of reservations exist"""
+        for record in records:
+            for field_name, model in cls.FOREIGN_KEYS:
+                if model.store().get(record[field_name]) is None:
+                    report(f"{model.__name__} {record[field_name]} of "
+                           f"reservation {record['reservation_id']} "
+                           f"not found")
+                    return False
+        return True
+
+    @classmethod
+    def delete_references(cls, field_name, keys):
+        """Applies the ON_DELETE rule to the reservations of deleted keys
+
+        With "cascade", the reservations are cancelled. With "restrict",
+        returns False if there are reservations, and nothing is deleted.
+        It runs before the keys are deleted, in a separate write: if the
+        keys can't be deleted after it, they are left without reservations
+        and deleting them again finishes the delete, so no reservation is
+        left without its customer or hotel.
+        """
+        reservation_ids = [reservation['reservation_id'] for key in keys
+                           for reservation in cls.store().find(field_name,
+                                                               key)]
+        if not reservation_ids:
+            return True
+        if cls.ON_DELETE == "restrict":
+            report(f"Can't delete {field_name} {', '.join(map(str, keys))}, "
+                   f"there are {len(reservation_ids)} reservations")
+            return False
+        cls._delete(reservation_ids)
+        return True
+
+    @classmethod
+    def _insert(cls, reservations):
+        """Stores new reservations if their references and rooms are valid"""
+        records = [reservation.map_to_dict() for reservation in reservations]
+        with cls.transaction():
+            if not cls.check_references(records) \
+                    or not cls.book_rooms(records):
+                return False
+            cls.store().insert_many(records)
+            cls._availability.generation = cls.get_generation()
+        return True
 
     @classmethod
     def create(cls, reservation):
-        """Creates a new reservation"""
-        all_reservations = cls.load()
-        all_reservations.append(reservation.map_to_dict())
-        cls.save(all_reservations)
-        print("A new reservation has been created")
+        """Creates a new reservation if its room is free on its dates"""
+        if not cls._insert([reservation]):
+            return False
+        report("A new reservation has been created")
+        return True
+
+    @classmethod
+    def create_many(cls, reservations):
+        """Creates several reservations in a single write
+
+        No reservation is created if any of their rooms isn't free.
+        """
+        if not cls._insert(reservations):
+            return False
+        report(f"{len(reservations)} reservations have been created")
+        return True
+
+    @classmethod
+    def transaction(cls):
+        """Groups reservation changes saved together or not at all"""
+        return cls.store().transaction()
 
     @classmethod
     def save(cls, reservations):
         """Saves all the reservations in a json file"""
-        try:
-            with open(cls.FILE_PATH, "w", encoding="UTF-8") as db_file:
-                json.dump(reservations, db_file, indent=4)
-        except (IOError, FileNotFoundError) as e:
-            print(f"Exception in Reservation.save(): {e.strerror}")
-            sys.exit(1)
+        cls.store().replace_all(reservations)
+
+    @classmethod
+    def _delete(cls, reservation_ids):
+        """Deletes reservations and frees their rooms"""
+        with cls.transaction():
+            index = cls.availability()
+            records = [cls.store().get(reservation_id)
+                       for reservation_id in reservation_ids]
+            deleted = cls.store().delete_many(reservation_ids)
+            for record in records:
+                if record is not None:
+                    index.remove(record)
+            cls._availability.generation = cls.get_generation()
+        return deleted
 
     @classmethod
     def cancel(cls, reservation_id):
         """Cancels a hotel reservation"""
-        all_reservations = cls.load()
-        updated_list = [r for r in all_reservations
-                        if r['reservation_id'] != reservation_id]
-        cls.save(updated_list)
-        print(f"Reservation {reservation_id} has been cancelled")
+        cls._delete([reservation_id])
+        report(f"Reservation {reservation_id} has been cancelled")
+
+    @classmethod
+    def cancel_many(cls, reservation_ids):
+        """Cancels several hotel reservations"""
+        cancelled = cls._delete(reservation_ids)
+        report(f"{cancelled} reservations have been cancelled")
+        return cancelled
+
+    @classmethod
+    def delete_where(cls, predicate):
+        """Cancels the reservations for which a function returns True"""
+        return cls._delete([reservation['reservation_id']
+                            for reservation in cls.load()
+                            if predicate(reservation)])
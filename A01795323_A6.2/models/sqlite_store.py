@@ -0,0 +1,400 @@
+"""This module contains the SQLite storage engine of the models.
+
+Every model is a table of the same database file, with its primary key and
+the declared secondary indexes, so searches by an indexed field are index
+lookups instead of scans. Statements are built once per store with "?"
+parameters, so the connection reuses their compiled form, and a single
+connection is opened per process and thread, so a thread reads the last
+commit while another one writes. When a table is created, the records of
+the json file of the model are imported into it.
+
+SQLite itself serializes the writes of several processes. The version of a
+record is kept in a hidden column, set on every write to the next value of
+a table-wide counter, so a version is never reused by a later change.
+A transaction is a SQLite transaction of the connection.
+
+The decoded results of the reads are cached until the data version of
+the database or the writes of the store change them.
+
+Run "python -m models.sqlite_store" to import the db/*.json files again.
+"""
+
+import contextlib
+import os
+import re
+import sqlite3
+import threading
+
+from models import query, storage
+
+DB_FILE_NAME = "hotel_system.sqlite3"
+VERSION_COLUMN = "_version"
+BUSY_TIMEOUT = 30
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+
+_connections = threading.local()
+
+
+def get_connection(db_path):
+    """Gets the connection of this thread to a database, opened only once."""
+    pid, connection = vars(_connections).get(db_path, (None, None))
+    if pid != os.getpid():
+        try:
+            connection = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error as e:
+            handle_sqlite_error("get_connection()", e)
+        vars(_connections)[db_path] = (os.getpid(), connection)
+    return connection
+
+
+def close_connection(db_path):
+    """Closes the connection to a database if this thread opened it."""
+    pid, connection = vars(_connections).pop(db_path, (None, None))
+    if pid == os.getpid():
+        connection.close()
+
+
+def handle_sqlite_error(context, error):
+    """Reports an error of the database as a StorageError."""
+    raise storage.StorageError(f"Exception in {context}: {error}") \
+        from error
+
+
+def quote(name):
+    """Quotes a table or column name, rejecting unsafe names."""
+    if not IDENTIFIER.match(name):
+        raise ValueError(f"Invalid field name {name}")
+    return f'"{name}"'
+
+
+class SqliteStore(storage.Repository):  # pylint: disable=R0902,R0904
+    """Records of a model stored in a table of a SQLite database"""
+
+    def __init__(self, file_path, key, fields=(), indexed_fields=()):
+        self.db_path = os.path.join(os.path.dirname(file_path), DB_FILE_NAME)
+        super().__init__(key)
+        self.table = os.path.splitext(os.path.basename(file_path))[0]
+        self.columns = []
+        self._writes = 0
+        self.cache = storage.RecordCache()
+        table = quote(self.table)
+        self.statements = {
+            "all": f"SELECT * FROM {table} ORDER BY rowid",
+            "get": f"SELECT * FROM {table} WHERE {quote(key)} = ?",
+            "delete": f"DELETE FROM {table} WHERE {quote(key)} = ?",
+            "version": f"(SELECT coalesce(max({quote(VERSION_COLUMN)}), 0) "
+                       f"+ 1 FROM {table})"}
+        if self.create_table(fields, indexed_fields) \
+                and os.path.exists(file_path):
+            self.replace_all(storage.JsonStore(file_path, key).all())
+
+    def create_table(self, fields, indexed_fields):
+        """Creates the table and its indexes, returns True if it was new."""
+        table = quote(self.table)
+        is_new = False
+        try:
+            with self.connection:
+                is_new = not self.connection.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                    "AND name = ?", (self.table,)).fetchone()
+                if is_new:
+                    self.connection.execute(
+                        f"CREATE TABLE {table} "
+                        f"({quote(self.key)} PRIMARY KEY NOT NULL)")
+                self._read_columns()
+                if VERSION_COLUMN not in self.columns:
+                    self.connection.execute(
+                        f"ALTER TABLE {table} ADD COLUMN "
+                        f"{quote(VERSION_COLUMN)} INTEGER NOT NULL DEFAULT 0")
+                    self.columns.append(VERSION_COLUMN)
+                indexed_fields = [VERSION_COLUMN, *indexed_fields]
+                self.add_columns(fields)
+                for field_name in indexed_fields:
+                    names = field_name if isinstance(field_name, tuple) \
+                        else (field_name,)
+                    self.add_columns(names)
+                    index = quote(f"{self.table}_{'_'.join(names)}_index")
+                    columns = ", ".join(quote(name) for name in names)
+                    self.connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {index} "
+                        f"ON {table} ({columns})")
+        except sqlite3.Error as e:
+            handle_sqlite_error("SqliteStore.create_table()", e)
+        return is_new
+
+    @property
+    def connection(self):
+        """Connection of the current thread to the database"""
+        return get_connection(self.db_path)
+
+    def _read_columns(self):
+        """Reads the columns of the table."""
+        self.columns = [row[1] for row in self.connection.execute(
+            f"PRAGMA table_info({quote(self.table)})")]
+
+    def add_columns(self, fields):
+        """Adds the columns of the fields that the table doesn't have yet."""
+        for field_name in fields:
+            if field_name not in self.columns:
+                self.connection.execute(
+                    f"ALTER TABLE {quote(self.table)} "
+                    f"ADD COLUMN {quote(field_name)}")
+                self.columns.append(field_name)
+
+    def _to_record(self, row):
+        """Converts a table row to a record, leaving out the empty fields."""
+        return {column: value for column, value in zip(self.columns, row)
+                if value is not None and column != VERSION_COLUMN}
+
+    def query(self, sql, parameters=()):
+        """Gets a copy of the records of a select statement.
+
+        The records are decoded only when the cached ones are outdated.
+        """
+        records = self.cache.lookup(self.generation(),
+                                    (sql, tuple(parameters)),
+                                    lambda: self._run_query(sql, parameters))
+        return [dict(record) for record in records]
+
+    def _run_query(self, sql, parameters):
+        """Runs a select statement and converts its rows to records."""
+        try:
+            rows = self.connection.execute(sql, parameters).fetchall()
+        except sqlite3.Error as e:
+            handle_sqlite_error("SqliteStore.query()", e)
+        return [self._to_record(row) for row in rows]
+
+    def cache_stats(self):
+        """Gets the hits and misses of the cached query results."""
+        return self.cache.get_stats()
+
+    def execute(self, sql, parameters=()):
+        """Runs a statement in a transaction, returns the changed rows."""
+        self._writes += 1
+        try:
+            if self.connection.in_transaction:
+                return self.connection.execute(sql, parameters).rowcount
+            with self.connection:
+                return self.connection.execute(sql, parameters).rowcount
+        except sqlite3.Error as e:
+            handle_sqlite_error("SqliteStore.execute()", e)
+        return 0
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Context manager that writes all its changes or none of them.
+
+        Nested transactions are part of the outermost one.
+        """
+        if self.connection.in_transaction:
+            yield
+            return
+        try:
+            self.connection.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as e:
+            handle_sqlite_error("SqliteStore.transaction()", e)
+        try:
+            yield
+        except BaseException:
+            self.connection.rollback()
+            self._writes += 1
+            self._read_columns()
+            self.statements = {name: sql for name, sql
+                               in self.statements.items()
+                               if isinstance(name, str)}
+            raise
+        try:
+            self.connection.commit()
+        except sqlite3.Error as e:
+            handle_sqlite_error("SqliteStore.transaction()", e)
+
+    def get_insert_sql(self, fields):
+        """Gets the insert statement of a set of fields."""
+        sql = self.statements.get(fields)
+        if sql is None:
+            self.add_columns(fields)
+            columns = ", ".join(quote(field_name) for field_name in fields)
+            placeholders = ", ".join("?" * len(fields))
+            sql = (f"INSERT OR REPLACE INTO {quote(self.table)} "
+                   f"({columns}, {quote(VERSION_COLUMN)}) "
+                   f"VALUES ({placeholders}, {self.statements['version']})")
+            self.statements[fields] = sql
+        return sql
+
+    def all(self):
+        """Gets a copy of all the records."""
+        return self.query(self.statements["all"])
+
+    def get(self, key):
+        """Gets a copy of a record by primary key, or None."""
+        records = self.query(self.statements["get"], (key,))
+        return records[0] if records else None
+
+    def generation(self):
+        """Gets a value that changes whenever the records change.
+
+        The data version of the connection only changes with the commits
+        of other connections, so the writes of this store are added to it.
+        Each thread has its own connection and data versions.
+        """
+        connection = self.connection
+        try:
+            data_version = connection.execute(
+                "PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error as e:
+            handle_sqlite_error("SqliteStore.generation()", e)
+        return id(connection), data_version, self._writes
+
+    def get_versioned(self, key):
+        """Gets a copy of a record and its version, or (None, None)."""
+        try:
+            row = self.connection.execute(self.statements["get"],
+                                          (key,)).fetchone()
+        except sqlite3.Error as e:
+            handle_sqlite_error("SqliteStore.get_versioned()", e)
+        if row is None:
+            return None, None
+        return (self._to_record(row),
+                row[self.columns.index(VERSION_COLUMN)])
+
+    def find(self, field_name, value):
+        """Gets a copy of the records with a given field value."""
+        if field_name not in self.columns:
+            return []
+        return self.query(
+            f"SELECT * FROM {quote(self.table)} "
+            f"WHERE {quote(field_name)} = ? ORDER BY rowid", (value,))
+
+    def search(self, predicates=(), order_by=None, offset=0, limit=None):
+        """Gets an iterator of copies of the records matching predicates.
+
+        A prefix is a range of the column, so it uses the index of the
+        field, and the empty fields are sorted like in the json store.
+        """
+        order_field, descending = query.parse_search(predicates, order_by)
+        clauses, parameters = self._get_search_clauses(predicates)
+        if clauses is None:
+            return iter(())
+        sql = f"SELECT * FROM {quote(self.table)}"
+        if clauses:
+            sql += f" WHERE {' AND '.join(clauses)}"
+        if order_field in self.columns:
+            column = quote(order_field)
+            direction = " DESC" if descending else ""
+            sql += (f" ORDER BY {column} IS NULL{direction}, "
+                    f"{column}{direction}, rowid")
+        else:
+            sql += " ORDER BY rowid"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            parameters += [-1 if limit is None else limit, offset]
+        return iter(self.query(sql, parameters))
+
+    def _get_search_clauses(self, predicates):
+        """Gets the conditions of the predicates and their parameters.
+
+        Returns None conditions if a predicate can't match any record.
+        """
+        clauses = []
+        parameters = []
+        for field_name, operator, value in predicates:
+            column = quote(field_name)
+            if operator == "=" and value is None:
+                if field_name in self.columns:
+                    clauses.append(f"{column} IS NULL")
+            elif field_name not in self.columns:
+                return None, None
+            elif operator == "=":
+                clauses.append(f"{column} = ?")
+                parameters.append(value)
+            else:
+                clauses.append(f"{column} >= ?")
+                parameters.append(value)
+                end = query.get_prefix_end(value)
+                if end is not None:
+                    clauses.append(f"{column} < ?")
+                    parameters.append(end)
+        return clauses, parameters
+
+    def insert(self, record):
+        """Adds a record, replacing any record with the same primary key."""
+        fields = tuple(record)
+        self.execute(self.get_insert_sql(fields),
+                     [record[field_name] for field_name in fields])
+
+    def insert_many(self, records):
+        """Adds several records in a single transaction."""
+        with self.transaction():
+            for record in records:
+                self.insert(record)
+
+    def update(self, key, changes):
+        """Changes some fields of a record, returns False if not found."""
+        return self.update_where(key, None, changes)
+
+    def update_many(self, changes_by_key):
+        """Changes several records, returns the number of records found."""
+        with self.transaction():
+            return sum(self.update_where(key, None, changes)
+                       for key, changes in changes_by_key.items())
+
+    def compare_and_set(self, key, version, changes):
+        """Changes a record only if it still has the given version."""
+        return self.update_where(key, version, changes)
+
+    def update_where(self, key, version, changes):
+        """Changes a record, with any version if the version is None."""
+        self.add_columns(changes)
+        assignments = "".join(f"{quote(field_name)} = ?, "
+                              for field_name in changes)
+        sql = (f"UPDATE {quote(self.table)} SET {assignments}"
+               f"{quote(VERSION_COLUMN)} = {self.statements['version']} "
+               f"WHERE {quote(self.key)} = ?")
+        parameters = [*changes.values(), key]
+        if version is not None:
+            sql += f" AND {quote(VERSION_COLUMN)} = ?"
+            parameters.append(version)
+        return self.execute(sql, parameters) > 0
+
+    def delete(self, key):
+        """Removes a record by primary key, returns False if not found."""
+        return self.execute(self.statements["delete"], (key,)) > 0
+
+    def delete_many(self, keys):
+        """Removes several records, returns the number of records found."""
+        with self.transaction():
+            return sum(self.execute(self.statements["delete"], (key,))
+                       for key in dict.fromkeys(keys))
+
+    def replace_all(self, records):
+        """Replaces all the records with a new list of records."""
+        with self.transaction():
+            self.execute(f"DELETE FROM {quote(self.table)}")
+            self.insert_many(records)
+
+
+def migrate_json_files(model_classes):
+    """Imports the json file of every model into its SQLite table."""
+    for model_class in model_classes:
+        records = storage.JsonStore(model_class.FILE_PATH,
+                                    model_class.PRIMARY_KEY).all()
+        SqliteStore(model_class.FILE_PATH, model_class.PRIMARY_KEY,
+                    model_class.FIELDS,
+                    model_class.INDEXED_FIELDS).replace_all(records)
+        print(f"Imported {len(records)} records from "
+              f"{model_class.FILE_PATH}")
+
+
+def main():
+    """Main method to import the db/*.json files into the SQLite database"""
+    # pylint: disable=import-outside-toplevel
+    from models.customer import Customer
+    from models.hotel import Hotel
+    from models.reservation import Reservation
+    migrate_json_files([Hotel, Customer, Reservation])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,926 @@
+"""This module contains the storage engines shared by the models.
+
+The json engine keeps the records in memory indexed by their primary key.
+Every mutation is appended as one json line to a write-ahead log next to
+the json snapshot, so a single record update costs O(1) I/O. Once the log
+grows past a threshold, it is compacted into a new snapshot, a json list
+without indentation, compressed with gzip if the HOTEL_DB_COMPRESSION
+environment variable is "gzip". The HOTEL_DB_FORMAT environment variable
+selects another format of the snapshots (see models/codec.py), they are
+read in any format. The finished log is kept as an archived
+segment named after the sequence number it starts from, so the log
+segments are the append-only history of the changes (see
+models/changelog.py). Only the newest HOTEL_DB_ARCHIVED_LOGS segments
+(100 by default) are kept, so the disk used doesn't grow with every write.
+
+Several processes can share the same db files. Writers hold an advisory
+lock on a lock file next to the snapshot, read the log entries written by
+other processes, and only then append their own. Snapshots are written to
+a temporary file and renamed over the previous one. Every record has a
+version, the sequence number of the log entry that last changed it, so a
+read-modify-write can be retried when another process got there first.
+
+The indexed fields get a hash index from each value to the primary keys
+of its records, kept up to date by every change, so a search by one of
+them doesn't scan the records. An indexed tuple of fields gets a single
+index of their combined values. The sorted fields get a sorted index,
+used by the prefix searches and to sort (see models/query.py).
+
+Reads are served from memory. Before a read, the size and modification
+time of the db files are compared with the ones read last, and only the
+changes of other processes are read when they differ, so reads don't touch
+the disk while nothing changes. A store can be read by a thread while
+another one writes: a write holds the memory lock of the store only while
+it changes the records in memory, after its entries are in the log, so
+the reads never wait for the disk or for other processes.
+
+A transaction holds the lock while it runs, keeps its changes in memory
+with the previous state of every record it touched, and appends them to
+the log in a single write when it ends. It holds the memory lock while it
+runs, so no read sees half of it. Before appending, the previous state is
+restored and the memory lock released, and the changes are applied again
+once they are in the log, so the reads see the changes only once they
+are kept. If it fails, nothing is written.
+
+I/O errors are raised as a StorageError instead of stopping the program,
+so a process serving the models can report them and keep running.
+
+The HOTEL_DB_BACKEND environment variable selects the "json" (default) or
+the "sqlite" engine, both implementing the Repository interface.
+"""
+
+import contextlib
+import glob
+import gzip
+import itertools
+import os
+import shutil
+import threading
+
+from models import codec, query
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+WAL_EXTENSION = ".wal"
+LOCK_EXTENSION = ".lock"
+COMPACTION_THRESHOLD = 1000
+ARCHIVE_LOGS = True
+MAX_ARCHIVED_LOGS = int(os.environ.get("HOTEL_DB_ARCHIVED_LOGS", "100"))
+COMPRESS_SNAPSHOTS = os.environ.get("HOTEL_DB_COMPRESSION") == "gzip"
+GZIP_MAGIC = b"\x1f\x8b"
+SNAPSHOT_FORMAT = os.environ.get("HOTEL_DB_FORMAT", "json")
+MAX_CACHED_QUERIES = 10000
+STORAGE_BACKEND = os.environ.get("HOTEL_DB_BACKEND", "json")
+
+_stores = {}
+_load_counter = itertools.count()
+
+
+def get_store(file_path, key, fields=(),  # pylint: disable=R0913,R0917
+              indexed_fields=(), record_type=None, sorted_fields=()):
+    """Gets the store of a db file, opening it only once per process.
+
+    The fields describe the table of the sqlite engine, and both engines
+    index the indexed and sorted fields. The json engine keeps its records
+    in memory as instances of the record type, or as dictionaries if it is
+    None.
+    """
+    store = _stores.get((STORAGE_BACKEND, file_path))
+    if store is None:
+        if STORAGE_BACKEND == "sqlite":
+            # pylint: disable=import-outside-toplevel,cyclic-import
+            from models.sqlite_store import SqliteStore
+            store = SqliteStore(file_path, key, fields,
+                                (*indexed_fields, *sorted_fields))
+        else:
+            store = JsonStore(file_path, key, record_type, indexed_fields,
+                              sorted_fields)
+        _stores[(STORAGE_BACKEND, file_path)] = store
+    return store
+
+
+def forget_store(file_path):
+    """Forgets the stores of a db file, so it is opened again when used."""
+    for backend in ("json", "sqlite"):
+        _stores.pop((backend, file_path), None)
+
+
+class StorageError(Exception):
+    """Error reading or writing the records of a db file"""
+
+
+def handle_storage_error(context, error):
+    """Reports an I/O error of the storage as a StorageError."""
+    raise StorageError(f"Exception in {context}: {error.strerror}") \
+        from error
+
+
+@contextlib.contextmanager
+def file_lock(lock_path):
+    """Holds an exclusive advisory lock on a file while the context runs."""
+    try:
+        lock_file = open(lock_path, "a+b")  # pylint: disable=R1732
+    except OSError as e:
+        handle_storage_error("file_lock()", e)
+    with lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def write_atomically(file_path, data):
+    """Writes a text or bytes through a temporary file renamed over a file."""
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    if isinstance(data, str):
+        data = data.encode("UTF-8")
+    try:
+        with open(temp_path, "wb") as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, file_path)
+    except OSError as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        handle_storage_error("write_atomically()", e)
+
+
+def get_archive_path(wal_path, base_lsn):
+    """Gets the path of the archived log segment starting at a number."""
+    return f"{wal_path}.{base_lsn:012d}"
+
+
+def list_archived_logs(wal_path):
+    """Gets the paths of the archived segments of a log, oldest first."""
+    return sorted(path for path in glob.glob(glob.escape(wal_path) + ".*")
+                  if path.rsplit(".", 1)[1].isdigit())
+
+
+def read_base_lsn(wal_path):
+    """Gets the number a log starts from, or None if it has no base entry."""
+    try:
+        with open(wal_path, "rb") as wal_file:
+            entry = codec.loads(wal_file.readline())
+    except (OSError, ValueError):
+        return None
+    return entry.get("lsn") if entry.get("op") == "base" else None
+
+
+def prune_archived_logs(wal_path, keep=None, before_lsn=None):
+    """Deletes the oldest archived segments of a log, returns their paths.
+
+    With keep, the newest segments up to that number are kept. With
+    before_lsn, only the segments whose changes are all at or below that
+    number are deleted, so a reader that still needs the changes after it
+    finds them.
+    """
+    archived = list_archived_logs(wal_path)
+    next_bases = [int(path.rsplit(".", 1)[1]) for path in archived[1:]]
+    next_bases.append(read_base_lsn(wal_path))
+    deleted = []
+    for position, (path, next_base) in enumerate(zip(archived, next_bases)):
+        if keep is not None and position >= len(archived) - keep:
+            break
+        if before_lsn is not None \
+                and (next_base is None or next_base > before_lsn):
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            handle_storage_error("prune_archived_logs()", e)
+        deleted.append(path)
+    return deleted
+
+
+def encode_snapshot(records, compress=None):
+    """Encodes a list of records as a compact snapshot.
+
+    It is compressed if compress is True, or if it is None and the
+    snapshots are compressed.
+    """
+    data = codec.encode(records, SNAPSHOT_FORMAT)
+    if COMPRESS_SNAPSHOTS if compress is None else compress:
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return data
+
+
+def decode_snapshot(data):
+    """Decodes the list of records of a snapshot of any format."""
+    if data.startswith(GZIP_MAGIC):
+        data = gzip.decompress(data)
+    return codec.decode(data)
+
+
+def get_file_signature(file_path):
+    """Gets the identity, size and modification time of a file, or None."""
+    try:
+        file_stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns
+
+
+class Repository:
+    """Interface of the storage engines used by the models"""
+
+    def __init__(self, key):
+        self.key = key
+
+    def all(self):
+        """Gets a copy of all the records."""
+        raise NotImplementedError
+
+    def get(self, key):
+        """Gets a copy of a record by primary key, or None."""
+        raise NotImplementedError
+
+    def find(self, field_name, value):
+        """Gets a copy of the records with a given field value."""
+        raise NotImplementedError
+
+    def search(self, predicates=(), order_by=None, offset=0, limit=None):
+        """Gets an iterator of copies of the records matching predicates.
+
+        See models/query.py for the predicates and the order.
+        """
+        raise NotImplementedError
+
+    def insert(self, record):
+        """Adds a record, replacing any record with the same primary key."""
+        raise NotImplementedError
+
+    def update(self, key, changes):
+        """Changes some fields of a record, returns False if not found."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Removes a record by primary key, returns False if not found."""
+        raise NotImplementedError
+
+    def replace_all(self, records):
+        """Replaces all the records with a new list of records."""
+        raise NotImplementedError
+
+    def insert_many(self, records):
+        """Adds several records in a single write."""
+        raise NotImplementedError
+
+    def update_many(self, changes_by_key):
+        """Changes several records, returns the number of records found."""
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        """Removes several records, returns the number of records found."""
+        raise NotImplementedError
+
+    def transaction(self):
+        """Context manager that writes all its changes or none of them."""
+        raise NotImplementedError
+
+    def delete_where(self, predicate):
+        """Removes the records matching a predicate, returns how many."""
+        with self.transaction():
+            return self.delete_many([record[self.key] for record in self.all()
+                                     if predicate(record)])
+
+    def get_versioned(self, key):
+        """Gets a copy of a record and its version, or (None, None)."""
+        raise NotImplementedError
+
+    def compare_and_set(self, key, version, changes):
+        """Changes a record only if it still has the given version."""
+        raise NotImplementedError
+
+    def generation(self):
+        """Gets a value that changes whenever the records change."""
+        raise NotImplementedError
+
+    def cache_stats(self):
+        """Gets the hits and misses of the cached records."""
+        raise NotImplementedError
+
+    def update_with(self, key, get_changes):
+        """Changes a record with a function of its current value.
+
+        The changes are computed again whenever another process changed
+        the record first. Returns False if the record is not found.
+        """
+        while True:
+            record, version = self.get_versioned(key)
+            if record is None:
+                return False
+            if self.compare_and_set(key, version, get_changes(record)):
+                return True
+
+
+class RecordCache:
+    """Query results of a store kept while its generation doesn't change"""
+
+    def __init__(self):
+        self.generation = None
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, generation, query_key, run_query):
+        """Gets the cached result of a query, running it on a miss."""
+        if generation != self.generation \
+                or len(self.results) >= MAX_CACHED_QUERIES:
+            self.generation = generation
+            self.results = {}
+        if query_key in self.results:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.results[query_key] = run_query()
+        return self.results[query_key]
+
+    def get_stats(self):
+        """Gets the hits and misses of the cache."""
+        return {"hits": self.hits, "misses": self.misses,
+                "cached": len(self.results)}
+
+
+class JsonStore(Repository):  # pylint: disable=R0902,R0904
+    """Records of a json file indexed by primary key with a write-ahead log"""
+
+    def __init__(self, file_path, key, record_type=None, indexed_fields=(),
+                 sorted_fields=()):
+        super().__init__(key)
+        self.file_path = file_path
+        self.record_type = record_type
+        self.records = {}
+        self.indexes = {field_name: {} for field_name in indexed_fields}
+        self.sorted_indexes = {field_name: query.SortedIndex()
+                               for field_name in sorted_fields}
+        self.versions = {}
+        self.log = {}
+        self.cache = {"hits": 0, "misses": 0}
+        self.memory_lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._lock_depth = 0
+        self._lock_owner = None
+        self._transactions = threading.local()
+        with self.lock():
+            pass
+
+    @property
+    def wal_path(self):
+        """Path of the write-ahead log"""
+        return self.file_path + WAL_EXTENSION
+
+    @property
+    def lock_path(self):
+        """Path of the lock file shared by the processes"""
+        return self.file_path + LOCK_EXTENSION
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Holds the lock of the db files, reading the latest changes first.
+
+        The lock is reentrant within the thread that holds it. The memory
+        lock is only held while the changes are read.
+        """
+        if self._lock_depth and self._lock_owner == threading.get_ident():
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+        with self._write_lock, file_lock(self.lock_path):
+            with self.memory_lock:
+                self.refresh()
+                self._lock_depth = 1
+                self._lock_owner = threading.get_ident()
+            try:
+                yield
+            finally:
+                self._lock_depth = 0
+                self._lock_owner = None
+
+    def refresh(self):
+        """Reads the changes written by other processes since the last read.
+
+        The whole store is loaded again if the snapshot was rewritten.
+        """
+        if not self.log \
+                or get_file_signature(self.file_path) != self.log["snapshot"]:
+            self.load()
+            return
+        wal_signature = get_file_signature(self.wal_path)
+        if wal_signature is None:
+            if self.log["wal"] is not None:
+                self.load()
+        elif wal_signature[0] != self.log["wal"]:
+            self.load()
+        elif wal_signature[1] > self.log["offset"]:
+            self._replay_log()
+
+    def is_up_to_date(self):
+        """Checks if the db files are unchanged since they were read."""
+        if self._lock_depth:
+            return True
+        if get_file_signature(self.file_path) != self.log["snapshot"]:
+            return False
+        wal_signature = get_file_signature(self.wal_path)
+        if wal_signature is None:
+            return self.log["wal"] is None
+        return wal_signature[:2] == (self.log["wal"], self.log["offset"])
+
+    def check_cache(self):
+        """Reads the changes of other processes before serving a read."""
+        if self.is_up_to_date():
+            self.cache["hits"] += 1
+        else:
+            self.cache["misses"] += 1
+            self.refresh()
+
+    def cache_stats(self):
+        """Gets the hits and misses of the records kept in memory."""
+        return {"hits": self.cache["hits"], "misses": self.cache["misses"],
+                "cached": len(self.records)}
+
+    def load(self):
+        """Loads the snapshot and replays the write-ahead log over it.
+
+        It is loaded again if the snapshot was replaced while reading it.
+        """
+        while True:
+            self.records = {}
+            self.versions = {}
+            self.log = {"snapshot": get_file_signature(self.file_path),
+                        "wal": None, "offset": 0, "entries": 0, "lsn": 0,
+                        "base": 0, "load": next(_load_counter)}
+            if self.log["snapshot"] is not None:
+                self._read_snapshot()
+            self._build_indexes()
+            self._replay_log()
+            if get_file_signature(self.file_path) == self.log["snapshot"]:
+                return
+
+    def _read_snapshot(self):
+        """Reads the records of the snapshot."""
+        try:
+            with open(self.file_path, "rb") as db_file:
+                for record in decode_snapshot(db_file.read()):
+                    self.records[record[self.key]] = self._pack(record)
+        except (ValueError, EOFError, OSError, TypeError, KeyError):
+            print(f"Exception in load(): Invalid DB file "
+                  f"{self.file_path}")
+            self.records = {}
+
+    def _replay_log(self):
+        """Applies the complete lines of the log after the last one read."""
+        try:
+            wal_file = open(self.wal_path, "rb")  # pylint: disable=R1732
+        except FileNotFoundError:
+            self.log["wal"] = None
+            return
+        with wal_file:
+            self.log["wal"] = os.fstat(wal_file.fileno()).st_ino
+            wal_file.seek(self.log["offset"])
+            for line in wal_file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = codec.loads(line)
+                except ValueError:
+                    break
+                self._apply(entry)
+                self.log["offset"] += len(line)
+                self.log["entries"] += 1
+
+    def _pack(self, data):
+        """Converts a dictionary to the type of the records in memory."""
+        if self.record_type is None:
+            return data
+        return self.record_type.from_dict(data)
+
+    def _unpack(self, record):
+        """Converts a record in memory to a new dictionary."""
+        if self.record_type is None:
+            return dict(record)
+        return record.to_dict()
+
+    def _apply(self, entry):
+        """Applies a write-ahead log entry to the records in memory."""
+        operation = entry["op"]
+        lsn = entry.get("lsn", 0)
+        self.log["lsn"] = max(self.log["lsn"], lsn)
+        if operation == "put":
+            self._set_record(entry["key"], self._pack(entry["record"]))
+            self.versions[entry["key"]] = lsn
+        elif operation == "patch":
+            record = self.records.get(entry["key"])
+            if record is not None:
+                self._unindex(entry["key"], record)
+                record.update(entry["changes"])
+                self._index(entry["key"], record)
+                self.versions[entry["key"]] = lsn
+        elif operation == "delete":
+            self._set_record(entry["key"], None)
+            self.versions.pop(entry["key"], None)
+        elif operation == "base":
+            self.versions = dict.fromkeys(self.records, lsn)
+            self.log["base"] = lsn
+
+    def _set_record(self, key, record):
+        """Replaces or removes a record, updating the indexes."""
+        previous = self.records.pop(key, None)
+        if previous is not None:
+            self._unindex(key, previous)
+        if record is not None:
+            self.records[key] = record
+            self._index(key, record)
+
+    @staticmethod
+    def _get_indexed_value(record, field_name):
+        """Gets the value of a field, or of a tuple of fields, of a record."""
+        if isinstance(field_name, tuple):
+            return tuple(record.get(name) for name in field_name)
+        return record.get(field_name)
+
+    def _index(self, key, record):
+        """Adds a record to the indexes of its fields."""
+        self._add_to_hash_indexes(key, record)
+        for field_name, sorted_index in self.sorted_indexes.items():
+            sorted_index.add(record.get(field_name), key)
+
+    def _add_to_hash_indexes(self, key, record):
+        """Adds a record to the hash indexes of its fields."""
+        for field_name, index in self.indexes.items():
+            try:
+                index.setdefault(self._get_indexed_value(record, field_name),
+                                 {})[key] = None
+            except TypeError:
+                pass
+
+    def _unindex(self, key, record):
+        """Removes a record from the indexes of its fields."""
+        for field_name, index in self.indexes.items():
+            value = self._get_indexed_value(record, field_name)
+            try:
+                keys = index.get(value)
+            except TypeError:
+                continue
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del index[value]
+        for field_name, sorted_index in self.sorted_indexes.items():
+            sorted_index.remove(record.get(field_name), key)
+
+    def _build_indexes(self):
+        """Indexes all the records."""
+        for index in self.indexes.values():
+            index.clear()
+        for key, record in self.records.items():
+            self._add_to_hash_indexes(key, record)
+        for field_name, sorted_index in self.sorted_indexes.items():
+            sorted_index.build((record.get(field_name), key)
+                               for key, record in self.records.items())
+
+    def all(self):
+        """Gets a copy of all the records."""
+        with self.memory_lock:
+            self.check_cache()
+            return [self._unpack(record) for record in self.records.values()]
+
+    def get(self, key):
+        """Gets a copy of a record by primary key, or None."""
+        with self.memory_lock:
+            self.check_cache()
+            record = self.records.get(key)
+            return None if record is None else self._unpack(record)
+
+    def get_versioned(self, key):
+        """Gets a copy of a record and its version, or (None, None)."""
+        with self.memory_lock:
+            record = self.get(key)
+            if record is None:
+                return None, None
+            return record, self.versions.get(key, 0)
+
+    def generation(self):
+        """Gets a value that changes whenever the records change.
+
+        Sequence numbers are reused after a rollback or after loading the
+        files again, so the number of the load is part of the value.
+        """
+        with self.memory_lock:
+            self.check_cache()
+            return self.log["load"], self.log["lsn"]
+
+    def find(self, field_name, value):
+        """Gets a copy of the records with a given field value."""
+        if field_name == self.key:
+            record = self.get(value)
+            return [] if record is None else [record]
+        with self.memory_lock:
+            self.check_cache()
+            index = self.indexes.get(field_name)
+            if index is not None:
+                try:
+                    keys = index.get(value, ())
+                except TypeError:
+                    keys = ()
+                return [self._unpack(self.records[key]) for key in keys]
+            return [self._unpack(record) for record in self.records.values()
+                    if record.get(field_name) == value]
+
+    def search(self, predicates=(), order_by=None, offset=0, limit=None):
+        """Gets an iterator of copies of the records matching predicates.
+
+        The records are read through the index lookup that finds the
+        fewest of them, or in the order of a sorted index when a page of a
+        sorted search is found sooner that way. The page is copied while
+        holding the memory lock, so a write can't change it while it is
+        read.
+        """
+        order_field, descending = query.parse_search(predicates, order_by)
+        count = None if limit is None else offset + limit
+        with self.memory_lock:
+            self.check_cache()
+            keys, is_sorted = self._plan_search(predicates, order_field,
+                                                descending, count)
+            records = (record for record in map(self.records.get, keys)
+                       if query.matches(record, predicates))
+            if order_field is not None and not is_sorted:
+                records = query.sort_records(records, order_field,
+                                             descending, count)
+            return iter([self._unpack(record) for record
+                         in query.paginate(records, offset, limit)])
+
+    def _plan_search(self, predicates, order_field, descending, count):
+        """Gets the keys to read in a search and if they are sorted.
+
+        The keys of the smallest index lookup are read, unless the search
+        is sorted by a field whose sorted index has every record, and
+        reading it in order, skipping the records that don't match, should
+        find the count of records sooner than sorting the lookup.
+        """
+        for field_name, operator, key in predicates:
+            if field_name == self.key and operator == "=":
+                return [key] if self.records.get(key) is not None else [], \
+                    True
+        size, keys, is_sorted = min(
+            self._find_lookups(predicates, order_field, descending),
+            key=lambda lookup: lookup[0])
+        sorted_index = self.sorted_indexes.get(order_field)
+        if is_sorted or not size or sorted_index is None \
+                or len(sorted_index) < len(self.records):
+            return keys, is_sorted
+        if not predicates \
+                or count is not None and count * len(sorted_index) < size ** 2:
+            return sorted_index.iterate(0, len(sorted_index),
+                                        descending), True
+        return keys, False
+
+    def _find_lookups(self, predicates, order_field, descending):
+        """Gets the number, keys and order of the records of every lookup.
+
+        The first lookup is a scan of all the records.
+        """
+        values = {field_name: value
+                  for field_name, operator, value in predicates
+                  if operator == "="}
+        lookups = [(len(self.records), self.records, False)]
+        for field_name, index in self.indexes.items():
+            if all(name in values for name in (
+                    field_name if isinstance(field_name, tuple)
+                    else (field_name,))):
+                try:
+                    keys = index.get(
+                        self._get_indexed_value(values, field_name), {})
+                except TypeError:
+                    keys = {}
+                lookups.append((len(keys), keys, False))
+        for field_name, operator, value in predicates:
+            sorted_index = self.sorted_indexes.get(field_name)
+            if operator == "prefix" and sorted_index is not None:
+                start, end = sorted_index.find_range(value)
+                is_sorted = field_name == order_field
+                lookups.append((end - start, sorted_index.iterate(
+                    start, end, descending and is_sorted), is_sorted))
+        return lookups
+
+    def insert(self, record):
+        """Adds a record, replacing any record with the same primary key."""
+        self.insert_many([record])
+
+    def insert_many(self, records):
+        """Adds several records in a single write."""
+        entries = [{"op": "put", "key": record[self.key],
+                    "record": dict(record)} for record in records]
+        with self.lock():
+            self._write(entries)
+
+    def update(self, key, changes):
+        """Changes some fields of a record, returns False if not found."""
+        return self.update_many({key: changes}) > 0
+
+    def update_many(self, changes_by_key):
+        """Changes several records, returns the number of records found."""
+        with self.lock():
+            entries = [{"op": "patch", "key": key, "changes": dict(changes)}
+                       for key, changes in changes_by_key.items()
+                       if key in self.records]
+            self._write(entries)
+        return len(entries)
+
+    def compare_and_set(self, key, version, changes):
+        """Changes a record only if it still has the given version."""
+        with self.lock():
+            if key not in self.records \
+                    or self.versions.get(key, 0) != version:
+                return False
+            self._write([{"op": "patch", "key": key,
+                         "changes": dict(changes)}])
+        return True
+
+    def delete(self, key):
+        """Removes a record by primary key, returns False if not found."""
+        return self.delete_many([key]) > 0
+
+    def delete_many(self, keys):
+        """Removes several records, returns the number of records found."""
+        with self.lock():
+            entries = [{"op": "delete", "key": key}
+                       for key in dict.fromkeys(keys) if key in self.records]
+            self._write(entries)
+        return len(entries)
+
+    @property
+    def _transaction(self):
+        """Running transaction of the current thread, or None."""
+        return getattr(self._transactions, "running", None)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Context manager that writes all its changes or none of them.
+
+        Nested transactions of a thread are part of its outermost one, the
+        transactions of other threads wait for the lock. If the log can't
+        be written, the changes are undone. The changes are undone before
+        appending them and applied again once they are in the log.
+        """
+        if self._transaction is not None:
+            yield
+            return
+        with self.lock():
+            with self.memory_lock:
+                self._transactions.running = {"entries": [], "undo": {},
+                                              "lsn": self.log["lsn"]}
+                try:
+                    yield
+                finally:
+                    entries = self._transaction["entries"]
+                    self._rollback()
+            self._append_to_log(entries)
+            with self.memory_lock:
+                for entry in entries:
+                    self._apply(entry)
+            self._compact_if_needed()
+
+    def _rollback(self):
+        """Restores the records changed by the running transaction.
+
+        The transaction ends, its entries are left out of the records.
+        """
+        for key, (record, version) in self._transaction["undo"].items():
+            if record is None:
+                self._set_record(key, None)
+                self.versions.pop(key, None)
+            else:
+                self._set_record(key, self._pack(record))
+                self.versions[key] = version
+        self.log["lsn"] = self._transaction["lsn"]
+        self.log["load"] = next(_load_counter)
+        self._transactions.running = None
+
+    def _write(self, entries):
+        """Appends entries to the log and applies them to the records.
+
+        It must run while holding the lock. The records only change once
+        the entries are in the log, so a failed append changes nothing.
+        Within a transaction, the entries are applied at once and kept
+        until it ends, with the previous state of the records they change.
+        """
+        for lsn, entry in enumerate(entries, self.log["lsn"] + 1):
+            entry["lsn"] = lsn
+        if self._transaction is None:
+            self._append_to_log(entries)
+        else:
+            undo = self._transaction["undo"]
+            for entry in entries:
+                key = entry["key"]
+                if key not in undo:
+                    record = self.records.get(key)
+                    undo[key] = (None if record is None
+                                 else self._unpack(record),
+                                 self.versions.get(key))
+            self._transaction["entries"].extend(entries)
+        with self.memory_lock:
+            for entry in entries:
+                self._apply(entry)
+        if self._transaction is None:
+            self._compact_if_needed()
+
+    def _append_to_log(self, entries):
+        """Appends entries to the log in a single write.
+
+        A partially written line left by a process that crashed is cut off
+        before appending.
+        """
+        if not entries:
+            return
+        data = b"".join(codec.dumps(entry) + b"\n" for entry in entries)
+        try:
+            with open(self.wal_path, "ab") as wal_file:
+                if wal_file.tell() != self.log["offset"]:
+                    wal_file.truncate(self.log["offset"])
+                wal_file.write(data)
+                self.log["wal"] = os.fstat(wal_file.fileno()).st_ino
+        except OSError as e:
+            handle_storage_error("JsonStore._append_to_log()", e)
+        self.log["offset"] += len(data)
+        self.log["entries"] += len(entries)
+
+    def _compact_if_needed(self):
+        """Compacts the log once it has enough entries."""
+        if self.log["entries"] >= COMPACTION_THRESHOLD:
+            self.compact()
+
+    def replace_all(self, records):
+        """Replaces all the records with a new list of records.
+
+        Only the records that changed are written to the log.
+        """
+        records = {record[self.key]: record for record in records}
+        with self.transaction():
+            self.delete_many([key for key in self.records
+                              if key not in records])
+            self.insert_many([record for key, record in records.items()
+                              if key not in self.records
+                              or self._unpack(self.records[key]) != record])
+
+    def compact(self):
+        """Writes the records to the snapshot and starts a new log.
+
+        The new log begins with the sequence number reached, which becomes
+        the version of every record of the snapshot.
+        """
+        with self.lock():
+            write_atomically(self.file_path, encode_snapshot(
+                [self._unpack(record) for record in self.records.values()]))
+            if ARCHIVE_LOGS and self.log["lsn"] > self.log["base"]:
+                self._archive_log()
+            base = codec.dumps({"op": "base", "lsn": self.log["lsn"]}) + b"\n"
+            write_atomically(self.wal_path, base)
+            if ARCHIVE_LOGS:
+                prune_archived_logs(self.wal_path, MAX_ARCHIVED_LOGS)
+            with self.memory_lock:
+                self.versions = dict.fromkeys(self.records, self.log["lsn"])
+                self.log.update(
+                    snapshot=get_file_signature(self.file_path),
+                    wal=get_file_signature(self.wal_path)[0],
+                    offset=len(base), entries=1, base=self.log["lsn"])
+
+    def _archive_log(self):
+        """Keeps the log as an archived segment before it is replaced.
+
+        The segment is a hard link to the log, or a copy of it where the
+        file system has no hard links.
+        """
+        archive_path = get_archive_path(self.wal_path, self.log["base"])
+        try:
+            if os.path.exists(archive_path):
+                os.remove(archive_path)
+            try:
+                os.link(self.wal_path, archive_path)
+            except (AttributeError, NotImplementedError, PermissionError):
+                shutil.copyfile(self.wal_path, archive_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            handle_storage_error("JsonStore._archive_log()", e)
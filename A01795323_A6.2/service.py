@@ -0,0 +1,357 @@
+"""Asyncio HTTP/JSON service in front of the hotel reservation models.
+
+Endpoints, where <resource> is hotels, customers or reservations:
+
+    GET    /<resource>                  all the records, or a page of them
+           ?<field>=<value>&<field>_prefix=<text>&order_by=[-]<field>
+           &offset=<n>&limit=<n>
+    GET    /<resource>/<id>             a record
+    GET    /hotels/<id>/free_rooms?check_in=YYYY-MM-DD&check_out=YYYY-MM-DD
+    POST   /<resource>                  creates a record from a json body
+    PATCH  /hotels/<id>, /customers/<id>  changes the fields of a json body
+    DELETE /<resource>/<id>             deletes a record
+
+Reads run in the event loop as soon as their request arrives, from the
+records the stores keep in memory. Writes are queued to a single writer
+task that runs them one at a time in arrival order in a writer thread, so
+the models never see two writes at once and the event loop keeps serving
+reads while a write waits for the lock of the db files or for the disk. A
+read never sees half of a write, it only waits while a write changes the
+records of its store in memory, after they are in the log, and never for
+the disk (see models/storage.py). The messages
+the models report are returned in the response, and storage errors are
+returned as 500 responses instead of stopping the service.
+
+Run "python service.py [port]" to serve on localhost.
+"""
+
+import asyncio
+import contextlib
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from models import codec
+from models.customer import Customer
+from models.hotel import Hotel
+from models.messages import collect_messages
+from models.reservation import Reservation
+from models.storage import StorageError
+
+DEFAULT_PORT = 8080
+MAX_BODY_SIZE = 1024 * 1024
+RESOURCES = {"hotels": Hotel, "customers": Customer,
+             "reservations": Reservation}
+WRITES = {
+    Hotel: {"create": Hotel.create, "update": Hotel.modify_many,
+            "delete": Hotel.delete_hotels},
+    Customer: {"create": Customer.create, "update": Customer.edit_many,
+               "delete": Customer.delete_customers},
+    Reservation: {"create": Reservation.create, "update": None,
+                  "delete": Reservation.cancel_many},
+}
+
+
+class HttpError(Exception):
+    """Error returned to the client with an HTTP status"""
+
+    def __init__(self, status, message, messages=()):
+        super().__init__(message)
+        self.status = status
+        self.messages = list(messages)
+
+
+def parse_count(text, name):
+    """Converts the text of a size or a position, refusing other values."""
+    try:
+        count = int(text)
+    except ValueError:
+        count = -1
+    if count < 0:
+        raise HttpError(HTTPStatus.BAD_REQUEST,
+                        f"{name} must be a non-negative integer")
+    return count
+
+
+def parse_key(text):
+    """Converts the id of a path to the type of the primary keys."""
+    return int(text) if text.isdigit() else text
+
+
+def call_model(method, *args):
+    """Calls a model method, returning its result and reported messages."""
+    with collect_messages() as reported:
+        result = method(*args)
+    return result, reported
+
+
+def encode_response(status, payload, keep_alive):
+    """Builds an HTTP response with a json body."""
+    body = codec.dumps(payload)
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"\r\n")
+    return head.encode("ascii") + body
+
+
+async def read_request(reader):
+    """Reads a request, returns its method, target, headers and body.
+
+    Returns None if the client closed the connection.
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("ascii").split()
+    except ValueError as e:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid request line") \
+            from e
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    size = parse_count(headers.get("content-length", "0"), "Content-Length")
+    if size > MAX_BODY_SIZE:
+        raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                        "The body is too large")
+    body = await reader.readexactly(size) if size else b""
+    return method, target, headers, body
+
+
+class HotelService:
+    """HTTP server of the models with a single writer task"""
+
+    def __init__(self):
+        self.writes = asyncio.Queue()
+        self.writer_task = None
+        self.writer_thread = None
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        """Starts the writer task and listens for connections."""
+        self.writer_thread = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="hotel-writer")
+        self.writer_task = asyncio.create_task(self.run_writer())
+        self.server = await asyncio.start_server(self.handle_connection,
+                                                 host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stops listening, then stops the writer task and its thread."""
+        self.server.close()
+        await self.server.wait_closed()
+        self.writer_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.writer_task
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.writer_thread.shutdown)
+
+    async def run_writer(self):
+        """Runs the queued writes one at a time in the writer thread."""
+        loop = asyncio.get_running_loop()
+        while True:
+            write, future = await self.writes.get()
+            if future.cancelled():
+                continue
+            try:
+                result = await loop.run_in_executor(self.writer_thread, write)
+            except Exception as e:  # pylint: disable=W0718
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+
+    async def write(self, write):
+        """Queues a write and waits for its result."""
+        future = asyncio.get_running_loop().create_future()
+        await self.writes.put((write, future))
+        return await future
+
+    async def handle_connection(self, reader, writer):
+        """Serves the requests of a connection until it is closed."""
+        keep_alive = True
+        try:
+            while keep_alive:
+                request = None
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = headers.get("connection") != "close"
+                    status, payload = await self.dispatch(method, target,
+                                                          body)
+                except HttpError as e:
+                    keep_alive = keep_alive and request is not None
+                    status, payload = e.status, {"error": str(e),
+                                                 "messages": e.messages}
+                except Exception as e:  # pylint: disable=W0718
+                    keep_alive = False
+                    status, payload = (HTTPStatus.INTERNAL_SERVER_ERROR,
+                                       {"error": repr(e), "messages": []})
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def dispatch(self, method, target, body):
+        """Runs a request, returns the status and payload of its response."""
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        model = RESOURCES.get(parts[0]) if parts else None
+        if model is None or len(parts) > 3:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"Unknown path {url.path}")
+        key = parse_key(parts[1]) if len(parts) > 1 else None
+        try:
+            if method == "GET":
+                return self.read(model, key, parts[2:], parse_qs(url.query))
+            if len(parts) > 2:
+                raise HttpError(HTTPStatus.NOT_FOUND,
+                                f"Unknown path {url.path}")
+            if method == "POST" and key is None:
+                return await self.write(
+                    lambda: self.create(model, decode_body(body)))
+            if method == "PATCH" and key is not None:
+                return await self.write(
+                    lambda: self.update(model, key, decode_body(body)))
+            if method == "DELETE" and key is not None:
+                return await self.write(lambda: self.delete(model, key))
+        except StorageError as e:
+            raise HttpError(HTTPStatus.INTERNAL_SERVER_ERROR, str(e)) from e
+        except ValueError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, str(e)) from e
+        raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED,
+                        f"{method} is not allowed on {url.path}")
+
+    @staticmethod
+    def read(model, key, sub_resource, query):
+        """Gets a list of records, a record or the free rooms of a hotel."""
+        if key is None:
+            return HTTPStatus.OK, search(model, query)
+        record = model.store().get(key)
+        if record is None:
+            raise HttpError(HTTPStatus.NOT_FOUND,
+                            f"{model.__name__} {key} not found")
+        if not sub_resource:
+            return HTTPStatus.OK, record
+        if model is not Hotel or sub_resource != ["free_rooms"]:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Unknown path")
+        try:
+            return HTTPStatus.OK, Reservation.find_free_rooms(
+                key, query["check_in"][0], query["check_out"][0])
+        except KeyError as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST,
+                            "Expected check_in and check_out dates") from e
+
+    @staticmethod
+    def create(model, data):
+        """Creates a record with the model, refusing duplicated ids."""
+        try:
+            record = model(data)
+        except (KeyError, TypeError) as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST,
+                            f"Missing field {e}") from e
+        model.validate(data)
+        key = data[model.PRIMARY_KEY]
+        if model.store().get(key) is not None:
+            raise HttpError(HTTPStatus.CONFLICT,
+                            f"{model.__name__} {key} already exists")
+        created, messages = call_model(WRITES[model]["create"], record)
+        if created is False:
+            raise HttpError(HTTPStatus.CONFLICT,
+                            f"{model.__name__} {key} was not created",
+                            messages)
+        return HTTPStatus.CREATED, {"result": model.store().get(key),
+                                    "messages": messages}
+
+    @staticmethod
+    def update(model, key, changes):
+        """Changes some fields of a record, except its primary key."""
+        update = WRITES[model]["update"]
+        if update is None:
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED,
+                            f"{model.__name__} records can't be modified")
+        if not isinstance(changes, dict) or model.PRIMARY_KEY in changes:
+            raise HttpError(HTTPStatus.BAD_REQUEST,
+                            "Expected an object of the fields to change, "
+                            "without the primary key")
+        updated, messages = call_model(update, {key: changes})
+        if not updated:
+            raise HttpError(HTTPStatus.NOT_FOUND,
+                            f"{model.__name__} {key} not found", messages)
+        return HTTPStatus.OK, {"result": model.store().get(key),
+                               "messages": messages}
+
+    @staticmethod
+    def delete(model, key):
+        """Deletes a record applying the rules of its references."""
+        if model.store().get(key) is None:
+            raise HttpError(HTTPStatus.NOT_FOUND,
+                            f"{model.__name__} {key} not found")
+        deleted, messages = call_model(WRITES[model]["delete"], [key])
+        if not deleted:
+            raise HttpError(HTTPStatus.CONFLICT,
+                            f"{model.__name__} {key} was not deleted",
+                            messages)
+        return HTTPStatus.OK, {"result": deleted, "messages": messages}
+
+
+def search(model, query):
+    """Gets the records of a model matching the parameters of a query.
+
+    The values of the id fields are converted like the ids of the paths.
+    """
+    parameters = {name: values[-1] for name, values in query.items()}
+    order_by = parameters.pop("order_by", None)
+    offset = parse_count(parameters.pop("offset", "0"), "offset")
+    limit = parameters.pop("limit", None)
+    if limit is not None:
+        limit = parse_count(limit, "limit")
+    predicates = []
+    for name, value in parameters.items():
+        if name.endswith("_prefix"):
+            predicates.append((name[:-len("_prefix")], "prefix", value))
+        else:
+            predicates.append((name, "=", parse_key(value)
+                               if name.endswith("_id") else value))
+    return list(model.store().search(predicates, order_by, offset, limit))
+
+
+def decode_body(body):
+    """Decodes the json body of a request."""
+    try:
+        return codec.loads(body)
+    except ValueError as e:
+        raise HttpError(HTTPStatus.BAD_REQUEST,
+                        f"Invalid json body: {e}") from e
+
+
+async def serve(port):
+    """Serves the models on localhost until the process is stopped."""
+    service = HotelService()
+    port = await service.start(port=port)
+    print(f"Serving the hotel reservation system on http://127.0.0.1:{port}")
+    await service.server.serve_forever()
+
+
+def main():
+    """Main method to run the service"""
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(port))
+
+
+if __name__ == '__main__':
+    main()
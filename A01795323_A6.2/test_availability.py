@@ -0,0 +1,107 @@
+"""Test cases for the room availability index"""
+
+import unittest
+from models.availability import AvailabilityIndex, check_stay
+
+
+def make_reservation(reservation_id, room_id, check_in, check_out):
+    """Makes a reservation of hotel 1 between two dates."""
+    return {"reservation_id": reservation_id, "hotel_id": 1,
+            "room_id": room_id, "check_in": check_in,
+            "check_out": check_out}
+
+
+class TestAvailabilityIndex(unittest.TestCase):
+    """Test cases for the AvailabilityIndex class"""
+    def setUp(self):
+        self.index = AvailabilityIndex(
+            [{"hotel_id": 1, "rooms": 3}, {"hotel_id": 2}],
+            [make_reservation(1, 1, "2024-03-01", "2024-03-05"),
+             make_reservation(2, 1, "2024-03-08", "2024-03-10"),
+             make_reservation(3, 2, "2024-03-04", "2024-03-06"),
+             {"reservation_id": 4, "hotel_id": 1, "room_id": 3}])
+
+    def test_find_conflict(self):
+        """Test detecting the stays that overlap a booking"""
+        self.assertEqual(self.index.find_conflict(
+            make_reservation(5, 1, "2024-03-04", "2024-03-06")), 1)
+        self.assertEqual(self.index.find_conflict(
+            make_reservation(5, 1, "2024-02-20", "2024-03-20")), 2)
+        self.assertIsNone(self.index.find_conflict(
+            make_reservation(5, 1, "2024-03-05", "2024-03-08")))
+        self.assertIsNone(self.index.find_conflict(
+            make_reservation(5, 3, "2024-03-01", "2024-03-05")))
+
+    def test_check_room(self):
+        """Test that only the rooms of the hotel can be booked"""
+        self.index.check_room(make_reservation(5, 3, None, None))
+        for room_id in (0, -1, 4, 99, "1", True):
+            with self.subTest(room_id=room_id):
+                with self.assertRaises(ValueError):
+                    self.index.check_room(make_reservation(
+                        5, room_id, "2024-03-01", "2024-03-02"))
+        for room_id in (1, 99):
+            self.index.check_room({"reservation_id": 5, "hotel_id": 2,
+                                   "room_id": room_id})
+        with self.assertRaises(ValueError):
+            self.index.check_room({"reservation_id": 5, "hotel_id": 2,
+                                   "room_id": 0})
+
+    def test_find_free_rooms(self):
+        """Test finding the free rooms of a hotel between two dates"""
+        self.assertEqual(self.index.find_free_rooms(
+            1, "2024-03-05", "2024-03-08"), [1, 3])
+        self.assertEqual(self.index.find_free_rooms(
+            1, "2024-03-03", "2024-03-09"), [3])
+        with self.assertRaises(ValueError):
+            self.index.find_free_rooms(2, "2024-03-03", "2024-03-09")
+        index = AvailabilityIndex([{"hotel_id": 3, "rooms": 0}], [])
+        self.assertEqual(index.find_free_rooms(3, "2024-03-03",
+                                               "2024-03-09"), [])
+
+    def test_add_and_remove(self):
+        """Test that added and removed stays change the free rooms"""
+        reservation = make_reservation(5, 3, "2024-03-02", "2024-03-03")
+        self.index.add(reservation)
+        self.assertEqual(self.index.find_free_rooms(
+            1, "2024-03-02", "2024-03-03"), [2])
+        self.index.remove(reservation)
+        self.index.remove(make_reservation(1, 1, "2024-03-01",
+                                           "2024-03-05"))
+        self.assertEqual(self.index.find_free_rooms(
+            1, "2024-03-02", "2024-03-03"), [1, 2, 3])
+
+    def test_overlapping_bookings_are_reported(self):
+        """Test that overlaps already stored are reported on build"""
+        index = AvailabilityIndex(
+            [], [make_reservation(1, 1, "2024-03-01", "2024-03-05"),
+                 make_reservation(2, 1, "2024-03-04", "2024-03-06")])
+        self.assertEqual(index.overlaps, [(1, 2)])
+
+    def test_invalid_dates(self):
+        """Test that a check-out before the check-in is rejected"""
+        with self.assertRaises(ValueError):
+            self.index.find_conflict(
+                make_reservation(5, 1, "2024-03-05", "2024-03-01"))
+        with self.assertRaises(ValueError):
+            self.index.find_free_rooms(1, "2024-03-05", "2024-03-05")
+        for check_in in (20240301, ["2024-03-01"], "2024-3-1"):
+            with self.subTest(check_in=check_in):
+                with self.assertRaises(ValueError):
+                    self.index.find_conflict(
+                        make_reservation(5, 1, check_in, "2024-03-05"))
+
+    def test_check_stay(self):
+        """Test that a stay needs its dates and matching nights"""
+        reservation = make_reservation(5, 1, "2024-03-01", "2024-03-04")
+        check_stay({**reservation, "nights": 3})
+        for changes in ({"nights": 2}, {"nights": True}, {"nights": "3"},
+                        {"check_in": None, "nights": 3},
+                        {"check_out": None, "nights": 3}, {}):
+            with self.subTest(changes=changes):
+                with self.assertRaises(ValueError):
+                    check_stay({**reservation, **changes})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""Test cases for the change feed of the json db files"""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from models import changelog, storage
+from models.changelog import Follower
+from models.storage import JsonStore
+
+
+class TestChangeLog(unittest.TestCase):
+    """Test cases for the log segments, replay and follower"""
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "hotels.json")
+        with open(self.file_path, "w", encoding="UTF-8") as db_file:
+            json.dump([{"hotel_id": 1, "name": "Hyatt"},
+                       {"hotel_id": 2, "name": "Hilton"}], db_file, indent=4)
+        self.store = JsonStore(self.file_path, "hotel_id")
+        self.replica_path = os.path.join(self.temp_dir, "replica.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_replace_all_logs_changes(self):
+        """Test that saving all the records only logs the changed ones"""
+        self.store.replace_all([{"hotel_id": 1, "name": "Hyatt"},
+                                {"hotel_id": 3, "name": "Marriott"}])
+        self.assertEqual([(entry["op"], entry["key"]) for entry
+                          in changelog.read_changes(self.file_path)],
+                         [("delete", 2), ("put", 3)])
+
+    def test_changes_survive_compaction(self):
+        """Test that the archived segments keep the whole history"""
+        self.store.update(1, {"name": "New Hyatt"})
+        self.store.compact()
+        self.store.delete(2)
+        self.store.compact()
+        self.store.insert({"hotel_id": 3, "name": "Marriott"})
+        self.assertEqual(len(changelog.list_log_segments(self.file_path)), 3)
+        self.assertEqual([entry["lsn"] for entry
+                          in changelog.read_changes(self.file_path)],
+                         [1, 2, 3])
+        self.assertEqual([entry["op"] for entry
+                          in changelog.read_changes(self.file_path, 2)],
+                         ["put"])
+        with open(self.file_path, "rb") as db_file:
+            self.assertNotIn(b"\n", db_file.read())
+
+    def test_archived_segments_are_pruned(self):
+        """Test that compaction keeps a limited number of segments"""
+        max_archived_logs = storage.MAX_ARCHIVED_LOGS
+        storage.MAX_ARCHIVED_LOGS = 2
+        try:
+            for number in range(5):
+                self.store.update(1, {"name": f"Hyatt {number}"})
+                self.store.compact()
+        finally:
+            storage.MAX_ARCHIVED_LOGS = max_archived_logs
+        wal_path = self.file_path + storage.WAL_EXTENSION
+        self.assertEqual(storage.list_archived_logs(wal_path),
+                         [storage.get_archive_path(wal_path, 3),
+                          storage.get_archive_path(wal_path, 4)])
+        self.assertEqual([entry["lsn"] for entry
+                          in changelog.read_changes(self.file_path, 3)],
+                         [4, 5])
+        self.assertEqual(JsonStore(self.file_path, "hotel_id").get(1),
+                         {"hotel_id": 1, "name": "Hyatt 4"})
+
+    def test_prune(self):
+        """Test that prune keeps the changes a reader still needs"""
+        for number in range(4):
+            self.store.update(1, {"name": f"Hyatt {number}"})
+            self.store.update(2, {"name": f"Hilton {number}"})
+            self.store.compact()
+        self.assertEqual(len(changelog.list_log_segments(self.file_path)), 5)
+        self.assertEqual(changelog.prune(self.file_path, before_lsn=5), [
+            storage.get_archive_path(self.file_path + storage.WAL_EXTENSION,
+                                     base) for base in (0, 2)])
+        self.assertEqual([entry["lsn"] for entry
+                          in changelog.read_changes(self.file_path, 5)],
+                         [6, 7, 8])
+        self.assertEqual(len(changelog.prune(self.file_path, keep=1)), 1)
+        self.assertEqual(changelog.prune(self.file_path, keep=1,
+                                         before_lsn=8), [])
+        self.assertEqual(len(changelog.list_log_segments(self.file_path)), 2)
+
+    def test_compressed_snapshot(self):
+        """Test that a compressed snapshot is read like a plain one"""
+        storage.COMPRESS_SNAPSHOTS = True
+        try:
+            self.store.update(1, {"name": "New Hyatt"})
+            self.store.compact()
+        finally:
+            storage.COMPRESS_SNAPSHOTS = False
+        with open(self.file_path, "rb") as db_file:
+            self.assertEqual(json.loads(gzip.decompress(db_file.read()))[0],
+                             {"hotel_id": 1, "name": "New Hyatt"})
+        self.assertEqual(JsonStore(self.file_path, "hotel_id").all(),
+                         self.store.all())
+
+    def test_replay(self):
+        """Test rebuilding the records from the snapshot and log tail"""
+        self.store.update(1, {"name": "New Hyatt"})
+        self.store.delete(2)
+        self.assertEqual(changelog.replay(self.file_path, self.replica_path,
+                                          "hotel_id", compress=True), (1, 2))
+        replica = JsonStore(self.replica_path, "hotel_id")
+        self.assertEqual(replica.all(), self.store.all())
+        self.assertEqual(replica.get_versioned(1)[1], 2)
+
+    def test_follower(self):
+        """Test that a follower copies new changes and compactions"""
+        follower = Follower(self.file_path, self.replica_path, "hotel_id",
+                            indexed_fields=("name",))
+        self.assertEqual(follower.poll(), 0)
+        self.store.update(1, {"name": "New Hyatt"})
+        self.store.insert({"hotel_id": 3, "name": "Marriott"})
+        self.assertEqual(follower.poll(), 2)
+        self.assertEqual(follower.store.find("name", "New Hyatt"),
+                         [{"hotel_id": 1, "name": "New Hyatt"}])
+        self.store.compact()
+        self.store.delete(2)
+        follower.poll()
+        self.assertEqual(follower.store.all(), self.store.all())
+        self.assertEqual(follower.store.log["lsn"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Test cases for the codecs of the db files"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from models import codec, storage
+from models.storage import JsonStore
+
+RECORDS = [{"hotel_id": 1, "name": "Hyatt", "country": "México",
+            "rooms": 40, "rating": 4.5, "open": True, "notes": None},
+           {"hotel_id": 2, "name": "Hilton", "country": "Perú",
+            "rooms": 0, "rating": 0.0, "open": False, "notes": []}]
+
+
+class TestCodec(unittest.TestCase):
+    """Test cases for the json and binary formats"""
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "hotels.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_formats_round_trip(self):
+        """Test that every available format decodes to the same records"""
+        for file_format in codec.FORMATS:
+            with self.subTest(file_format=file_format):
+                if file_format == "msgpack" and codec.msgpack is None:
+                    self.skipTest("msgpack is not installed")
+                codec.write_file(self.file_path, RECORDS, file_format)
+                self.assertEqual(codec.read_file(self.file_path), RECORDS)
+
+    def test_stdlib_fallback(self):
+        """Test that the stdlib json gives the same compact output"""
+        data = codec.dumps(RECORDS)
+        orjson, codec.orjson = codec.orjson, None
+        try:
+            self.assertEqual(codec.get_json_library(), "stdlib")
+            self.assertEqual(codec.dumps(RECORDS), data)
+            self.assertEqual(codec.loads(data), RECORDS)
+        finally:
+            codec.orjson = orjson
+
+    def test_only_export_is_indented(self):
+        """Test that json is compact unless pretty"""
+        self.assertNotIn(b"\n", codec.encode(RECORDS))
+        pretty = codec.encode(RECORDS, pretty=True)
+        self.assertIn(b'\n    {\n        "hotel_id": 1', pretty)
+        self.assertEqual(codec.decode(pretty), RECORDS)
+
+    def test_invalid_data(self):
+        """Test that unknown formats and truncated records are errors"""
+        with self.assertRaises(ValueError):
+            codec.encode(RECORDS, "xml")
+        with self.assertRaises(ValueError):
+            codec.decode(codec.encode(RECORDS, "records")[:-1])
+        with self.assertRaises(ValueError):
+            codec.decode(b"[{")
+
+    def test_store_snapshot_format(self):
+        """Test that a store reads and compacts a snapshot of any format"""
+        codec.write_file(self.file_path, RECORDS, "records")
+        store = JsonStore(self.file_path, "hotel_id")
+        self.assertEqual(store.get(2)["country"], "Perú")
+        storage.SNAPSHOT_FORMAT = "records"
+        try:
+            store.update(1, {"name": "New Hyatt"})
+            store.compact()
+        finally:
+            storage.SNAPSHOT_FORMAT = "json"
+        with open(self.file_path, "rb") as db_file:
+            self.assertTrue(db_file.read().startswith(codec.RECORDS_HEADER))
+        self.assertEqual(JsonStore(self.file_path, "hotel_id").get(1)["name"],
+                         "New Hyatt")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Stress test of several processes writing to the same db files"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+from models import sqlite_store, storage
+from models.sqlite_store import SqliteStore
+from models.storage import JsonStore
+
+PROCESSES = 8
+INCREMENTS = 50
+
+
+def open_store(backend, file_path):
+    """Opens the store of the hotels file with a given backend."""
+    if backend == "sqlite":
+        return SqliteStore(file_path, "hotel_id", ("hotel_id", "counter"))
+    return JsonStore(file_path, "hotel_id")
+
+
+def increment_counters(backend, file_path):
+    """Increments the counter of every hotel and adds a hotel."""
+    storage.COMPACTION_THRESHOLD = 40
+    store = open_store(backend, file_path)
+    for _ in range(INCREMENTS):
+        for hotel_id in (1, 2):
+            store.update_with(
+                hotel_id, lambda hotel: {"counter": hotel["counter"] + 1})
+    store.insert({"hotel_id": f"process {os.getpid()}", "counter": 0})
+
+
+class TestConcurrentWrites(unittest.TestCase):
+    """Test that concurrent read-modify-writes don't lose increments"""
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "hotels.json")
+        with open(self.file_path, "w", encoding="UTF-8") as db_file:
+            json.dump([{"hotel_id": 1, "counter": 0},
+                       {"hotel_id": 2, "counter": 0}], db_file)
+
+    def tearDown(self):
+        sqlite_store.close_connection(
+            os.path.join(self.temp_dir, sqlite_store.DB_FILE_NAME))
+        shutil.rmtree(self.temp_dir)
+
+    def run_processes(self, backend):
+        """Runs the processes and checks the final state of the store."""
+        open_store(backend, self.file_path)
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=increment_counters,
+                                     args=(backend, self.file_path))
+                     for _ in range(PROCESSES)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        records = open_store(backend, self.file_path).all()
+        self.assertEqual(len(records), 2 + PROCESSES)
+        for record in records[:2]:
+            self.assertEqual(record["counter"], PROCESSES * INCREMENTS)
+
+    def test_json_store(self):
+        """Test the json store with its write-ahead log"""
+        self.run_processes("json")
+
+    def test_sqlite_store(self):
+        """Test the SQLite store"""
+        self.run_processes("sqlite")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,14 @@
 """Test cases for Customer model"""
 
 import unittest
+import db_fixture
 from models.customer import Customer
 
 
 class TestCustomer(unittest.TestCase):
     """Test cases for the Customer class"""
     def setUp(self):
-        Customer.delete(1)
+        db_fixture.use_temp_db(self)
         customer_data = {
             'customer_id': 1,
             'name': "Emiliano Zapata",
@@ -25,6 +26,11 @@ class TestCustomer(unittest.TestCase):
         Customer.display(1)
         self.assertEqual(len(all_customers), 1)
 
+    def test_create_many_from_generator(self):
+        """Test creating the customers yielded by a generator"""
+        Customer.create_many(customer for customer in (self.customer,))
+        self.assertEqual(Customer.load(), [self.customer.map_to_dict()])
+
     def test_modify(self):
         """Test modify a customer"""
         print("\nRunning test_modify")
@@ -1,14 +1,14 @@
 """Test cases for the Hotel model"""
 
 import unittest
+import db_fixture
 from models.hotel import Hotel
 
 
 class TestHotel(unittest.TestCase):
     """Test cases for the Hotel class"""
     def setUp(self):
-        Hotel.delete_by("hotel_id", 1)
-        Hotel.delete_by("hotel_id", 2)
+        db_fixture.use_temp_db(self)
         hotel_data = {
             "hotel_id": 1,
             "name": "Hyatt",
@@ -50,6 +50,38 @@ class TestHotel(unittest.TestCase):
         self.assertEqual(all_hotels[1]['name'], "Hilton")
         self.assertEqual(len(all_hotels), 2)
 
+    def test_bulk_methods(self):
+        """Test creating, modifying and deleting several hotels at once"""
+        with Hotel.transaction():
+            Hotel.create_many([self.hotel, self.hotel_2])
+            self.assertEqual(Hotel.modify_many({1: {"category": "4"},
+                                                2: {"category": "3"},
+                                                5: {"category": "1"}}), 2)
+        self.assertEqual(Hotel.search_by("hotel_id", 2)["category"], "3")
+        self.assertEqual(Hotel.delete_where(
+            lambda hotel: hotel["category"] == "4"), 1)
+        self.assertIsNone(Hotel.search_by("hotel_id", 1))
+
+    def test_create_many_from_generator(self):
+        """Test creating the hotels yielded by a generator"""
+        Hotel.create_many(hotel for hotel in (self.hotel, self.hotel_2))
+        self.assertEqual([hotel["name"] for hotel in Hotel.load()],
+                         ["Hyatt", "Hilton"])
+
+    def test_search(self):
+        """Test searching hotels with several predicates and pages"""
+        Hotel.create_many([self.hotel, self.hotel_2])
+        hotels = Hotel.search([("country", "=", "México"),
+                               ("category", "=", "5")], order_by="name")
+        self.assertEqual([hotel["name"] for hotel in hotels],
+                         ["Hilton", "Hyatt"])
+        hotels = Hotel.search([("name", "prefix", "H")], order_by="-name",
+                              offset=1, limit=5)
+        self.assertEqual([hotel["hotel_id"] for hotel in hotels], [2])
+        Hotel.modify(2, "category", "4")
+        self.assertEqual(list(Hotel.search([("category", "=", "4")])),
+                         [Hotel.search_by("hotel_id", 2)])
+
     def test_delete_hotel(self):
         """Test deleting a hotel"""
         print("\nRunning test_delete_hotel")
@@ -64,7 +96,7 @@ class TestHotel(unittest.TestCase):
 
     def test_hotel_not_found(self):
         """Test searching for an invalid hotel"""
-        self.assertEqual(Hotel.search_by("hotel_id", 3), "Hotel not found")
+        self.assertIsNone(Hotel.search_by("hotel_id", 3))
 
     def test_invalid_edition(self):
         """Test editing an invalid hotel"""
@@ -0,0 +1,135 @@
+"""Test cases for the searches of the storage engines"""
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from models import sqlite_store
+from models.hotel import Hotel
+from models.query import SortedIndex, get_sort_key
+from models.sqlite_store import SqliteStore
+from models.storage import JsonStore
+
+COUNTRIES = ("México", "Canada", "Perú")
+SEARCHES = [
+    ([("country", "=", "Perú")], None),
+    ([("country", "=", "México"), ("category", "=", "3")], "name"),
+    ([("category", "=", "1"), ("name", "prefix", "Ca")], "-name"),
+    ([("name", "prefix", "Hotel 1")], "name"),
+    ([("name", "prefix", "")], "-category"),
+    ([], "name"),
+    ([], "-name"),
+    ([("hotel_id", "=", 7), ("country", "=", "Canada")], None),
+    ([("country", "=", "Chile")], "name"),
+]
+
+
+def search_records(records, predicates, order_by):
+    """Searches a list of records by scanning it."""
+    found = [record for record in records
+             if all(record.get(field_name) == value if operator == "="
+                    else str(record.get(field_name, 0)).startswith(value)
+                    and isinstance(record.get(field_name), str)
+                    for field_name, operator, value in predicates)]
+    if order_by is not None:
+        found.sort(key=get_sort_key(order_by.lstrip("-")),
+                   reverse=order_by.startswith("-"))
+    return found
+
+
+class TestSearch(unittest.TestCase):
+    """Test that the indexed searches find what a scan finds"""
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "hotels.json")
+        generator = random.Random(4)
+        self.records = [{"hotel_id": i,
+                         "name": f"{generator.choice(('Hotel', 'Casa'))} {i}",
+                         "country": generator.choice(COUNTRIES),
+                         "category": str(generator.randint(1, 5))}
+                        for i in range(300)]
+        with open(self.file_path, "w", encoding="UTF-8") as db_file:
+            json.dump(self.records, db_file)
+        self.json_store = JsonStore(self.file_path, "hotel_id", Hotel,
+                                    Hotel.INDEXED_FIELDS,
+                                    Hotel.SORTED_FIELDS)
+        self.sqlite_store = SqliteStore(
+            self.file_path, "hotel_id", ("hotel_id", "name", "country",
+                                         "category"),
+            (*Hotel.INDEXED_FIELDS, *Hotel.SORTED_FIELDS))
+
+    def tearDown(self):
+        sqlite_store.close_connection(self.sqlite_store.db_path)
+        shutil.rmtree(self.temp_dir)
+
+    def check_searches(self):
+        """Compares the searches of both stores with scans of the records."""
+        for store in (self.json_store, self.sqlite_store):
+            for predicates, order_by in SEARCHES:
+                expected = search_records(self.records, predicates, order_by)
+                for offset, limit in ((0, None), (0, 5), (3, 4)):
+                    with self.subTest(store=type(store).__name__,
+                                      predicates=predicates,
+                                      order_by=order_by, offset=offset):
+                        found = list(store.search(predicates, order_by,
+                                                  offset, limit))
+                        page = expected[offset:None if limit is None
+                                        else offset + limit]
+                        if order_by is None:
+                            found_ids = {record["hotel_id"]
+                                         for record in found}
+                            self.assertEqual(len(found), len(page))
+                            self.assertLessEqual(found_ids, {
+                                record["hotel_id"] for record in expected})
+                        else:
+                            field_name = order_by.lstrip("-")
+                            self.assertEqual(
+                                [record.get(field_name) for record in found],
+                                [record.get(field_name) for record in page])
+
+    def test_searches(self):
+        """Test searches with predicates, sorting and pages"""
+        self.check_searches()
+
+    def test_searches_after_changes(self):
+        """Test that the indexes follow inserts, updates and deletes"""
+        changes = {3: {"name": "Casa Nueva", "category": "1"},
+                   4: {"country": "Perú"}, 5: {"name": None}}
+        for store in (self.json_store, self.sqlite_store):
+            store.update_many(changes)
+            store.delete_many([6, 7])
+            store.insert({"hotel_id": 300, "name": "Casa 300",
+                          "country": "México", "category": "3"})
+        for key, record_changes in changes.items():
+            self.records[key].update(record_changes)
+        self.records[5].pop("name")
+        del self.records[6:8]
+        self.records.append({"hotel_id": 300, "name": "Casa 300",
+                             "country": "México", "category": "3"})
+        self.check_searches()
+
+    def test_invalid_predicate(self):
+        """Test that an unknown operator is rejected"""
+        with self.assertRaises(ValueError):
+            self.json_store.search([("name", "like", "Casa%")])
+
+
+class TestSortedIndex(unittest.TestCase):
+    """Test cases for the SortedIndex class"""
+    def test_prefix_range(self):
+        """Test finding, adding and removing values with a prefix"""
+        index = SortedIndex()
+        index.build([("Hyatt", 1), ("Hilton", 2), (None, 3), ("Hyatt", 4)])
+        start, end = index.find_range("Hy")
+        self.assertEqual(list(index.iterate(start, end)), [1, 4])
+        index.add("Hyde", 5)
+        index.remove("Hyatt", 1)
+        start, end = index.find_range("Hy")
+        self.assertEqual(list(index.iterate(start, end, True)), [5, 4])
+        self.assertEqual(index.find_range(""), (0, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,19 +1,34 @@
 """Test cases for the Reservation model"""
 
 import unittest
+import db_fixture
+from models.customer import Customer
+from models.hotel import Hotel
 from models.reservation import Reservation
 
 
 class TestReservation(unittest.TestCase):
     """Test cases for the Reservation class"""
     def setUp(self):
+        db_fixture.use_temp_db(self)
+        Hotel.create(Hotel({"hotel_id": 1, "name": "Hyatt",
+                            "country": "México", "address": "Av. 2",
+                            "phone": "3338831234", "category": "5",
+                            "reserved_rooms": 0, "rooms": 1}))
+        Customer.create(Customer({"customer_id": 1,
+                                  "name": "Emiliano Zapata",
+                                  "phone": "5535698789",
+                                  "address": "Bosque de Chapultepec",
+                                  "credit_card": "5698-5621-5532-4742"}))
         reservation_data = {
             "reservation_id": 1,
             "customer_id": 1,
             "hotel_id": 1,
             "room_id": 1,
             "nights": 2,
-            "price_per_night": 2000
+            "price_per_night": 2000,
+            "check_in": "2024-05-01",
+            "check_out": "2024-05-03"
         }
         self.reservation = Reservation(reservation_data)
 
@@ -31,6 +46,112 @@ class TestReservation(unittest.TestCase):
         all_reservations = Reservation.load()
         self.assertEqual(len(all_reservations), 0)
 
+    def test_overlapping_reservation(self):
+        """Test that a room can't be booked twice on the same dates"""
+        print("\nRunning test_overlapping_reservation")
+        Hotel.create(Hotel({"hotel_id": 10, "name": "Fiesta Inn",
+                            "country": "México", "address": "Av. 1",
+                            "phone": "3331234567", "category": "4",
+                            "reserved_rooms": 0, "rooms": 2}))
+        stays = [Reservation({"reservation_id": 10 + i, "customer_id": 1,
+                              "hotel_id": 10, "room_id": room_id,
+                              "nights": 2, "price_per_night": 1500,
+                              "check_in": check_in, "check_out": check_out})
+                 for i, (room_id, check_in, check_out) in enumerate([
+                     (1, "2024-05-01", "2024-05-03"),
+                     (2, "2024-05-02", "2024-05-04"),
+                     (1, "2024-05-02", "2024-05-04")])]
+        self.assertTrue(Reservation.create_many(stays[:2]))
+        self.assertFalse(Reservation.create(stays[2]))
+        self.assertEqual(Reservation.find_free_rooms(
+            10, "2024-05-03", "2024-05-04"), [1])
+        Reservation.cancel(10)
+        self.assertEqual(Reservation.find_free_rooms(
+            10, "2024-05-01", "2024-05-02"), [1, 2])
+        self.assertTrue(Reservation.create(stays[2]))
+        self.assertEqual(Reservation.cancel_many([11, 12]), 2)
+        Hotel.delete_by("hotel_id", 10)
+
+    def test_room_outside_hotel(self):
+        """Test that a room the hotel doesn't have can't be booked"""
+        print("\nRunning test_room_outside_hotel")
+        for room_id in (0, -1, 2, 99):
+            reservation = Reservation({**self.reservation.map_to_dict(),
+                                       "reservation_id": 21,
+                                       "room_id": room_id})
+            self.assertFalse(Reservation.create(reservation))
+        self.assertIsNone(Reservation.store().get(21))
+
+    def test_invalid_stay(self):
+        """Test that reservations without a valid stay fail"""
+        print("\nRunning test_invalid_stay")
+        for changes in ({"check_in": None}, {"check_out": None},
+                        {"nights": 3}, {"check_in": 20240501},
+                        {"check_out": "2024-04-30"}):
+            with self.subTest(changes=changes):
+                reservation = Reservation({**self.reservation.map_to_dict(),
+                                           "reservation_id": 22, **changes})
+                self.assertFalse(Reservation.create(reservation))
+        self.assertIsNone(Reservation.store().get(22))
+
+    def test_hotel_without_rooms(self):
+        """Test that the rooms of a hotel without rooms aren't checked"""
+        print("\nRunning test_hotel_without_rooms")
+        Hotel.create(Hotel({"hotel_id": 2, "name": "Hilton",
+                            "country": "México", "address": "Av. 4",
+                            "phone": "5551305300", "category": "5",
+                            "reserved_rooms": 0}))
+        self.assertTrue(Reservation.create(Reservation({
+            **self.reservation.map_to_dict(), "hotel_id": 2,
+            "room_id": 7})))
+        self.assertFalse(Reservation.create(Reservation({
+            **self.reservation.map_to_dict(), "reservation_id": 23,
+            "hotel_id": 2, "room_id": 7})))
+        with self.assertRaises(ValueError):
+            Reservation.find_free_rooms(2, "2024-05-01", "2024-05-03")
+
+    def test_delete_where(self):
+        """Test that deleted reservations free their rooms"""
+        print("\nRunning test_delete_where")
+        self.assertTrue(Reservation.create(self.reservation))
+        self.assertEqual(Reservation.find_free_rooms(
+            1, "2024-05-01", "2024-05-03"), [])
+        self.assertEqual(Reservation.delete_where(
+            lambda reservation: reservation["hotel_id"] == 1), 1)
+        self.assertEqual(Reservation.find_free_rooms(
+            1, "2024-05-01", "2024-05-03"), [1])
+
+    def test_missing_reference(self):
+        """Test that reservations of missing hotels or customers fail"""
+        print("\nRunning test_missing_reference")
+        for field_name in ("hotel_id", "customer_id"):
+            reservation = Reservation({**self.reservation.map_to_dict(),
+                                       "reservation_id": 20,
+                                       field_name: 404})
+            self.assertFalse(Reservation.create(reservation))
+        self.assertIsNone(Reservation.store().get(20))
+
+    def test_delete_references(self):
+        """Test the cascade and restrict rules when deleting a hotel"""
+        print("\nRunning test_delete_references")
+        Hotel.create(Hotel({"hotel_id": 30, "name": "Camino Real",
+                            "country": "México", "address": "Av. 3",
+                            "phone": "5552638888", "category": "5",
+                            "reserved_rooms": 0, "rooms": 1}))
+        self.assertTrue(Reservation.create(Reservation({
+            "reservation_id": 30, "customer_id": 1, "hotel_id": 30,
+            "room_id": 1, "nights": 1, "price_per_night": 3000,
+            "check_in": "2024-06-01", "check_out": "2024-06-02"})))
+        Reservation.ON_DELETE = "restrict"
+        try:
+            self.assertFalse(Hotel.delete_by("hotel_id", 30))
+        finally:
+            Reservation.ON_DELETE = "cascade"
+        self.assertIsNotNone(Hotel.store().get(30))
+        self.assertIsNotNone(Reservation.store().get(30))
+        self.assertTrue(Hotel.delete_by("hotel_id", 30))
+        self.assertIsNone(Reservation.store().get(30))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,219 @@
+"""Test cases for the HTTP service of the models"""
+
+import asyncio
+import contextlib
+import io
+import threading
+import time
+import unittest
+from unittest import mock
+import db_fixture
+from load_generator import HttpClient, run_load
+from models import storage
+from models.customer import Customer
+from models.hotel import Hotel
+from models.storage import StorageError
+from service import HotelService, call_model
+
+HOTEL = {"hotel_id": 40, "name": "Presidente", "country": "México",
+         "address": "Campos Elíseos 218", "phone": "5553277700",
+         "category": "5", "reserved_rooms": 0, "rooms": 2}
+CUSTOMER = {"customer_id": 1, "name": "Emiliano Zapata",
+            "phone": "5535698789", "address": "Bosque de Chapultepec",
+            "credit_card": "5698-5621-5532-4742"}
+
+
+class TestHotelService(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the HotelService class"""
+    async def asyncSetUp(self):
+        db_fixture.use_temp_db(self)
+        self.service = HotelService()
+        self.port = await self.service.start(port=0)
+        self.client = await HttpClient.connect(port=self.port)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.service.stop()
+
+    async def test_hotel_requests(self):
+        """Test creating, reading, modifying and deleting a hotel"""
+        status, response = await self.client.request("POST", "/hotels",
+                                                     HOTEL)
+        self.assertEqual(status, 201)
+        self.assertEqual(response["result"]["name"], "Presidente")
+        self.assertEqual((await self.client.request("POST", "/hotels",
+                                                    HOTEL))[0], 409)
+        status, response = await self.client.request(
+            "PATCH", "/hotels/40", {"name": "Presidente Polanco"})
+        self.assertEqual(response["result"]["name"], "Presidente Polanco")
+        self.assertEqual(await self.client.request(
+            "GET", "/hotels/40/free_rooms?check_in=2024-05-01"
+                   "&check_out=2024-05-03"), (200, [1, 2]))
+        self.assertEqual((await self.client.request(
+            "GET", "/hotels/40/free_rooms?check_in=2024-05-03"
+                   "&check_out=2024-05-01"))[0], 400)
+        self.assertEqual((await self.client.request("DELETE",
+                                                    "/hotels/40"))[0], 200)
+        self.assertEqual((await self.client.request("GET",
+                                                    "/hotels/40"))[0], 404)
+
+    async def test_rejected_requests(self):
+        """Test that invalid requests get errors and keep the connection"""
+        await self.client.request("POST", "/customers", CUSTOMER)
+        reservation = {"reservation_id": 40, "customer_id": 1,
+                       "hotel_id": 404, "room_id": 1, "nights": 1,
+                       "price_per_night": 1000, "check_in": "2024-05-01",
+                       "check_out": "2024-05-02"}
+        status, response = await self.client.request(
+            "POST", "/reservations", reservation)
+        self.assertEqual(status, 409)
+        self.assertEqual(response["messages"],
+                         ["Hotel 404 of reservation 40 not found"])
+        for changes in ({"check_in": 20240501}, {"nights": 2},
+                        {"check_out": None}):
+            with self.subTest(changes=changes):
+                self.assertEqual((await self.client.request(
+                    "POST", "/reservations",
+                    {**reservation, **changes}))[0], 400)
+        self.assertEqual((await self.client.request(
+            "POST", "/hotels", {"hotel_id": 41}))[0], 400)
+        self.assertEqual((await self.client.request(
+            "PATCH", "/reservations/40", {"nights": 2}))[0], 405)
+        self.assertEqual((await self.client.request("GET", "/rooms"))[0],
+                         404)
+
+    async def test_invalid_numbers(self):
+        """Test that invalid sizes and positions are bad requests"""
+        for query in ("limit=abc", "limit=-1", "offset=1.5", "offset=-2"):
+            with self.subTest(query=query):
+                self.assertEqual((await self.client.request(
+                    "GET", f"/hotels?{query}"))[0], 400)
+        self.assertEqual((await self.client.request(
+            "GET", "/hotels?offset=0&limit=1"))[0], 200)
+        for size in ("abc", "-5"):
+            with self.subTest(size=size):
+                client = await HttpClient.connect(port=self.port)
+                try:
+                    client.writer.write(f"POST /hotels HTTP/1.1\r\n"
+                                        f"Content-Length: {size}\r\n"
+                                        f"\r\n".encode("ascii"))
+                    status_line = await client.reader.readline()
+                    self.assertEqual(status_line.split()[1], b"400")
+                finally:
+                    await client.close()
+
+    async def test_storage_errors_are_returned(self):
+        """Test that a storage error is a response, not the end"""
+        await self.client.request("POST", "/hotels", HOTEL)
+        with mock.patch.object(Hotel, "store",
+                               side_effect=StorageError("Disk full")):
+            status, response = await self.client.request(
+                "PATCH", "/hotels/40", {"name": "Invalid"})
+        self.assertEqual((status, response["error"]), (500, "Disk full"))
+        self.assertEqual((await self.client.request("GET",
+                                                    "/hotels/40"))[0], 200)
+
+    async def test_failed_log_writes_are_returned(self):
+        """Test that a write the disk refuses is a response, not the end"""
+        await self.client.request("POST", "/hotels", HOTEL)
+        store = Hotel.store()
+        if not isinstance(store, storage.JsonStore):
+            self.skipTest("Only the json engine has a log")
+        with db_fixture.fail_appends(store.wal_path):
+            status, response = await self.client.request(
+                "PATCH", "/hotels/40", {"name": "Invalid"})
+            self.assertEqual(status, 500)
+            self.assertIn("No space left on device", response["error"])
+            status, response = await self.client.request("GET",
+                                                         "/hotels/40")
+            self.assertEqual((status, response["name"]), (200, "Presidente"))
+        status, response = await self.client.request(
+            "PATCH", "/hotels/40", {"name": "Presidente Polanco"})
+        self.assertEqual((status, response["result"]["name"]),
+                         (200, "Presidente Polanco"))
+
+    async def test_messages_of_other_threads(self):
+        """Test that a model call only gets the messages of its thread"""
+        collecting = threading.Event()
+        reported = threading.Event()
+
+        def create():
+            collecting.set()
+            reported.wait(timeout=5)
+            Customer.create(Customer(CUSTOMER))
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            call = asyncio.get_running_loop().run_in_executor(
+                None, call_model, create)
+            await asyncio.get_running_loop().run_in_executor(
+                None, collecting.wait, 5)
+            Hotel.create(Hotel(HOTEL))
+            reported.set()
+            _, reported_messages = await call
+        self.assertEqual(reported_messages,
+                         ["Customer Emiliano Zapata created successfully"])
+        self.assertEqual(output.getvalue(),
+                         "Hotel Presidente created successfully\n")
+
+    async def test_reads_while_a_write_waits(self):
+        """Test that reads are served while a write waits for the db lock"""
+        await self.client.request("POST", "/hotels", HOTEL)
+        reader = await HttpClient.connect(port=self.port)
+        store = Hotel.store()
+        if not isinstance(store, storage.JsonStore):
+            self.skipTest("Only the json engine has a lock file")
+        try:
+            with storage.file_lock(store.lock_path):
+                write = asyncio.create_task(self.client.request(
+                    "PATCH", "/hotels/40", {"name": "Presidente Polanco"}))
+                status, response = await asyncio.wait_for(
+                    reader.request("GET", "/hotels/40"), timeout=5)
+                self.assertEqual((status, response["name"]),
+                                 (200, "Presidente"))
+                self.assertFalse(write.done())
+            status, response = await asyncio.wait_for(write, timeout=5)
+            self.assertEqual(response["result"]["name"], "Presidente Polanco")
+        finally:
+            await reader.close()
+
+    async def test_reads_while_a_write_appends(self):
+        """Test that reads are served while a write appends to the log"""
+        await self.client.request("POST", "/hotels", HOTEL)
+        reader = await HttpClient.connect(port=self.port)
+        store = Hotel.store()
+        if not isinstance(store, storage.JsonStore):
+            self.skipTest("Only the json engine has a log")
+        append_to_log = store._append_to_log  # pylint: disable=W0212
+
+        def append_slowly(entries):
+            time.sleep(1)
+            append_to_log(entries)
+
+        try:
+            with mock.patch.object(store, "_append_to_log", append_slowly):
+                write = asyncio.create_task(self.client.request(
+                    "PATCH", "/hotels/40", {"name": "Presidente Polanco"}))
+                await asyncio.sleep(0.1)
+                start = time.monotonic()
+                status, response = await asyncio.wait_for(
+                    reader.request("GET", "/hotels/40"), timeout=5)
+                self.assertLess(time.monotonic() - start, 0.5)
+                self.assertEqual((status, response["name"]),
+                                 (200, "Presidente"))
+                self.assertFalse(write.done())
+                status, response = await asyncio.wait_for(write, timeout=5)
+            self.assertEqual(response["result"]["name"], "Presidente Polanco")
+        finally:
+            await reader.close()
+
+    async def test_load_generator(self):
+        """Test that the load generator measures the requests it sends"""
+        stats = await run_load(self.port, requests=200, connections=4,
+                               write_ratio=0.2, hotels=5)
+        self.assertEqual((stats["requests"], stats["errors"]), (200, 0))
+        self.assertLessEqual(stats["p50_ms"], stats["p99_ms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
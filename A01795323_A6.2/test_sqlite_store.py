@@ -0,0 +1,106 @@
+"""Test cases for the SQLite storage engine"""
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from models import sqlite_store
+from models.sqlite_store import SqliteStore
+
+FIELDS = ("hotel_id", "name", "country")
+
+
+class TestSqliteStore(unittest.TestCase):
+    """Test cases for the SqliteStore class"""
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "hotels.json")
+        with open(self.file_path, "w", encoding="UTF-8") as db_file:
+            json.dump([{"hotel_id": 1, "name": "Hyatt", "country": "MX"},
+                       {"hotel_id": 2, "name": "Hilton", "country": "US"}],
+                      db_file)
+        self.store = SqliteStore(self.file_path, "hotel_id", FIELDS,
+                                 ("name",))
+
+    def tearDown(self):
+        sqlite_store.close_connection(self.store.db_path)
+        shutil.rmtree(self.temp_dir)
+
+    def test_json_file_is_imported(self):
+        """Test that a new table gets the records of the json file"""
+        self.assertEqual([hotel["name"] for hotel in self.store.all()],
+                         ["Hyatt", "Hilton"])
+
+    def test_mutations_are_persisted(self):
+        """Test that a new store sees the stored mutations"""
+        self.store.insert({"hotel_id": 3, "name": "Marriott",
+                           "country": "CA"})
+        self.assertTrue(self.store.update(1, {"name": "New Hyatt"}))
+        self.assertTrue(self.store.delete(2))
+        reopened = SqliteStore(self.file_path, "hotel_id", FIELDS,
+                               ("name",))
+        self.assertEqual(reopened.all(), [
+            {"hotel_id": 1, "name": "New Hyatt", "country": "MX"},
+            {"hotel_id": 3, "name": "Marriott", "country": "CA"}])
+
+    def test_find_uses_index(self):
+        """Test that searching by an indexed field is an index lookup"""
+        self.assertEqual(self.store.find("name", "Hilton")[0]["hotel_id"], 2)
+        plan = self.store.connection.execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM "hotels" WHERE "name" = ?',
+            ("Hilton",)).fetchall()
+        self.assertIn("hotels_name_index", str(plan))
+
+    def test_missing_records(self):
+        """Test updating, deleting and searching records that don't exist"""
+        self.assertFalse(self.store.update(5, {"name": "Invalid"}))
+        self.assertFalse(self.store.delete(5))
+        self.assertIsNone(self.store.get(5))
+        self.assertEqual(self.store.find("stars", 5), [])
+
+    def test_new_fields_add_columns(self):
+        """Test that fields outside the declared ones are stored"""
+        self.store.update(1, {"rooms": 20})
+        self.assertEqual(self.store.get(1)["rooms"], 20)
+        self.assertNotIn("rooms", self.store.get(2))
+
+    def test_transaction_rollback(self):
+        """Test that a failed transaction leaves the records unchanged"""
+        with self.assertRaises(KeyError):
+            with self.store.transaction():
+                self.store.update_many({1: {"name": "New Hyatt",
+                                            "rooms": 20}})
+                self.store.insert_many([{"hotel_id": 3, "name": "Marriott"}])
+                self.store.delete_where(lambda hotel: hotel["hotel_id"] == 2)
+                raise KeyError("hotel_id")
+        self.assertEqual([hotel["name"] for hotel in self.store.all()],
+                         ["Hyatt", "Hilton"])
+        self.store.update(1, {"name": "New Hyatt"})
+        self.assertEqual(self.store.get(1)["name"], "New Hyatt")
+
+    def test_reads_use_cached_records(self):
+        """Test that the cached records are kept until the table changes"""
+        self.store.get(1)
+        self.store.get(1)["name"] = "Changed"
+        self.assertEqual(self.store.get(1)["name"], "Hyatt")
+        self.assertEqual(self.store.cache_stats(), {"hits": 2, "misses": 1,
+                                                    "cached": 1})
+        self.store.update(1, {"name": "New Hyatt"})
+        self.assertEqual(self.store.get(1)["name"], "New Hyatt")
+        with sqlite3.connect(self.store.db_path) as connection:
+            connection.execute(
+                'UPDATE "hotels" SET "name" = \'Other\' WHERE "hotel_id" = 1')
+        connection.close()
+        self.assertEqual(self.store.get(1)["name"], "Other")
+        self.assertEqual(self.store.cache_stats()["misses"], 3)
+
+    def test_invalid_field_name(self):
+        """Test that unsafe field names are rejected"""
+        with self.assertRaises(ValueError):
+            self.store.update(1, {'name" = 1; --': "Invalid"})
+
+
+if __name__ == "__main__":
+    unittest.main()
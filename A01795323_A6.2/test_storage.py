@@ -0,0 +1,287 @@
+"""Test cases for the storage engine"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from db_fixture import fail_appends
+from models.hotel import Hotel
+from models.storage import JsonStore, StorageError
+
+
+class TestJsonStore(unittest.TestCase):
+    """Test cases for the JsonStore class"""
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "hotels.json")
+        with open(self.file_path, "w", encoding="UTF-8") as db_file:
+            json.dump([{"hotel_id": 1, "name": "Hyatt"}], db_file)
+        self.store = JsonStore(self.file_path, "hotel_id")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_mutations_are_replayed_from_log(self):
+        """Test that a new store sees the logged mutations"""
+        self.store.insert({"hotel_id": 2, "name": "Hilton"})
+        self.store.update(1, {"name": "New Hyatt"})
+        self.store.delete(2)
+        reopened = JsonStore(self.file_path, "hotel_id")
+        self.assertEqual(reopened.all(), [{"hotel_id": 1,
+                                           "name": "New Hyatt"}])
+        self.assertTrue(os.path.exists(self.store.wal_path))
+
+    def test_compact(self):
+        """Test that compaction writes the snapshot and starts a new log"""
+        self.store.update(1, {"name": "New Hyatt"})
+        self.store.compact()
+        with open(self.store.wal_path, "r", encoding="UTF-8") as wal_file:
+            self.assertEqual(wal_file.read(), '{"op":"base","lsn":1}\n')
+        with open(self.file_path, "r", encoding="UTF-8") as db_file:
+            self.assertEqual(json.load(db_file)[0]["name"], "New Hyatt")
+        self.assertEqual(self.store.get_versioned(1)[1], 1)
+
+    def test_truncated_log_entry_is_ignored(self):
+        """Test that a partially written log line is discarded"""
+        self.store.update(1, {"name": "New Hyatt"})
+        with open(self.store.wal_path, "a", encoding="UTF-8") as wal_file:
+            wal_file.write('{"op":"delete","ke')
+        reopened = JsonStore(self.file_path, "hotel_id")
+        self.assertEqual(reopened.get(1)["name"], "New Hyatt")
+
+    def test_write_after_truncated_log_entry(self):
+        """Test that a partially written log line is cut off on write"""
+        with open(self.store.wal_path, "a", encoding="UTF-8") as wal_file:
+            wal_file.write('{"op":"delete","ke')
+        self.store.insert({"hotel_id": 2, "name": "Hilton"})
+        reopened = JsonStore(self.file_path, "hotel_id")
+        self.assertEqual(len(reopened.all()), 2)
+
+    def test_changes_of_other_stores_are_read_on_write(self):
+        """Test that a store reads the log entries of another store"""
+        other = JsonStore(self.file_path, "hotel_id")
+        other.insert({"hotel_id": 2, "name": "Hilton"})
+        other.compact()
+        other.update(2, {"name": "New Hilton"})
+        self.store.update(1, {"name": "New Hyatt"})
+        self.assertEqual(self.store.get(2)["name"], "New Hilton")
+        other.update(1, {"country": "MX"})
+        self.store.update(2, {"country": "US"})
+        self.assertEqual(self.store.get(1), {"hotel_id": 1,
+                                             "name": "New Hyatt",
+                                             "country": "MX"})
+
+    def test_reads_use_cached_records(self):
+        """Test that reads only go to disk when another store wrote"""
+        other = JsonStore(self.file_path, "hotel_id")
+        self.store.get(1)
+        self.store.all()
+        self.assertEqual(self.store.cache_stats(), {"hits": 2, "misses": 0,
+                                                    "cached": 1})
+        other.insert({"hotel_id": 2, "name": "Hilton"})
+        self.assertEqual(self.store.get(2)["name"], "Hilton")
+        other.replace_all([{"hotel_id": 3, "name": "Marriott"}])
+        self.assertEqual(self.store.find("name", "Marriott")[0]["hotel_id"],
+                         3)
+        self.store.insert({"hotel_id": 4, "name": "Westin"})
+        self.assertEqual(len(self.store.all()), 2)
+        self.assertEqual(self.store.cache_stats(), {"hits": 3, "misses": 2,
+                                                    "cached": 2})
+
+    def test_compare_and_set(self):
+        """Test that a change based on an old version is rejected"""
+        _, version = self.store.get_versioned(1)
+        other = JsonStore(self.file_path, "hotel_id")
+        self.assertTrue(other.compare_and_set(1, version, {"name": "A"}))
+        self.assertFalse(self.store.compare_and_set(1, version,
+                                                    {"name": "B"}))
+        self.assertEqual(self.store.get(1)["name"], "A")
+        self.assertTrue(self.store.update_with(
+            1, lambda hotel: {"name": hotel["name"] + "B"}))
+        self.assertEqual(self.store.get(1)["name"], "AB")
+        self.assertFalse(self.store.update_with(5, dict))
+
+    def test_transaction_commit(self):
+        """Test that a transaction writes its changes together"""
+        with self.store.transaction():
+            self.store.insert_many([{"hotel_id": 2, "name": "Hilton"},
+                                    {"hotel_id": 3, "name": "Marriott"}])
+            self.assertEqual(self.store.update_many(
+                {2: {"name": "New Hilton"}, 5: {"name": "Invalid"}}), 1)
+            self.assertEqual(self.store.delete_where(
+                lambda hotel: hotel["name"] == "Hyatt"), 1)
+            self.assertFalse(os.path.exists(self.store.wal_path))
+        reopened = JsonStore(self.file_path, "hotel_id")
+        self.assertEqual(reopened.all(), [{"hotel_id": 2,
+                                           "name": "New Hilton"},
+                                          {"hotel_id": 3,
+                                           "name": "Marriott"}])
+
+    def test_transaction_rollback(self):
+        """Test that a failed transaction leaves the records unchanged"""
+        with self.assertRaises(KeyError):
+            with self.store.transaction():
+                self.store.update(1, {"name": "New Hyatt"})
+                self.store.insert({"hotel_id": 2, "name": "Hilton"})
+                self.store.delete(1)
+                self.store.insert({"name": "No id"})
+        self.assertEqual(self.store.all(), [{"hotel_id": 1,
+                                             "name": "Hyatt"}])
+        self.store.insert({"hotel_id": 2, "name": "Hilton"})
+        reopened = JsonStore(self.file_path, "hotel_id")
+        self.assertEqual(len(reopened.all()), 2)
+
+    def test_failed_commit_rolls_back(self):
+        """Test that a transaction the log can't keep changes nothing"""
+        self.store.insert({"hotel_id": 2, "name": "Hilton"})
+        with fail_appends(self.store.wal_path):
+            with self.assertRaises(StorageError):
+                with self.store.transaction():
+                    self.store.update(1, {"name": "Changed"})
+                    self.store.delete(2)
+        self.assertEqual(self.store.all(), [{"hotel_id": 1, "name": "Hyatt"},
+                                            {"hotel_id": 2, "name": "Hilton"}])
+        self.store.update(2, {"name": "New Hilton"})
+        reopened = JsonStore(self.file_path, "hotel_id")
+        self.assertEqual(reopened.all(), self.store.all())
+
+    def test_failed_write(self):
+        """Test that a write the log can't keep changes nothing"""
+        self.store.insert({"hotel_id": 2, "name": "Hilton"})
+        generation = self.store.generation()
+        with fail_appends(self.store.wal_path):
+            with self.assertRaises(StorageError):
+                self.store.insert({"hotel_id": 3, "name": "Marriott"})
+            with self.assertRaises(StorageError):
+                self.store.update(1, {"name": "Changed"})
+            with self.assertRaises(StorageError):
+                self.store.delete(2)
+        self.assertEqual(self.store.all(), [{"hotel_id": 1, "name": "Hyatt"},
+                                            {"hotel_id": 2, "name": "Hilton"}])
+        self.assertEqual(self.store.generation(), generation)
+        self.store.update(2, {"name": "New Hilton"})
+        reopened = JsonStore(self.file_path, "hotel_id")
+        self.assertEqual(reopened.all(), self.store.all())
+        self.assertEqual(reopened.get_versioned(2),
+                         self.store.get_versioned(2))
+
+    def test_transactions_of_other_threads(self):
+        """Test that a thread doesn't join the transaction of another"""
+        started = threading.Event()
+        finished = []
+
+        def write():
+            started.wait()
+            with self.store.transaction():
+                self.store.insert({"hotel_id": 3, "name": "Marriott"})
+            finished.append(3)
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        with self.assertRaises(KeyError):
+            with self.store.transaction():
+                self.store.insert({"hotel_id": 2, "name": "Hilton"})
+                started.set()
+                time.sleep(0.2)
+                self.assertEqual(finished, [])
+                self.store.insert({"name": "No id"})
+        thread.join(timeout=5)
+        self.assertEqual(finished, [3])
+        reopened = JsonStore(self.file_path, "hotel_id")
+        self.assertEqual([hotel["hotel_id"] for hotel in reopened.all()],
+                         [1, 3])
+
+    def test_read_while_writing(self):
+        """Test that reads don't wait for the log writes of other threads"""
+        appending = threading.Event()
+        append_to_log = self.store._append_to_log  # pylint: disable=W0212
+
+        def append_slowly(entries):
+            appending.set()
+            time.sleep(0.5)
+            append_to_log(entries)
+
+        def write():
+            self.store.insert({"hotel_id": 2, "name": "Hilton"})
+            with self.store.transaction():
+                self.store.update(1, {"name": "Changed"})
+                self.store.delete(2)
+
+        with mock.patch.object(self.store, "_append_to_log", append_slowly):
+            thread = threading.Thread(target=write)
+            thread.start()
+            for records in ([{"hotel_id": 1, "name": "Hyatt"}],
+                            [{"hotel_id": 1, "name": "Hyatt"},
+                             {"hotel_id": 2, "name": "Hilton"}]):
+                self.assertTrue(appending.wait(timeout=5))
+                appending.clear()
+                start = time.monotonic()
+                self.assertEqual(self.store.all(), records)
+                self.assertLess(time.monotonic() - start, 0.25)
+            thread.join(timeout=5)
+        self.assertEqual(self.store.all(), [{"hotel_id": 1,
+                                             "name": "Changed"}])
+
+    def test_slots_records(self):
+        """Test a store that keeps its records as Hotel instances"""
+        store = JsonStore(self.file_path, "hotel_id", Hotel)
+        self.assertIsInstance(store.records[1], Hotel)
+        self.assertEqual(store.get(1), {"hotel_id": 1, "name": "Hyatt"})
+        store.update(1, {"name": "New Hyatt", "stars": 5})
+        self.assertEqual(store.find("stars", 5), [
+            {"hotel_id": 1, "name": "New Hyatt", "stars": 5}])
+        store.compact()
+        reopened = JsonStore(self.file_path, "hotel_id", Hotel)
+        self.assertEqual(reopened.all(), store.all())
+
+    def test_records_from_dicts(self):
+        """Test records with all, some and more than their fields"""
+        hotel = {"hotel_id": 1, "name": "Hyatt", "country": "México",
+                 "address": "Av. 2", "phone": "3338831234", "category": "5",
+                 "reserved_rooms": 0, "rooms": 40}
+        for data in (hotel, {"hotel_id": 1, "name": "Hyatt"},
+                     {**hotel, "stars": 5},
+                     {**{name: value for name, value in hotel.items()
+                         if name != "rooms"}, "stars": 5}):
+            with self.subTest(data=data):
+                record = Hotel.from_dict(data)
+                self.assertEqual(record.to_dict(), data)
+                self.assertEqual(record.get("stars"), data.get("stars"))
+
+    def test_missing_records(self):
+        """Test updating and deleting records that don't exist"""
+        self.assertFalse(self.store.update(5, {"name": "Invalid"}))
+        self.assertFalse(self.store.delete(5))
+        self.assertIsNone(self.store.get(5))
+
+    def test_returned_records_are_copies(self):
+        """Test that changing a returned record doesn't change the store"""
+        self.store.get(1)["name"] = "Changed"
+        self.store.all()[0]["name"] = "Changed"
+        self.assertEqual(self.store.get(1)["name"], "Hyatt")
+
+    def test_indexes_follow_changes(self):
+        """Test that the indexed lookups see updates, deletes and rollbacks"""
+        store = JsonStore(self.file_path, "hotel_id", Hotel, ("name",))
+        store.insert_many([{"hotel_id": 2, "name": "Hilton"},
+                           {"hotel_id": 3, "name": "Hilton"}])
+        self.assertEqual(list(store.indexes["name"]["Hilton"]), [2, 3])
+        store.update(2, {"name": "Marriott"})
+        store.delete(3)
+        with self.assertRaises(KeyError):
+            with store.transaction():
+                store.update(1, {"name": "Hilton"})
+                raise KeyError("hotel_id")
+        self.assertEqual(store.find("name", "Hilton"), [])
+        self.assertEqual(store.find("name", "Marriott"),
+                         [{"hotel_id": 2, "name": "Marriott"}])
+        self.assertEqual(store.find("name", "Hyatt"),
+                         [{"hotel_id": 1, "name": "Hyatt"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
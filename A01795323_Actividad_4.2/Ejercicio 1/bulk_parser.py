@@ -0,0 +1,160 @@
+"""This module parses files with a number per line into arrays of float64.
+
+The file is read in large chunks cut at a line end. A chunk that only has
+the characters of plain numbers is parsed at once, by orjson as a json
+list when it is installed, or by numpy.fromstring otherwise. A chunk that
+fails is parsed again in blocks of lines, and only the lines of the
+blocks that still fail are converted one at a time with float() and, if
+that fails, with the repair function. The repairs of a chunk are returned
+with its numbers, so they can be reported together.
+"""
+
+import os
+import warnings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_SIZE = 8 * 1024 * 1024
+BLOCK_LINES = 4096
+NUMBER_CHARACTERS = b"0123456789+-.eE \t\r\n"
+if np is not None:
+    INVALID_CHARACTERS = np.ones(256, dtype=bool)
+    INVALID_CHARACTERS[list(NUMBER_CHARACTERS)] = False
+
+
+def read_chunks(file_path, chunk_size=CHUNK_SIZE, start=0, end=None):
+    """Yields the bytes of a file, or of a byte range, in chunks of whole lines."""
+    with open(file_path, "rb") as file:
+        file.seek(start)
+        remaining = os.path.getsize(file_path) - start if end is None else end - start
+        remainder = b""
+        while True:
+            data = file.read(min(chunk_size, remaining))
+            remaining -= len(data)
+            at_end = remaining <= 0 or not data
+            data = remainder + data
+            # The last line of the file stays in the last chunk
+            cut = len(data) if at_end else data.rfind(b"\n") + 1
+            remainder = data[cut:]
+            if cut:
+                yield data[:cut] if data[cut - 1:cut] == b"\n" \
+                    else data[:cut] + b"\n"
+            if at_end:
+                return
+
+
+def parse_clean_lines(data):
+    """Parses lines of plain numbers at once, returns None if they fail."""
+    if data.translate(None, NUMBER_CHARACTERS) or not data.strip():
+        return None
+    lines = data.count(b"\n")
+    if orjson is not None:
+        try:
+            values = np.array(orjson.loads(  # pylint: disable=no-member
+                b"[" + data[:-1].replace(b"\n", b",") + b"]"), dtype=np.float64)
+        except ValueError:
+            return None
+    else:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            try:
+                values = np.fromstring(data, dtype=np.float64, sep="\n")
+            except (ValueError, DeprecationWarning):
+                return None
+    # A blank line is missing from the values, and numpy.fromstring also
+    # splits the numbers of a line at spaces
+    return values if len(values) == lines else None
+
+
+def parse_lines(lines, first_line, repair, repairs):
+    """Parses lines one at a time, adding the invalid ones to the repairs."""
+    values = []
+    for line_number, line in enumerate(lines, first_line):
+        record = line.decode("UTF-8", errors="replace")
+        try:
+            values.append(float(record.strip()))
+        except ValueError:
+            value = repair(record)
+            repairs.append((line_number, record.rstrip("\r\n"), value))
+            if value is not None:
+                values.append(value)
+    return np.array(values, dtype=np.float64)
+
+
+def find_invalid_lines(data):
+    """Gets the indexes, starts and ends of the lines that aren't numbers.
+
+    Those are the lines with other characters than the ones of plain
+    numbers, and the blank lines.
+    """
+    characters = np.frombuffer(data, dtype=np.uint8)
+    line_ends = np.flatnonzero(characters == ord("\n"))
+    line_starts = np.concatenate(([0], line_ends[:-1] + 1))
+    invalid_positions = np.flatnonzero(INVALID_CHARACTERS[characters])
+    indexes = np.union1d(np.searchsorted(line_ends, invalid_positions),
+                         np.flatnonzero(line_starts == line_ends))
+    return zip(indexes.tolist(), line_starts[indexes].tolist(),
+               (line_ends[indexes] + 1).tolist())
+
+
+def parse_segment(data, first_line, repair, repairs):
+    """Parses whole lines at once, or in blocks and one at a time if failing."""
+    if not data:
+        return np.empty(0)
+    values = parse_clean_lines(data)
+    if values is not None:
+        return values
+    lines = data[:-1].split(b"\n")
+    arrays = []
+    for start in range(0, len(lines), BLOCK_LINES):
+        block = lines[start:start + BLOCK_LINES]
+        values = parse_clean_lines(b"\n".join(block) + b"\n")
+        if values is None:
+            values = parse_lines(block, first_line + start, repair, repairs)
+        arrays.append(values)
+    return np.concatenate(arrays)
+
+
+def parse_chunk(data, first_line, repair):
+    """Parses a chunk of whole lines into an array and its repairs.
+
+    The lines that aren't numbers are found first, so the lines between
+    them are still parsed at once. The repairs are (line number, record,
+    repaired value or None).
+    """
+    values = parse_clean_lines(data)
+    if values is not None:
+        return values, []
+    arrays = []
+    repairs = []
+    position = 0
+    line_index = 0
+    for index, start, end in find_invalid_lines(data):
+        arrays.append(parse_segment(data[position:start], first_line + line_index,
+                                    repair, repairs))
+        arrays.append(parse_lines([data[start:end - 1]], first_line + index,
+                                  repair, repairs))
+        position = end
+        line_index = index + 1
+    arrays.append(parse_segment(data[position:], first_line + line_index,
+                                repair, repairs))
+    return np.concatenate(arrays), repairs
+
+
+def read_number_chunks(file_path, repair, chunk_size=CHUNK_SIZE, start=0, end=None):
+    """Yields the numbers of a file by chunks, as (first line, array, repairs).
+
+    The lines are numbered from the start of the byte range.
+    """
+    first_line = 1
+    for data in read_chunks(file_path, chunk_size, start, end):
+        values, repairs = parse_chunk(data, first_line, repair)
+        yield first_line, values, repairs
+        first_line += data.count(b"\n")
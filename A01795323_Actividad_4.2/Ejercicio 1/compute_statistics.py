@@ -1,42 +1,164 @@
 """Module that computes statistics of a list of numbers extracted from a file"""
 
+import importlib.util
+import multiprocessing
 import os
 import sys
 import time
 
+import bulk_parser
+import frequencies
+import quantiles
+import running_statistics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FILE_SOURCE_DIR = "p1"
 OUTPUT_FILE_PATH = os.path.join(BASE_DIR, "output", "StatisticsResults.txt")
+REPORTED_PERCENTILES = (50, 90, 99)
+MAX_REPORTED_TIES = 10
+MAX_REPORTED_REPAIRS = 3
+MIN_SHARD_SIZE = 1024 * 1024
+SHARDS_PER_WORKER = 4
+NUMBER_STORE_PATH = os.path.join(BASE_DIR, os.pardir, "number_store.py")
+NUMBER_STORE_MODULE_NAME = "activity_4_2_number_store"
+STORE_BLOCK_SIZE = 8 * 1024 * 1024
 
 
 def get_numbers_from_file(file_name):
     """Opens a given file name to process the data and extract numeric values."""
-    numbers = []
-    file_path = '/'.join((FILE_SOURCE_DIR, file_name))
+    return list(read_numbers_from_file(file_name))
+
+
+def get_file_path(file_name):
+    """Gets the path of a file name in the source directory."""
+    return '/'.join((FILE_SOURCE_DIR, file_name))
+
+
+def get_number_store():
+    """Gets the module of the binary number stores, or None.
+
+    A store converted from a text file is memory-mapped instead of parsed.
+    The module is loaded from its file, so sys.path is left as it is.
+    """
+    if NUMBER_STORE_MODULE_NAME in sys.modules:
+        return sys.modules[NUMBER_STORE_MODULE_NAME]
+    spec = importlib.util.spec_from_file_location(NUMBER_STORE_MODULE_NAME,
+                                                  NUMBER_STORE_PATH)
+    if spec is None or not os.path.isfile(NUMBER_STORE_PATH):
+        return None
+    number_store = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(number_store)
+    except ImportError:
+        return None
+    sys.modules[NUMBER_STORE_MODULE_NAME] = number_store
+    return number_store
+
+
+def read_numbers_from_file(file_name):
+    """Yields the numeric values of a given file name one line at a time."""
+    file_path = get_file_path(file_name)
 
     try:
         with open(file_path, 'r', encoding="UTF-8") as file:
             print(f"Collecting numbers from file {file_name}")
             for record in file:
                 try:
-                    numbers.append(float(record.strip()))
+                    number = float(record.strip())
                 except ValueError:
                     print(f"\nInvalid value:{record}, trying to fix the data issue...")
-                    fixed_value = get_float_value(record)
+                    number = get_float_value(record)
 
-                    if fixed_value is not None:
-                        numbers.append(fixed_value)
-                        print(f"...{record} was converted to {fixed_value}")
+                    if number is None:
+                        continue
+                    print(f"...{record} was converted to {number}")
+                yield number
 
     except FileNotFoundError:
         print(f"File {file_name} not found at {FILE_SOURCE_DIR} directory")
         sys.exit(1)
 
     print("\nCollecting numbers from file process has finished")
-    return numbers
 
 
-def get_float_value(record):
+def split_file_in_shards(file_path, shard_size):
+    """Splits a file in byte ranges starting at a line."""
+    file_size = os.path.getsize(file_path)
+    boundaries = [0]
+    with open(file_path, 'rb') as file:
+        while boundaries[-1] + shard_size < file_size:
+            file.seek(boundaries[-1] + shard_size)
+            file.readline()
+            if file.tell() >= file_size:
+                break
+            boundaries.append(file.tell())
+    boundaries.append(file_size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def compute_shard_statistics(shard):
+    """Parses a byte range of a file into statistics that can be merged.
+
+    The shard is (file path, start, end, sketch sizes), without sketch
+    sizes for the exact statistics. Returns the running statistics, the
+    numbers or the quantile and frequency sketches, the repairs of every
+    chunk, numbered from the start of the range, and the number of lines.
+    """
+    file_path, start, end, sketch_sizes = shard
+    summary = running_statistics.RunningStatistics()
+    sketches = None
+    if sketch_sizes is not None:
+        sketches = (quantiles.QuantileSketch(size=sketch_sizes[0]),
+                    frequencies.FrequencySketch(size=sketch_sizes[1]))
+    arrays = []
+    repaired_chunks = []
+    lines = 0
+    for first_line, values, repairs in bulk_parser.read_number_chunks(
+            file_path, repair_float_value, start=start, end=end):
+        summary.add_array(values)
+        if sketches is None:
+            arrays.append(values)
+        else:
+            sketches[0].add_array(values)
+            sketches[1].add_array(values)
+        if repairs:
+            repaired_chunks.append((first_line, repairs))
+        lines = first_line - 1 + len(values) + sum(value is None for _, _, value in repairs)
+    numbers = None if sketches is not None else join_arrays(arrays)
+    return summary, numbers, sketches, repaired_chunks, lines
+
+
+def join_arrays(arrays):
+    """Joins arrays of numbers, without a copy when there is only one."""
+    if len(arrays) == 1:
+        return arrays[0]
+    return np.concatenate(arrays) if arrays else np.empty(0)
+
+
+def repair_float_value(record):
+    """Attempts to extract a valid float value from a record quietly."""
+    return get_float_value(record, verbose=False)
+
+
+def format_repairs(first_line, repairs):
+    """Formats the repairs of a chunk, with the first ones as examples."""
+    rejected = sum(value is None for _, _, value in repairs)
+    examples = "".join(f"\n  line {line_number}: {record!r} "
+                       + ("can't be converted" if value is None
+                          else f"was converted to {value}")
+                       for line_number, record, value in repairs[:MAX_REPORTED_REPAIRS])
+    more = len(repairs) - MAX_REPORTED_REPAIRS
+    return (f"\nInvalid values from line {first_line}: {len(repairs) - rejected} "
+            f"repaired, {rejected} rejected{examples}"
+            + (f"\n  and {more} more" if more > 0 else ""))
+
+
+def get_float_value(record, verbose=True):
     """Attempts to extract a valid float value from a record."""
     try:
         record = record.replace(',', '.')
@@ -45,58 +167,316 @@ def get_float_value(record):
         digits_from_string = ''.join(c for c in record if c.isdigit() or c == '.')
         return float(digits_from_string)
     except ValueError:
-        print(f"Error: {record} can't be converted to float")
+        if verbose:
+            print(f"Error: {record} can't be converted to float")
         return None
 
 
 def compute_mean(numbers):
     """Calculates the mean of a list of numbers."""
-    return sum(numbers) / len(numbers)
+    return running_statistics.RunningStatistics(numbers).mean
 
 
 def compute_median(numbers):
     """Calculates the median of a list of numbers."""
-    sorted_list = sorted(numbers)
-    list_len = len(sorted_list)
-    mid_value = list_len // 2
+    return quantiles.compute_quantiles(numbers, [0.5])[0]
 
-    if list_len % 2 == 0:
-        return (sorted_list[mid_value - 1] + sorted_list[mid_value]) / 2
 
-    return sorted_list[mid_value]
+def compute_percentiles(numbers, sketch=None):
+    """Calculates the reported percentiles, from the sketch if provided."""
+    reported_quantiles = [percentile / 100 for percentile in REPORTED_PERCENTILES]
+    if sketch is not None:
+        return sketch.get_quantiles(reported_quantiles)
+    return quantiles.compute_quantiles(numbers, reported_quantiles)
 
 
 def compute_mode(numbers):
     """Calculates the mode(s) of a list of numbers."""
-    frequency = {}
+    return frequencies.compute_modes(numbers)[0]
+
+
+def format_mode(modes, occurrences, error=None):
+    """Formats the modes, with the tied values and the error if approximate.
+
+    When no value occurs more than once there is no mode.
+    """
+    if occurrences == 1 and len(modes) > 1:
+        return "#N/A (no value occurs more than once)"
+    details = []
+    if error:
+        details.append(f"{occurrences - error} to {occurrences} occurrences, approximate")
+    elif len(modes) > 1:
+        details.append(f"{occurrences} occurrences")
+    if len(modes) > 1:
+        more = len(modes) - 1 - MAX_REPORTED_TIES
+        details.append("tied with " + ", ".join(map(str, modes[1:MAX_REPORTED_TIES + 1]))
+                       + (f" and {more} more values" if more > 0 else ""))
+    if not details:
+        return f"{modes[0]}"
+    return f"{modes[0]} ({'; '.join(details)})"
+
+
+def format_top_values(top_values):
+    """Formats the most frequent values as (value, count, error)."""
+    return "".join(f"  {value}: {count - error} to {count} occurrences\n" if error
+                   else f"  {value}: {count} occurrences\n"
+                   for value, count, error in top_values)
+
+
+def compute_variance(numbers, mean=None):
+    """Calculates the sample variance of a list of numbers.
+
+    Without a mean, the mean and the variance are computed in a single pass.
+    """
+    if mean is None:
+        return running_statistics.RunningStatistics(numbers).sample_variance
+    list_len = len(numbers)
+    return sum((x - mean) ** 2 for x in numbers) / (list_len - 1) if list_len > 1 else 0.0
 
-    for number in numbers:
-        frequency[number] = frequency.get(number, 0) + 1
 
-    max_freq = max(frequency.values())
-    modes = [num for num, count in frequency.items() if count == max_freq]
+def compute_standard_deviation(numbers, mean=None):
+    """Calculates the population standard deviation of a list of numbers.
 
-    return modes
+    Without a mean, the mean and the deviation are computed in a single pass.
+    """
+    if mean is None:
+        return running_statistics.RunningStatistics(numbers).population_standard_deviation
+    return (sum((x - mean) ** 2 for x in numbers) / len(numbers)) ** 0.5
 
 
-def compute_variance(numbers, mean):
-    """Calculates the sample variance of a list of numbers."""
-    list_len = len(numbers)
-    return sum((x - mean) ** 2 for x in numbers) / (list_len - 1) if list_len > 1 else 0
+def get_file_name_from_params():
+    """Retrieves the file name from command-line arguments."""
+    file_names = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(file_names) != 1:
+        print("Usage: python compute_statistics.py fileWithData.txt|numberStore.nums"
+              " [--approximate] [--sketch-size=N] [--counters=N] [--top=K]"
+              " [--workers=N]")
+        sys.exit(1)
 
+    return file_names[0]
 
-def compute_standard_deviation(numbers, mean):
-    """Calculates the standard deviation of a list of numbers."""
-    return (sum((x - mean) ** 2 for x in numbers) / len(numbers)) ** 0.5
 
+def read_flag_from_params(flag_name):
+    """Checks if an optional --flag was provided in the command-line."""
+    return f"--{flag_name}" in sys.argv[1:]
 
-def get_file_name_from_params():
-    """Retrieves the file name from command-line arguments."""
-    if len(sys.argv) != 2:
-        print("Usage: python compute_statistics.py fileWithData.txt")
+
+def read_option_from_params(option_name, default=None):
+    """Reads the value of an optional --option=value command-line argument."""
+    prefix = f"--{option_name}="
+    for arg in sys.argv[1:]:
+        if arg.startswith(prefix):
+            return arg[len(prefix):]
+    return default
+
+
+def create_sketches_from_params():
+    """Creates the quantile and frequency sketches of --approximate, or Nones."""
+    if not read_flag_from_params("approximate"):
+        return None, None
+    try:
+        return (quantiles.QuantileSketch(size=int(read_option_from_params(
+                    "sketch-size", quantiles.DEFAULT_SKETCH_SIZE))),
+                frequencies.FrequencySketch(size=int(read_option_from_params(
+                    "counters", frequencies.DEFAULT_SKETCH_SIZE))))
+    except ValueError as e:
+        print(f"Invalid sketch size: {e}")
+        sys.exit(1)
+
+
+def read_top_from_params():
+    """Reads the number of most frequent values to report, 0 by default."""
+    try:
+        return int(read_option_from_params("top", 0))
+    except ValueError:
+        print("The --top option must be a number")
         sys.exit(1)
 
-    return sys.argv[1]
+
+def describe_distribution(numbers, quantile_sketch=None, frequency_sketch=None):
+    """Formats the percentiles, mode and most frequent values of the report.
+
+    They are exact from the numbers, or approximate from the sketches.
+    """
+    median, percentile_90, percentile_99 = compute_percentiles(numbers, quantile_sketch)
+    approximate = "" if quantile_sketch is None else " (approximate)"
+    top = read_top_from_params()
+    if frequency_sketch is None:
+        modes, occurrences = frequencies.compute_modes(numbers)
+        mode = format_mode(modes, occurrences)
+        top_values = [(value, count, 0) for value, count
+                      in frequencies.compute_top_values(numbers, top)]
+    else:
+        modes, occurrences, error = frequency_sketch.get_modes()
+        mode = format_mode(modes, occurrences, error)
+        top_values = frequency_sketch.get_top_values(top)
+    return (f"Median: {median}{approximate}\n"
+            f"90th Percentile: {percentile_90}{approximate}\n"
+            f"99th Percentile: {percentile_99}{approximate}\n"
+            f"Mode: {mode}\n"
+            + (f"Most Frequent Values:\n"
+               f"{format_top_values(top_values)}"
+               if top_values else ""))
+
+
+def read_workers_from_params():
+    """Reads the number of worker processes, 0 to read the file in this one."""
+    try:
+        workers = int(read_option_from_params("workers", 0))
+    except ValueError:
+        workers = -1
+    if workers < 0:
+        print("The --workers option must be a positive number")
+        sys.exit(1)
+    if workers and np is None:
+        print("The numpy package is required to use --workers")
+        sys.exit(1)
+    return workers
+
+
+def collect_statistics(file_name, quantile_sketch=None, frequency_sketch=None, workers=0):
+    """Reads the numbers of a file into running statistics and the sketches.
+
+    Returns the statistics and the numbers kept for the exact percentiles
+    and mode, none when there are sketches. With numpy, the file is parsed
+    in chunks into arrays, by a pool of worker processes if requested,
+    otherwise one line at a time. A number store is mapped in memory.
+    """
+    number_store = get_number_store()
+    if number_store is not None and number_store.is_number_store(get_file_path(file_name)):
+        return collect_store_statistics(number_store, file_name,
+                                        quantile_sketch, frequency_sketch)
+    if np is None:
+        summary = running_statistics.RunningStatistics()
+        numbers = []
+        for number in read_numbers_from_file(file_name):
+            summary.add(number)
+            if quantile_sketch is None:
+                numbers.append(number)
+            else:
+                quantile_sketch.add(number)
+                frequency_sketch.add(number)
+        return summary, numbers
+
+    file_path = get_file_path(file_name)
+    if not os.path.isfile(file_path):
+        print(f"File {file_name} not found at {FILE_SOURCE_DIR} directory")
+        sys.exit(1)
+    sketch_sizes = None
+    if quantile_sketch is not None:
+        sketch_sizes = (quantile_sketch.size, frequency_sketch.size)
+    print(f"Collecting numbers from file {file_name}")
+    if not workers:
+        return merge_shard_statistics(
+            [compute_shard_statistics((file_path, 0, None, sketch_sizes))],
+            quantile_sketch, frequency_sketch)
+
+    shard_size = max(MIN_SHARD_SIZE,
+                     os.path.getsize(file_path) // (workers * SHARDS_PER_WORKER) + 1)
+    shards = [(file_path, start, end, sketch_sizes)
+              for start, end in split_file_in_shards(file_path, shard_size)]
+    with multiprocessing.Pool(workers) as pool:
+        results = merge_shard_statistics(pool.imap(compute_shard_statistics, shards),
+                                         quantile_sketch, frequency_sketch)
+    print(f"Processed {len(shards)} shards with {workers} workers")
+    return results
+
+
+def collect_store_statistics(number_store, file_name, quantile_sketch=None,
+                             frequency_sketch=None):
+    """Reads the numbers of a number store into running statistics and the sketches.
+
+    The numbers are used from the memory-mapped file without a copy,
+    unless a rejected line of the store is repaired, and then its value is
+    inserted at its line. Returns the statistics and the numbers, none when
+    there are sketches.
+    """
+    print(f"Collecting numbers from number store {file_name}")
+    file_path = get_file_path(file_name)
+    numbers, repairs = repair_store_numbers(number_store.load_numbers(file_path),
+                                            number_store.read_rejected_lines(file_path))
+    if repairs:
+        print(format_repairs(repairs[0][0], repairs))
+
+    summary = running_statistics.RunningStatistics()
+    for start in range(0, len(numbers), STORE_BLOCK_SIZE):
+        block = numbers[start:start + STORE_BLOCK_SIZE]
+        if np is not None:
+            summary.add_array(block)
+        else:
+            summary.add_all(block)
+        if quantile_sketch is None:
+            continue
+        if np is not None:
+            quantile_sketch.add_array(block)
+            frequency_sketch.add_array(block)
+        else:
+            quantile_sketch.add_all(block)
+            frequency_sketch.add_all(block)
+
+    rejected_values = sum(value is None for _, _, value in repairs)
+    print(f"\nCollecting numbers from number store process has finished, "
+          f"{len(repairs)} invalid values: {len(repairs) - rejected_values} "
+          f"repaired, {rejected_values} rejected")
+    return summary, None if quantile_sketch is not None else numbers
+
+
+def repair_store_numbers(numbers, rejected_lines):
+    """Repairs the rejected lines of a number store, returns the numbers and repairs.
+
+    A repaired value is inserted at its line, in a copy of the numbers.
+    """
+    repairs = []
+    positions = []
+    for index, (line_number, record) in enumerate(rejected_lines):
+        value = repair_float_value(record)
+        repairs.append((line_number, record, value))
+        if value is not None:
+            # The rejected lines before it are missing from the numbers
+            positions.append((line_number - 1 - index, value))
+    if np is not None and numbers.dtype != np.float64:
+        numbers = numbers.astype(np.float64)
+    if not positions:
+        return numbers, repairs
+    if np is not None:
+        return np.insert(numbers, [position for position, _ in positions],
+                         [value for _, value in positions]), repairs
+    numbers = list(numbers)
+    for offset, (position, value) in enumerate(positions):
+        numbers.insert(position + offset, value)
+    return numbers, repairs
+
+
+def merge_shard_statistics(results, quantile_sketch=None, frequency_sketch=None):
+    """Merges the statistics of the shards of a file, in the order of the file.
+
+    The repairs of every chunk are reported with their line in the file.
+    Returns the statistics and the numbers, none when there are sketches.
+    """
+    summary = running_statistics.RunningStatistics()
+    arrays = []
+    lines = 0
+    invalid_values = 0
+    rejected_values = 0
+    for shard_summary, numbers, sketches, repaired_chunks, shard_lines in results:
+        summary.merge(shard_summary)
+        if sketches is None:
+            arrays.append(numbers)
+        else:
+            quantile_sketch.merge(sketches[0])
+            frequency_sketch.merge(sketches[1])
+        for first_line, repairs in repaired_chunks:
+            print(format_repairs(lines + first_line, [
+                (lines + line_number, record, value)
+                for line_number, record, value in repairs]))
+            invalid_values += len(repairs)
+            rejected_values += sum(value is None for _, _, value in repairs)
+        lines += shard_lines
+
+    print(f"\nCollecting numbers from file process has finished, "
+          f"{invalid_values} invalid values: {invalid_values - rejected_values} "
+          f"repaired, {rejected_values} rejected")
+    return summary, join_arrays(arrays)
 
 
 def create_file_with_statistics(output_filename, statistics):
@@ -110,29 +490,26 @@ def main():
     start_time = time.time()
 
     file_name = get_file_name_from_params()
-    numbers = get_numbers_from_file(file_name)
+    quantile_sketch, frequency_sketch = create_sketches_from_params()
+    summary, numbers = collect_statistics(file_name, quantile_sketch, frequency_sketch,
+                                          read_workers_from_params())
 
-    if not numbers:
+    if not summary.count:
         print("The file does not contain valid numbers")
         sys.exit(1)
 
     print("\nStarting the calculation of the statistics\n")
 
-    mean = compute_mean(numbers)
-    median = compute_median(numbers)
-    mode = compute_mode(numbers)
-    variance = compute_variance(numbers, mean)
-    standard_deviation = compute_standard_deviation(numbers, mean)
+    distribution = describe_distribution(numbers, quantile_sketch, frequency_sketch)
 
     elapsed_time = time.time() - start_time
 
     statistics = (f"::Results::\n\n"
-                  f"Count: {len(numbers)} records\n"
-                  f"Mean: {mean}\n"
-                  f"Median: {median}\n"
-                  f"Mode: {mode[0]}\n"
-                  f"Standard Deviation: {standard_deviation}\n"
-                  f"Variance: {variance}\n"
+                  f"Count: {summary.count} records\n"
+                  f"Mean: {summary.mean}\n"
+                  f"{distribution}"
+                  f"Standard Deviation: {summary.population_standard_deviation}\n"
+                  f"Variance: {summary.sample_variance}\n"
                   f"\nElapsed Time: {elapsed_time:.8f} seconds")
 
     print(statistics)
@@ -0,0 +1,165 @@
+"""This module finds the mode and the most frequent values of a list of numbers.
+
+The exact counts come from numpy.unique, which sorts the values once
+instead of updating a dictionary entry per value. The values tied for the
+highest count are returned in the order they first appear in the input.
+
+Inputs with too many distinct values to count use a Space-Saving sketch
+(Metwally, Agrawal and El Abbadi), which keeps at most a fixed number of
+counters. A value without a counter takes the counter of the least
+frequent one, and inherits its count as the error, so a reported count is
+never below the real one and is at most count - error above it, and any
+value that occurs more than count / size times has a counter. Sketches of
+different parts of the input can be merged. An array of numbers is
+counted with numpy.unique first, and every distinct value updates its
+counter once with its count, which keeps the same guarantees.
+"""
+
+import heapq
+import itertools
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_SKETCH_SIZE = 1000
+
+
+def count_values(numbers):
+    """Counts every distinct value, in the order they first appear."""
+    if np is None:
+        return list(Counter(numbers).items())
+    values, first_indexes, counts = np.unique(
+        np.asarray(numbers, dtype=float), return_index=True,
+        return_counts=True)
+    order = np.argsort(first_indexes, kind="stable")
+    return list(zip(values[order].tolist(), counts[order].tolist()))
+
+
+def compute_modes(numbers):
+    """Calculates the modes of a list of numbers and their count.
+
+    All the values tied for the highest count are returned, in the order
+    they first appear.
+    """
+    counts = count_values(numbers)
+    if not counts:
+        return [], 0
+    max_count = max(count for _, count in counts)
+    return [value for value, count in counts if count == max_count], max_count
+
+
+def compute_top_values(numbers, top):
+    """Calculates the most frequent values of a list with their counts."""
+    return heapq.nlargest(top, count_values(numbers), key=lambda item: item[1])
+
+
+class FrequencySketch:
+    """Space-Saving sketch of the most frequent values of a stream"""
+
+    def __init__(self, numbers=(), size=DEFAULT_SKETCH_SIZE):
+        if size < 1:
+            raise ValueError("The sketch size must be at least 1")
+        self.size = size
+        self.count = 0
+        self.counters = {}
+        # Heap of (count, order, value), with some counts out of date
+        self.heap = []
+        self.order = itertools.count()
+        self.add_all(numbers)
+
+    def add(self, number, occurrences=1):
+        """Adds a number to the sketch, once or several times."""
+        self.count += occurrences
+        counter = self.counters.get(number)
+        if counter is not None:
+            counter[0] += occurrences
+        elif len(self.counters) < self.size:
+            self.counters[number] = [occurrences, 0]
+            heapq.heappush(self.heap, (occurrences, next(self.order), number))
+        else:
+            min_count = self.pop_least_frequent()
+            self.counters[number] = [min_count + occurrences, min_count]
+            heapq.heappush(self.heap, (min_count + occurrences,
+                                       next(self.order), number))
+
+    def add_all(self, numbers):
+        """Adds every number of an iterable, returns the sketch."""
+        for number in numbers:
+            self.add(number)
+        return self
+
+    def add_array(self, numbers):
+        """Adds an array of numbers counted with numpy, returns the sketch.
+
+        The least frequent values of the array are added first, so the
+        most frequent ones keep the counters they take.
+        """
+        values, counts = np.unique(np.asarray(numbers, dtype=float),
+                                   return_counts=True)
+        order = np.argsort(counts, kind="stable")
+        for value, count in zip(values[order].tolist(), counts[order].tolist()):
+            self.add(value, count)
+        return self
+
+    def pop_least_frequent(self):
+        """Removes the counter with the lowest count, returns its count."""
+        while True:
+            count, _, value = heapq.heappop(self.heap)
+            if self.counters[value][0] == count:
+                del self.counters[value]
+                return count
+            heapq.heappush(self.heap, (self.counters[value][0],
+                                       next(self.order), value))
+
+    def get_min_count(self):
+        """Gets the count that a value without a counter may have."""
+        if len(self.counters) < self.size:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def merge(self, other):
+        """Adds the counts of another sketch, returns the sketch.
+
+        A value missing from a full sketch may have had up to its lowest
+        count, which is added to its count and its error.
+        """
+        min_count = self.get_min_count()
+        other_min_count = other.get_min_count()
+        merged = {}
+        for value in itertools.chain(self.counters, other.counters):
+            count, error = self.counters.get(value, (min_count, min_count))
+            other_count, other_error = other.counters.get(
+                value, (other_min_count, other_min_count))
+            merged[value] = [count + other_count, error + other_error]
+        self.counters = dict(heapq.nlargest(
+            self.size, merged.items(), key=lambda item: item[1][0]))
+        self.heap = [(count, next(self.order), value)
+                     for value, (count, _) in self.counters.items()]
+        heapq.heapify(self.heap)
+        self.count += other.count
+        return self
+
+    def get_top_values(self, top):
+        """Gets the most frequent values as (value, count, error).
+
+        The real count of a value is between count - error and count.
+        """
+        return [(value, count, error) for value, (count, error)
+                in heapq.nlargest(top, self.counters.items(),
+                                  key=lambda item: item[1][0])]
+
+    def get_modes(self):
+        """Gets the values tied for the highest count, the count and error.
+
+        The error is the largest one of the tied values.
+        """
+        if not self.counters:
+            return [], 0, 0
+        max_count = max(count for count, _ in self.counters.values())
+        modes = [(value, error) for value, (count, error)
+                 in self.counters.items() if count == max_count]
+        return ([value for value, _ in modes], max_count,
+                max(error for _, error in modes))
@@ -0,0 +1,193 @@
+"""This module computes the median and other quantiles of a list of numbers.
+
+The exact quantiles select the values at their positions with
+numpy.partition (introselect), in linear time and without sorting the
+whole list. The quantile q is interpolated between the values at the
+positions around q * (count - 1), so the median of an even count is the
+mean of the two middle values.
+
+Inputs too large to keep in memory use a KLL sketch (Karnin, Lang and
+Liberty), which reads the numbers once and keeps a few compactors of at
+most k values each. A full compactor is sorted and every other value
+moves to the next level, where it counts twice, so the sketch keeps
+O(k log(n / k)) values and the rank of a quantile is off by about
+1.7 / k of the count (1% with the default k of 200). Sketches of
+different parts of the input can be merged. An array of numbers is added
+at once: it joins the lowest compactor as a numpy array, which is sorted
+and compacted with numpy a single time instead of once every k numbers.
+"""
+
+import math
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_SKETCH_SIZE = 200
+COMPACTOR_RATIO = 2 / 3
+MIN_COMPACTOR_SIZE = 2
+
+
+def get_positions(count, quantile):
+    """Gets the positions around a quantile and the weight of the upper."""
+    if not 0 <= quantile <= 1:
+        raise ValueError(f"Quantile {quantile} is not between 0 and 1")
+    position = quantile * (count - 1)
+    lower = math.floor(position)
+    return lower, min(lower + 1, count - 1), position - lower
+
+
+def interpolate(lower_value, upper_value, weight):
+    """Interpolates between two values, exactly at their ends and middle."""
+    if weight == 0:
+        return lower_value
+    return lower_value * (1 - weight) + upper_value * weight
+
+
+def compute_quantiles(numbers, quantiles):
+    """Calculates the exact quantiles of a list of numbers."""
+    if len(numbers) == 0:
+        raise ValueError("The quantiles of an empty list are undefined")
+    positions = [get_positions(len(numbers), quantile)
+                 for quantile in quantiles]
+    indexes = sorted({index for lower, upper, _ in positions
+                      for index in (lower, upper)})
+    if np is not None:
+        selected = np.partition(np.asarray(numbers, dtype=float), indexes)
+    else:
+        # Without numpy, sorting in C is faster than a selection in Python
+        selected = sorted(numbers)
+    return [interpolate(float(selected[lower]), float(selected[upper]), weight)
+            for lower, upper, weight in positions]
+
+
+class QuantileSketch:
+    """KLL sketch of the quantiles of a stream of numbers"""
+
+    def __init__(self, numbers=(), size=DEFAULT_SKETCH_SIZE, seed=None):
+        if size < MIN_COMPACTOR_SIZE:
+            raise ValueError(f"The sketch size must be at least "
+                             f"{MIN_COMPACTOR_SIZE}")
+        self.size = size
+        self.compactors = [[]]
+        self.count = 0
+        self.length = 0
+        self.max_length = self.get_capacity(0)
+        self.random = random.Random(seed)
+        self.add_all(numbers)
+
+    def __len__(self):
+        return self.length
+
+    def get_capacity(self, level):
+        """Gets the number of values a compactor keeps before compacting."""
+        depth = len(self.compactors) - level - 1
+        return max(math.ceil(self.size * COMPACTOR_RATIO ** depth),
+                   MIN_COMPACTOR_SIZE)
+
+    def add(self, number):
+        """Adds a number to the sketch."""
+        self.compactors[0].append(number)
+        self.count += 1
+        self.length += 1
+        if self.length >= self.max_length:
+            self.compress()
+
+    def add_all(self, numbers):
+        """Adds every number of an iterable, returns the sketch."""
+        for number in numbers:
+            self.add(number)
+        return self
+
+    def add_array(self, numbers):
+        """Adds an array of numbers with numpy, returns the sketch.
+
+        The compactors that get the numbers are numpy arrays while the
+        sketch compresses, and lists again after it.
+        """
+        numbers = np.asarray(numbers, dtype=float)
+        self.compactors[0] = np.concatenate((self.compactors[0], numbers))
+        self.count += len(numbers)
+        self.length += len(numbers)
+        self.compress()
+        self.compactors = [compactor.tolist()
+                           if isinstance(compactor, np.ndarray) else compactor
+                           for compactor in self.compactors]
+        return self
+
+    def merge(self, other):
+        """Adds the numbers of another sketch, returns the sketch."""
+        while len(self.compactors) < len(other.compactors):
+            self.add_level()
+        for compactor, other_compactor in zip(self.compactors,
+                                              other.compactors):
+            compactor.extend(other_compactor)
+        self.count += other.count
+        self.length += other.length
+        self.compress()
+        return self
+
+    def compress(self):
+        """Compacts the full compactors until the sketch fits its size."""
+        while self.length >= self.max_length:
+            for level, compactor in enumerate(self.compactors):
+                if len(compactor) >= self.get_capacity(level):
+                    self.compact(level)
+                    break
+            else:
+                return
+
+    def add_level(self):
+        """Adds a compactor above the others."""
+        self.compactors.append([])
+        self.max_length = sum(self.get_capacity(level)
+                              for level in range(len(self.compactors)))
+
+    def compact(self, level):
+        """Moves every other value of a compactor to the next level."""
+        if level + 1 == len(self.compactors):
+            self.add_level()
+        compactor = self.compactors[level]
+        compactor.sort()
+        # An odd value out stays, so the weights keep adding up to the count
+        end = len(compactor) - len(compactor) % 2
+        promoted = compactor[self.random.randint(0, 1):end:2]
+        if isinstance(promoted, list) \
+                and isinstance(self.compactors[level + 1], list):
+            self.compactors[level + 1].extend(promoted)
+        else:
+            self.compactors[level + 1] = np.concatenate(
+                (self.compactors[level + 1], promoted))
+        self.compactors[level] = compactor[end:]
+        self.length -= len(promoted)
+
+    def get_weighted_values(self):
+        """Gets the sorted values of the sketch with their weights."""
+        return sorted((value, 2 ** level)
+                      for level, compactor in enumerate(self.compactors)
+                      for value in compactor)
+
+    def get_quantiles(self, quantiles):
+        """Estimates some quantiles, interpolated as the exact ones."""
+        if not self.count:
+            raise ValueError("The quantiles of an empty sketch are undefined")
+        values = self.get_weighted_values()
+        results = []
+        for quantile in quantiles:
+            lower, upper, weight = get_positions(self.count, quantile)
+            results.append(interpolate(self.get_value_at(values, lower),
+                                       self.get_value_at(values, upper),
+                                       weight))
+        return results
+
+    @staticmethod
+    def get_value_at(values, position):
+        """Gets the value at a position of the weighted sorted values."""
+        rank = 0
+        for value, weight in values:
+            rank += weight
+            if rank > position:
+                return value
+        return values[-1][0]
@@ -0,0 +1,115 @@
+"""This module computes the count, mean and variance of numbers in one pass.
+
+The numbers are added one at a time with Welford's algorithm, which keeps
+the count, the mean and the sum of the squared deviations from the mean
+(M2) instead of the sums of the numbers and of their squares, so the
+variance doesn't lose its precision to cancellation on large inputs. The
+reported mean is the sum of the numbers, kept with Neumaier's compensated
+summation, over the count, as accurate as the sum of the whole list. The
+memory used doesn't depend on the number of values.
+
+Two accumulators of different parts of the input are merged exactly with
+the pairwise formulas of Chan et al., so the parts can be computed apart.
+"""
+
+import math
+
+
+class RunningStatistics:
+    """Count, mean, variance, minimum and maximum of a stream of numbers"""
+
+    def __init__(self, numbers=()):
+        self.count = 0
+        self.total = 0.0
+        self.compensation = 0.0
+        self.running_mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.add_all(numbers)
+
+    def __repr__(self):
+        return (f"RunningStatistics(count={self.count}, mean={self.mean}, "
+                f"m2={self.m2}, minimum={self.minimum}, "
+                f"maximum={self.maximum})")
+
+    def add(self, number):
+        """Adds a number to the statistics."""
+        self.count += 1
+        self._add_to_total(number)
+        delta = number - self.running_mean
+        self.running_mean += delta / self.count
+        self.m2 += delta * (number - self.running_mean)
+        self.minimum = min(self.minimum, number)
+        self.maximum = max(self.maximum, number)
+
+    def add_array(self, values):
+        """Adds a numpy array of numbers at once, returns the statistics.
+
+        The array is summed pairwise by numpy and merged as another part.
+        """
+        if len(values) == 0:
+            return self
+        part = RunningStatistics()
+        part.count = len(values)
+        part.total = float(values.sum())
+        part.running_mean = part.total / part.count
+        part.m2 = float(((values - part.running_mean) ** 2).sum())
+        part.minimum = float(values.min())
+        part.maximum = float(values.max())
+        return self.merge(part)
+
+    def _add_to_total(self, number):
+        """Adds a number to the sum, keeping its lost low-order bits."""
+        total = self.total + number
+        if abs(self.total) >= abs(number):
+            self.compensation += (self.total - total) + number
+        else:
+            self.compensation += (number - total) + self.total
+        self.total = total
+
+    def add_all(self, numbers):
+        """Adds every number of an iterable, returns the statistics."""
+        for number in numbers:
+            self.add(number)
+        return self
+
+    def merge(self, other):
+        """Adds the numbers of other statistics, returns the statistics."""
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.running_mean - self.running_mean
+        self.running_mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self._add_to_total(other.total)
+        self.compensation += other.compensation
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    @property
+    def mean(self):
+        """Mean of the numbers."""
+        return (self.total + self.compensation) / self.count if self.count else 0.0
+
+    @property
+    def population_variance(self):
+        """Variance of the numbers as a whole population."""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def sample_variance(self):
+        """Variance of the numbers as a sample, with Bessel's correction."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def population_standard_deviation(self):
+        """Standard deviation of the numbers as a whole population."""
+        return math.sqrt(self.population_variance)
+
+    @property
+    def sample_standard_deviation(self):
+        """Standard deviation of the numbers as a sample."""
+        return math.sqrt(self.sample_variance)
@@ -0,0 +1,111 @@
+"""Test cases for the chunked parser of number files"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import bulk_parser
+
+# Malformed lines by their line number, with the value their repair gives
+MALFORMED_LINES = {3: ("abc", None), 40: ("", None), 41: ("1,5", 1.5),
+                   97: ("1 2", None), 150: ("12x", None), 151: ("-7,25", -7.25)}
+LINE_COUNT = 300
+
+
+def repair(record):
+    """Repairs a decimal comma, or rejects the record."""
+    try:
+        return float(record.strip().replace(",", "."))
+    except ValueError:
+        return None
+
+
+class TestBulkParser(unittest.TestCase):
+    """Test cases for the chunks, fallbacks and repairs of the parser"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "numbers.txt")
+        numbers = np.random.default_rng(5).normal(0, 1e4, LINE_COUNT)
+        records = [repr(number) for number in numbers.tolist()]
+        for line_number, (record, _) in MALFORMED_LINES.items():
+            records[line_number - 1] = record
+        records[10] += "\r"
+        with open(self.file_path, "w", encoding="UTF-8", newline="") as file:
+            file.write("\n".join(records))
+        self.expected = np.array(
+            [value for line_number, record in enumerate(records, 1)
+             for value in ([MALFORMED_LINES[line_number][1]]
+                           if line_number in MALFORMED_LINES
+                           else [float(record)])
+             if value is not None])
+        self.expected_repairs = [
+            (line_number, record, value)
+            for line_number, (record, value) in MALFORMED_LINES.items()]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_file(self, chunk_size):
+        """Reads the file in chunks, returns the numbers and the repairs."""
+        arrays = []
+        repairs = []
+        line_count = 0
+        for first_line, values, chunk_repairs in bulk_parser.read_number_chunks(
+                self.file_path, repair, chunk_size):
+            self.assertEqual(first_line, line_count + 1)
+            arrays.append(values)
+            repairs.extend(chunk_repairs)
+            line_count = first_line - 1 + len(values) + sum(
+                value is None for _, _, value in chunk_repairs)
+        self.assertEqual(line_count, LINE_COUNT)
+        return np.concatenate(arrays), repairs
+
+    def test_repairs_keep_line_numbers(self):
+        """Test the numbers and the line numbers of the repaired lines"""
+        for chunk_size in (64, 1000, bulk_parser.CHUNK_SIZE):
+            with self.subTest(chunk_size=chunk_size):
+                values, repairs = self.read_file(chunk_size)
+                np.testing.assert_array_equal(values, self.expected)
+                self.assertEqual(repairs, self.expected_repairs)
+
+    def test_block_fallback(self):
+        """Test that failing blocks of lines are parsed one line at a time"""
+        with mock.patch.object(bulk_parser, "BLOCK_LINES", 4):
+            values, repairs = self.read_file(bulk_parser.CHUNK_SIZE)
+        np.testing.assert_array_equal(values, self.expected)
+        self.assertEqual(repairs, self.expected_repairs)
+
+    def test_without_orjson(self):
+        """Test that numpy.fromstring parses the same numbers as orjson"""
+        with mock.patch.object(bulk_parser, "orjson", None):
+            values, repairs = self.read_file(1000)
+        np.testing.assert_array_equal(values, self.expected)
+        self.assertEqual(repairs, self.expected_repairs)
+
+    def test_byte_ranges(self):
+        """Test that the chunks of byte ranges cut at a line end add up"""
+        with open(self.file_path, "rb") as file:
+            data = file.read()
+        middle = data.index(b"\n", len(data) // 2) + 1
+        chunks = [chunk for start, end in ((0, middle), (middle, len(data)))
+                  for chunk in bulk_parser.read_chunks(self.file_path, 100,
+                                                       start, end)]
+        self.assertTrue(all(chunk.endswith(b"\n") for chunk in chunks))
+        self.assertEqual(b"".join(chunks), data + b"\n")
+
+    def test_parse_clean_lines(self):
+        """Test that only lines of plain numbers are parsed at once"""
+        np.testing.assert_array_equal(
+            bulk_parser.parse_clean_lines(b"1\n-2.5e3\n4\n"), [1, -2500, 4])
+        for data in (b"1\n\n2\n", b"1 2\n", b"1\nx\n", b"\n"):
+            with self.subTest(data=data):
+                self.assertIsNone(bulk_parser.parse_clean_lines(data))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""Test cases for the descriptive statistics of the number files"""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import compute_statistics
+
+# Malformed lines by their line number, the repaired ones have a value
+MALFORMED_LINES = {2: "abc", 75: "1,5", 76: "", 230: "7;25", 399: "12x"}
+LINE_COUNT = 400
+
+
+class TestComputeStatistics(unittest.TestCase):
+    """Test cases for the mean, variance and standard deviation"""
+
+    def setUp(self):
+        self.numbers = np.random.default_rng(13).normal(1e6, 25, 5000).tolist()
+
+    def test_variance(self):
+        """Test the sample variance with and without a given mean"""
+        expected = np.var(self.numbers, ddof=1)
+        mean = compute_statistics.compute_mean(self.numbers)
+        self.assertAlmostEqual(compute_statistics.compute_variance(self.numbers),
+                               expected, delta=expected * 1e-9)
+        self.assertAlmostEqual(compute_statistics.compute_variance(self.numbers, mean),
+                               expected, delta=expected * 1e-9)
+        self.assertEqual(compute_statistics.compute_variance([4.0], 4.0), 0.0)
+
+    def test_standard_deviation(self):
+        """Test the population standard deviation with and without a mean"""
+        expected = np.std(self.numbers)
+        mean = compute_statistics.compute_mean(self.numbers)
+        self.assertAlmostEqual(compute_statistics.compute_standard_deviation(self.numbers),
+                               expected, delta=expected * 1e-9)
+        self.assertAlmostEqual(
+            compute_statistics.compute_standard_deviation(self.numbers, mean=mean),
+            expected, delta=expected * 1e-9)
+
+
+class TestParallelStatistics(unittest.TestCase):
+    """Test cases for the shards read by the worker processes"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "numbers.txt")
+        records = [repr(number) for number in
+                   np.random.default_rng(7).normal(0, 1e4, LINE_COUNT).tolist()]
+        for line_number, record in MALFORMED_LINES.items():
+            records[line_number - 1] = record
+        self.data = ("\n".join(records) + "\n").encode()
+        with open(self.file_path, "wb") as file:
+            file.write(self.data)
+        self.line_starts = [0] + [i + 1 for i, byte in enumerate(self.data)
+                                  if byte == ord("\n")]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_shards(self, shards):
+        """Merges the statistics of some shards, returns them and the repairs.
+
+        The repairs are the reported lines of the invalid values.
+        """
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), \
+                mock.patch.object(compute_statistics, "MAX_REPORTED_REPAIRS", LINE_COUNT):
+            summary, numbers = compute_statistics.merge_shard_statistics(
+                compute_statistics.compute_shard_statistics(
+                    (self.file_path, start, end, None))
+                for start, end in shards)
+        return summary, numbers, [line for line in output.getvalue().splitlines()
+                                  if line.startswith("  line ")]
+
+    def test_split_file_in_shards(self):
+        """Test that the shards start at a line and cover the file"""
+        for shard_size in (self.line_starts[100], self.line_starts[100] + 3,
+                           1, len(self.data) - 1, len(self.data)):
+            with self.subTest(shard_size=shard_size):
+                shards = compute_statistics.split_file_in_shards(self.file_path,
+                                                                 shard_size)
+                self.assertEqual(shards[0][0], 0)
+                self.assertEqual(shards[-1][1], len(self.data))
+                for (_, end), (start, _) in zip(shards, shards[1:]):
+                    self.assertEqual(end, start)
+                    self.assertIn(start, self.line_starts)
+
+    def test_merged_shards(self):
+        """Test that the merged shards give the statistics of the whole file"""
+        summary, numbers, repairs = self.read_shards([(0, None)])
+        self.assertEqual(summary.count, LINE_COUNT - 2)
+        self.assertEqual(repairs, ["  line 2: 'abc' can't be converted",
+                                   "  line 75: '1,5' was converted to 1.5",
+                                   "  line 76: '' can't be converted",
+                                   "  line 230: '7;25' was converted to 7.25",
+                                   "  line 399: '12x' was converted to 12.0"])
+        for shard_size in (self.line_starts[100], self.line_starts[100] + 3,
+                           self.line_starts[229], self.line_starts[229] + 1, 50):
+            with self.subTest(shard_size=shard_size):
+                shard_summary, shard_numbers, shard_repairs = self.read_shards(
+                    compute_statistics.split_file_in_shards(self.file_path,
+                                                            shard_size))
+                np.testing.assert_array_equal(shard_numbers, numbers)
+                self.assertEqual(shard_summary.count, summary.count)
+                self.assertAlmostEqual(shard_summary.mean, summary.mean, delta=1e-9)
+                self.assertAlmostEqual(shard_summary.sample_variance,
+                                       summary.sample_variance, delta=1e-3)
+                self.assertEqual(shard_repairs, repairs)
+
+    def test_workers(self):
+        """Test that --workers=N gives the statistics of a single process"""
+        with mock.patch.object(compute_statistics, "FILE_SOURCE_DIR", self.temp_dir), \
+                contextlib.redirect_stdout(io.StringIO()) as output:
+            summary, numbers = compute_statistics.collect_statistics("numbers.txt")
+            for shard_size in (self.line_starts[100], self.line_starts[100] + 3):
+                with self.subTest(shard_size=shard_size), \
+                        mock.patch.object(compute_statistics, "MIN_SHARD_SIZE",
+                                          shard_size):
+                    worker_summary, worker_numbers = \
+                        compute_statistics.collect_statistics("numbers.txt", workers=2)
+                    np.testing.assert_array_equal(worker_numbers, numbers)
+                    self.assertEqual(worker_summary.count, summary.count)
+                    self.assertAlmostEqual(worker_summary.mean, summary.mean,
+                                           delta=1e-9)
+        self.assertIn("shards with 2 workers", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
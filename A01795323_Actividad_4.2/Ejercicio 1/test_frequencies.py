@@ -0,0 +1,127 @@
+"""Test cases for the exact modes and the Space-Saving frequency sketch"""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import frequencies
+
+
+def get_true_counts(numbers):
+    """Gets the exact count of every value with numpy.unique."""
+    values, counts = np.unique(numbers, return_counts=True)
+    return dict(zip(values.tolist(), counts.tolist()))
+
+
+class TestCountValues(unittest.TestCase):
+    """Test cases for the exact counts and modes"""
+
+    def setUp(self):
+        self.numbers = np.random.default_rng(3).integers(
+            0, 50, 2000).astype(float).tolist()
+
+    def test_matches_numpy(self):
+        """Test the counts, in the order the values first appear"""
+        counts = frequencies.count_values(self.numbers)
+        self.assertEqual(dict(counts), get_true_counts(self.numbers))
+        self.assertEqual([value for value, _ in counts],
+                         list(dict.fromkeys(self.numbers)))
+
+    def test_without_numpy(self):
+        """Test that a Counter gives the same counts without numpy"""
+        expected = frequencies.count_values(self.numbers)
+        with mock.patch.object(frequencies, "np", None):
+            self.assertEqual(frequencies.count_values(self.numbers), expected)
+
+    def test_modes(self):
+        """Test that every value tied for the highest count is a mode"""
+        self.assertEqual(frequencies.compute_modes([3, 1, 1, 2, 3, 2.5]),
+                         ([3, 1], 2))
+        self.assertEqual(frequencies.compute_modes([]), ([], 0))
+        true_counts = get_true_counts(self.numbers)
+        top_values = frequencies.compute_top_values(self.numbers, 3)
+        self.assertEqual([count for _, count in top_values],
+                         sorted(true_counts.values(), reverse=True)[:3])
+        for value, count in top_values:
+            self.assertEqual(true_counts[value], count)
+
+
+class TestFrequencySketch(unittest.TestCase):
+    """Test cases for the Space-Saving sketch of the frequent values"""
+
+    def setUp(self):
+        zipf = np.random.default_rng(7).zipf(1.3, 50_000)
+        self.numbers = np.minimum(zipf, 10 ** 6).astype(float)
+        self.true_counts = get_true_counts(self.numbers)
+        self.size = 100
+
+    def check_guarantees(self, sketch):
+        """Checks the counts and errors of a sketch against the real ones."""
+        self.assertEqual(sketch.count, len(self.numbers))
+        self.assertLessEqual(len(sketch.counters), sketch.size)
+        for value, (count, error) in sketch.counters.items():
+            with self.subTest(value=value):
+                self.assertGreaterEqual(count, self.true_counts[value])
+                self.assertLessEqual(count - error, self.true_counts[value])
+        for value, true_count in self.true_counts.items():
+            if true_count > sketch.count / sketch.size:
+                self.assertIn(value, sketch.counters)
+
+    def test_over_count_guarantee(self):
+        """Test that counts are never below nor more than error above"""
+        sketch = frequencies.FrequencySketch(self.numbers.tolist(), self.size)
+        self.check_guarantees(sketch)
+        top_values = sorted(self.true_counts.items(),
+                            key=lambda item: -item[1])[:3]
+        self.assertEqual([(value, count) for value, count, _
+                          in sketch.get_top_values(3)], top_values)
+        self.assertEqual(sketch.get_modes()[:2], ([top_values[0][0]],
+                                                  top_values[0][1]))
+
+    def test_merge(self):
+        """Test that merged sketches of the parts keep the guarantees"""
+        parts = [frequencies.FrequencySketch(part.tolist(), self.size)
+                 for part in np.array_split(self.numbers, 5)]
+        sketch = parts[0]
+        for part in parts[1:]:
+            self.assertIs(sketch.merge(part), sketch)
+        self.check_guarantees(sketch)
+        sketch.add_all(self.numbers[:10].tolist())
+        self.assertEqual(sketch.count, len(self.numbers) + 10)
+
+    def test_add_array(self):
+        """Test that arrays counted at once keep the guarantees"""
+        for chunk_size in (1, 1000, len(self.numbers)):
+            with self.subTest(chunk_size=chunk_size):
+                sketch = frequencies.FrequencySketch(size=self.size)
+                for start in range(0, len(self.numbers), chunk_size):
+                    self.assertIs(sketch.add_array(
+                        self.numbers[start:start + chunk_size]), sketch)
+                self.check_guarantees(sketch)
+                self.assertEqual(sketch.get_modes()[0], [1.0])
+        numbers = self.numbers[:1000]
+        sketch = frequencies.FrequencySketch(size=len(numbers)).add_array(numbers)
+        self.assertEqual({value: count for value, (count, _)
+                          in sketch.counters.items()},
+                         get_true_counts(numbers))
+
+    def test_exact_when_not_full(self):
+        """Test that a sketch with room for every value counts exactly"""
+        numbers = self.numbers[:1000].tolist()
+        sketch = frequencies.FrequencySketch(numbers, size=len(numbers))
+        self.assertEqual({value: count for value, (count, _)
+                          in sketch.counters.items()},
+                         get_true_counts(numbers))
+        self.assertEqual(sketch.get_modes()[2], 0)
+
+    def test_invalid_sketch(self):
+        """Test that a sketch without counters is an error"""
+        with self.assertRaises(ValueError):
+            frequencies.FrequencySketch(size=0)
+        self.assertEqual(frequencies.FrequencySketch().get_modes(),
+                         ([], 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
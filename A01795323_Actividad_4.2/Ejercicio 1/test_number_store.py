@@ -0,0 +1,144 @@
+"""Test cases for the binary number stores converted from the number files"""
+
+import collections
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import compute_statistics
+import frequencies
+import quantiles
+
+number_store = compute_statistics.get_number_store()
+
+# Rejected lines by their line number, the repaired ones have a value
+REJECTED_LINES = {1: "abc", 4: "1,5", 5: "", 9: "7;25", 12: "12x"}
+LINE_COUNT = 12
+
+
+class TestNumberStore(unittest.TestCase):
+    """Test cases for the conversion and the loading of the number stores"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.text_path = os.path.join(self.temp_dir, "numbers.txt")
+        self.store_path = os.path.join(self.temp_dir, "numbers.nums")
+        self.numbers = [float(number) for number in
+                        np.random.default_rng(5).integers(-1000, 1000, LINE_COUNT)]
+        records = [str(int(number)) for number in self.numbers]
+        for line_number, record in REJECTED_LINES.items():
+            records[line_number - 1] = record
+        with open(self.text_path, "w", encoding="UTF-8") as file:
+            file.write("\n".join(records) + "\n")
+        self.valid_numbers = [number for line_number, number in enumerate(self.numbers, 1)
+                              if line_number not in REJECTED_LINES]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def convert(self, number_type):
+        """Converts the text file to the store, checks the returned counts."""
+        self.assertEqual(number_store.convert_text_file(self.text_path, self.store_path,
+                                                        number_type),
+                         (len(self.valid_numbers), len(REJECTED_LINES)))
+
+    def get_repaired_numbers(self):
+        """Gets the numbers of the text file with the rejected lines repaired."""
+        numbers = [number if line_number not in REJECTED_LINES
+                   else compute_statistics.repair_float_value(REJECTED_LINES[line_number])
+                   for line_number, number in enumerate(self.numbers, 1)]
+        return [number for number in numbers if number is not None]
+
+    def test_round_trip(self):
+        """Test loading the converted numbers, with and without numpy"""
+        for number_type, type_code in (("float64", "<f8"), ("int64", "<i8")):
+            self.convert(number_type)
+            self.assertTrue(number_store.is_number_store(self.store_path))
+            self.assertFalse(number_store.is_number_store(self.text_path))
+            self.assertEqual(number_store.read_header(self.store_path),
+                             (type_code, len(self.valid_numbers), len(REJECTED_LINES)))
+            for numpy_module in (np, None):
+                with self.subTest(number_type=number_type, numpy=numpy_module is not None), \
+                        mock.patch.object(number_store, "np", numpy_module):
+                    numbers = number_store.load_numbers(self.store_path)
+                    self.assertEqual(list(numbers), self.valid_numbers)
+                    if numpy_module is None:
+                        self.assertEqual(numbers.format, "q" if number_type == "int64"
+                                         else "d")
+                    del numbers
+
+    def test_empty_store(self):
+        """Test a store without numbers, with and without numpy"""
+        with open(self.text_path, "w", encoding="UTF-8") as file:
+            file.write("abc\n")
+        self.assertEqual(number_store.convert_text_file(self.text_path, self.store_path),
+                         (0, 1))
+        for numpy_module in (np, None):
+            with self.subTest(numpy=numpy_module is not None), \
+                    mock.patch.object(number_store, "np", numpy_module):
+                self.assertEqual(len(number_store.load_numbers(self.store_path)), 0)
+
+    def test_read_rejected_lines(self):
+        """Test the rejected lines of a store, and of a store without them"""
+        self.convert("float64")
+        self.assertEqual(number_store.read_rejected_lines(self.store_path),
+                         list(REJECTED_LINES.items()))
+        os.remove(number_store.get_rejected_path(self.store_path))
+        self.assertEqual(number_store.read_rejected_lines(self.store_path), [])
+
+    def test_repaired_lines(self):
+        """Test that the repaired values are inserted at their lines"""
+        expected = self.get_repaired_numbers()
+        for number_type in ("float64", "int64"):
+            self.convert(number_type)
+            for numpy_module in (np, None):
+                with self.subTest(number_type=number_type, numpy=numpy_module is not None), \
+                        mock.patch.object(number_store, "np", numpy_module), \
+                        mock.patch.object(compute_statistics, "np", numpy_module):
+                    numbers, repairs = compute_statistics.repair_store_numbers(
+                        number_store.load_numbers(self.store_path),
+                        number_store.read_rejected_lines(self.store_path))
+                    self.assertEqual(list(numbers), expected)
+                    self.assertEqual([line_number for line_number, _, _ in repairs],
+                                     list(REJECTED_LINES))
+                    del numbers
+
+    def test_store_statistics(self):
+        """Test the statistics of a store with and without the sketches"""
+        self.convert("float64")
+        expected = self.get_repaired_numbers()
+        counts = collections.Counter(expected)
+        max_count = max(counts.values())
+        for numpy_module in (np, None):
+            sketches = (quantiles.QuantileSketch(), frequencies.FrequencySketch())
+            with self.subTest(numpy=numpy_module is not None), \
+                    contextlib.redirect_stdout(io.StringIO()), \
+                    mock.patch.object(compute_statistics, "FILE_SOURCE_DIR", self.temp_dir), \
+                    mock.patch.object(number_store, "np", numpy_module), \
+                    mock.patch.object(compute_statistics, "np", numpy_module):
+                summary, numbers = compute_statistics.collect_store_statistics(
+                    number_store, "numbers.nums")
+                self.assertEqual(list(numbers), expected)
+                self.assertEqual(summary.count, len(expected))
+                self.assertAlmostEqual(summary.mean, np.mean(expected))
+                summary, numbers = compute_statistics.collect_store_statistics(
+                    number_store, "numbers.nums", *sketches)
+                self.assertIsNone(numbers)
+                self.assertEqual(summary.count, len(expected))
+                self.assertEqual(sketches[0].get_quantiles([0.0, 1.0]),
+                                 [min(expected), max(expected)])
+                modes, count, _ = sketches[1].get_modes()
+                self.assertEqual((sorted(modes), count),
+                                 (sorted(value for value, value_count in counts.items()
+                                         if value_count == max_count), max_count))
+                del numbers
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""Test cases for the exact quantiles and the KLL quantile sketch"""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import quantiles
+
+QUANTILES = np.linspace(0.01, 0.99, 99).tolist()
+# Rank error of a KLL sketch of size k, as a fraction of the count
+RANK_ERROR = 1.7 / quantiles.DEFAULT_SKETCH_SIZE
+
+
+class TestComputeQuantiles(unittest.TestCase):
+    """Test cases for the exact quantiles"""
+
+    def setUp(self):
+        self.numbers = np.random.default_rng(11).normal(50, 20, 1001).tolist()
+
+    def test_matches_numpy(self):
+        """Test that the quantiles are the linear ones of numpy"""
+        for numbers in (self.numbers, self.numbers[:-1], self.numbers[:1]):
+            with self.subTest(count=len(numbers)):
+                np.testing.assert_allclose(
+                    quantiles.compute_quantiles(numbers, [0, *QUANTILES, 1]),
+                    np.quantile(numbers, [0, *QUANTILES, 1]), rtol=1e-12)
+
+    def test_without_numpy(self):
+        """Test that sorting without numpy gives the same quantiles"""
+        expected = quantiles.compute_quantiles(self.numbers, QUANTILES)
+        with mock.patch.object(quantiles, "np", None):
+            self.assertEqual(quantiles.compute_quantiles(self.numbers,
+                                                         QUANTILES), expected)
+
+    def test_invalid_input(self):
+        """Test that an empty list or a quantile out of range is an error"""
+        with self.assertRaises(ValueError):
+            quantiles.compute_quantiles([], [0.5])
+        with self.assertRaises(ValueError):
+            quantiles.compute_quantiles(self.numbers, [1.5])
+
+
+class TestQuantileSketch(unittest.TestCase):
+    """Test cases for the KLL sketch of the quantiles"""
+
+    def setUp(self):
+        self.numbers = np.random.default_rng(42).normal(size=100_000)
+        self.sorted_numbers = np.sort(self.numbers)
+
+    def get_rank_error(self, sketch):
+        """Gets the largest distance of the estimated and real ranks."""
+        estimates = sketch.get_quantiles(QUANTILES)
+        count = len(self.sorted_numbers)
+        lower_ranks = np.searchsorted(self.sorted_numbers, estimates,
+                                      "left") / count
+        upper_ranks = np.searchsorted(self.sorted_numbers, estimates,
+                                      "right") / count
+        return max(max(lower - quantile, quantile - upper, 0)
+                   for quantile, lower, upper
+                   in zip(QUANTILES, lower_ranks, upper_ranks))
+
+    def test_rank_error_bound(self):
+        """Test that the estimates are within the rank error of the sketch"""
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                sketch = quantiles.QuantileSketch(self.numbers.tolist(),
+                                                  seed=seed)
+                self.assertEqual(sketch.count, len(self.numbers))
+                self.assertLessEqual(len(sketch), 3 * sketch.size)
+                self.assertLessEqual(self.get_rank_error(sketch), RANK_ERROR)
+
+    def test_merge(self):
+        """Test that merged sketches of the parts keep the rank error"""
+        parts = [quantiles.QuantileSketch(part.tolist(), seed=seed)
+                 for seed, part in enumerate(np.array_split(self.numbers, 7))]
+        sketch = parts[0]
+        for part in parts[1:]:
+            self.assertIs(sketch.merge(part), sketch)
+        self.assertEqual(sketch.count, len(self.numbers))
+        self.assertEqual(sum(weight for _, weight
+                             in sketch.get_weighted_values()), sketch.count)
+        self.assertLessEqual(len(sketch), 3 * sketch.size)
+        self.assertLessEqual(self.get_rank_error(sketch), RANK_ERROR)
+
+    def test_add_array(self):
+        """Test that arrays added at once keep the rank error"""
+        for chunk_size in (1, 150, 10_000, len(self.numbers)):
+            with self.subTest(chunk_size=chunk_size):
+                sketch = quantiles.QuantileSketch(self.numbers[:7].tolist(), seed=3)
+                for start in range(7, len(self.numbers), chunk_size):
+                    self.assertIs(sketch.add_array(
+                        self.numbers[start:start + chunk_size]), sketch)
+                self.assertEqual(sketch.count, len(self.numbers))
+                self.assertEqual(sum(weight for _, weight
+                                     in sketch.get_weighted_values()), sketch.count)
+                self.assertEqual(len(sketch), sum(map(len, sketch.compactors)))
+                self.assertLessEqual(len(sketch), 3 * sketch.size)
+                self.assertLessEqual(self.get_rank_error(sketch), RANK_ERROR)
+        small = self.numbers[:quantiles.DEFAULT_SKETCH_SIZE - 1]
+        np.testing.assert_allclose(
+            quantiles.QuantileSketch().add_array(small).get_quantiles(QUANTILES),
+            np.quantile(small, QUANTILES), rtol=1e-12)
+
+    def test_small_input_is_exact(self):
+        """Test that a sketch that never compacted gives exact quantiles"""
+        numbers = self.numbers[:quantiles.DEFAULT_SKETCH_SIZE - 1].tolist()
+        np.testing.assert_allclose(
+            quantiles.QuantileSketch(numbers).get_quantiles(QUANTILES),
+            np.quantile(numbers, QUANTILES), rtol=1e-12)
+
+    def test_invalid_sketch(self):
+        """Test that a tiny or empty sketch is an error"""
+        with self.assertRaises(ValueError):
+            quantiles.QuantileSketch(size=1)
+        with self.assertRaises(ValueError):
+            quantiles.QuantileSketch().get_quantiles([0.5])
+
+
+if __name__ == "__main__":
+    unittest.main()
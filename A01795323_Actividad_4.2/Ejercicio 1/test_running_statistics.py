@@ -0,0 +1,90 @@
+"""Test cases for the count, mean and variance computed in one pass"""
+
+import math
+import unittest
+
+import numpy as np
+
+import running_statistics
+
+
+class TestRunningStatistics(unittest.TestCase):
+    """Test cases for the running statistics and their merge"""
+
+    def setUp(self):
+        # A large offset loses the variance to cancellation with the sums
+        self.numbers = np.random.default_rng(17).normal(1e6, 3, 10001).tolist()
+
+    def assert_statistics_equal(self, summary, expected):
+        """Asserts that two statistics of the same numbers are equal."""
+        self.assertEqual(summary.count, expected.count)
+        self.assertEqual((summary.minimum, summary.maximum),
+                         (expected.minimum, expected.maximum))
+        self.assertAlmostEqual(summary.mean, expected.mean, delta=1e-6)
+        self.assertAlmostEqual(summary.sample_variance, expected.sample_variance,
+                               delta=expected.sample_variance * 1e-9)
+
+    def test_matches_numpy(self):
+        """Test the statistics of a single pass against numpy"""
+        summary = running_statistics.RunningStatistics(self.numbers)
+        self.assertEqual(summary.count, len(self.numbers))
+        self.assertEqual((summary.minimum, summary.maximum),
+                         (min(self.numbers), max(self.numbers)))
+        self.assertEqual(summary.mean, math.fsum(self.numbers) / len(self.numbers))
+        for variance, ddof in ((summary.population_variance, 0),
+                               (summary.sample_variance, 1)):
+            expected = np.var(self.numbers, ddof=ddof)
+            self.assertAlmostEqual(variance, expected, delta=expected * 1e-9)
+        self.assertAlmostEqual(summary.population_standard_deviation,
+                               np.std(self.numbers), delta=1e-9)
+        self.assertAlmostEqual(summary.sample_standard_deviation,
+                               np.std(self.numbers, ddof=1), delta=1e-9)
+
+    def test_merge(self):
+        """Test that merging the statistics of parts gives the whole ones"""
+        expected = running_statistics.RunningStatistics(self.numbers)
+        for cuts in ((1,), (5000,), (10000,), (3, 7, 2500, 9999)):
+            with self.subTest(cuts=cuts):
+                bounds = (0, *cuts, len(self.numbers))
+                summary = running_statistics.RunningStatistics()
+                for start, end in zip(bounds, bounds[1:]):
+                    summary.merge(running_statistics.RunningStatistics(
+                        self.numbers[start:end]))
+                self.assert_statistics_equal(summary, expected)
+        summary = running_statistics.RunningStatistics(self.numbers)
+        summary.merge(running_statistics.RunningStatistics())
+        self.assert_statistics_equal(summary, expected)
+
+    def test_add_array(self):
+        """Test that arrays of numbers are added as the single numbers"""
+        expected = running_statistics.RunningStatistics(self.numbers)
+        summary = running_statistics.RunningStatistics(self.numbers[:10])
+        array = np.array(self.numbers)
+        for start in range(10, len(array), 4096):
+            summary.add_array(array[start:start + 4096])
+        summary.add_array(array[:0])
+        self.assert_statistics_equal(summary, expected)
+
+    def test_sample_and_population(self):
+        """Test the sample and population variance of small inputs"""
+        summary = running_statistics.RunningStatistics([2, 4, 4, 4, 5, 5, 7, 9])
+        self.assertEqual(summary.mean, 5.0)
+        self.assertEqual(summary.population_variance, 4.0)
+        self.assertEqual(summary.population_standard_deviation, 2.0)
+        self.assertAlmostEqual(summary.sample_variance, 32 / 7)
+        summary = running_statistics.RunningStatistics([3.5])
+        self.assertEqual((summary.mean, summary.population_variance,
+                          summary.sample_variance), (3.5, 0.0, 0.0))
+        summary = running_statistics.RunningStatistics()
+        self.assertEqual((summary.count, summary.mean, summary.population_variance,
+                          summary.sample_variance), (0, 0.0, 0.0, 0.0))
+
+    def test_compensated_mean(self):
+        """Test that the mean keeps the digits lost by a plain sum"""
+        numbers = [0.1] * 10
+        self.assertNotEqual(sum(numbers) / 10, 0.1)
+        self.assertEqual(running_statistics.RunningStatistics(numbers).mean, 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
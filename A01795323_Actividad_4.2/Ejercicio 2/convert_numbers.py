@@ -1,18 +1,47 @@
 """Module get a list of number from a file and convert them to binary and hexadecimal base"""
 
+import os
+import runpy
 import sys
 import time
-import os
+import types
 
 FILE_SOURCE_DIR = "p2"
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_FILE_PATH = os.path.join(BASE_DIR, "output", "ConversionResults.txt")
+NUMBER_STORE_PATH = os.path.join(BASE_DIR, os.pardir, "number_store.py")
+
+
+def get_number_store():
+    """Gets the functions of the binary number stores, or None.
+
+    runpy runs the module from its file, so sys.path is left as it is.
+    """
+    if not os.path.isfile(NUMBER_STORE_PATH):
+        return None
+    return types.SimpleNamespace(**runpy.run_path(NUMBER_STORE_PATH))
+
+
+def get_numbers_from_store(number_store, file_name):
+    """Maps the int64 numbers of a number store in memory, without a copy."""
+    file_path = os.path.join(FILE_SOURCE_DIR, file_name)
+    if number_store.read_header(file_path)[0] != "<i8":
+        print(f"{file_name} is not a number store of int64 numbers")
+        sys.exit(1)
+    print(f"Collecting numbers from number store {file_name}")
+    for _, record in number_store.read_rejected_lines(file_path):
+        print(f"\nInvalid value: {record}, skipping...")
+    print("\nCollecting numbers from number store process has finished")
+    return number_store.load_numbers(file_path)
 
 
 def get_numbers_from_file(file_name):
     """Opens a given file name to process the data and extract numeric values."""
     numbers = []
     file_path = os.path.join(FILE_SOURCE_DIR, file_name)
+    number_store = get_number_store()
+    if number_store is not None and number_store.is_number_store(file_path):
+        return get_numbers_from_store(number_store, file_name)
     try:
         with open(file_path, "r", encoding="utf-8") as file:
             print(f"Collecting numbers from file {file_name}")
@@ -55,7 +84,7 @@ def decimal_to_hexadecimal(number):
 def get_file_name_from_params():
     """Retrieves the file name from command-line arguments."""
     if len(sys.argv) != 2:
-        print("Usage: python convert_numbers.py fileWithData.txt")
+        print("Usage: python convert_numbers.py fileWithData.txt|numberStore.nums")
         sys.exit(1)
     return sys.argv[1]
 
@@ -71,12 +100,12 @@ def main():
     start_time = time.time()
     file_name = get_file_name_from_params()
     numbers = get_numbers_from_file(file_name)
-    if not numbers:
+    if len(numbers) == 0:
         print("Error: No valid numbers found in the file.")
         sys.exit(1)
     print("\nStarting number conversions\n")
     results = ":: Conversion Results ::\n\n"
-    for number in numbers:
+    for number in map(int, numbers):
         binary = decimal_to_binary(number)
         hexadecimal = decimal_to_hexadecimal(number)
         results += f"Decimal: {number} | Binary: {binary} | Hexadecimal: {hexadecimal}\n"
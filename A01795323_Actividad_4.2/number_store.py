@@ -0,0 +1,159 @@
+"""Module that converts number files to a binary store read with mmap.
+
+A store keeps the numbers of a text file, one per line, as a raw array of
+float64 or int64 after a small header, so a tool maps the file in memory
+and reads the numbers without parsing them again. The pages of a store
+are shared through the OS cache by every process that maps it. The lines
+that aren't numbers are kept with their line number in a sidecar file,
+named after the store with a ".rejected" extension, so each tool can
+still repair or report them in its own way.
+
+The header holds a magic string, the numpy type of the numbers, their
+count and the count of rejected lines, and the numbers start at a
+64-byte aligned offset.
+
+Usage: python number_store.py numbers.txt numbers.nums [--type=int64]
+"""
+
+import array
+import mmap
+import os
+import struct
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b"NUMSTORE"
+HEADER = struct.Struct("<8s8sQQ")
+DATA_OFFSET = 64
+REJECTED_EXTENSION = ".rejected"
+NUMBER_TYPES = {"float64": ("<f8", "d", float), "int64": ("<i8", "q", int)}
+ARRAY_CODES = {type_code: array_code for type_code, array_code, _ in NUMBER_TYPES.values()}
+BATCH_SIZE = 65536
+
+
+def get_rejected_path(store_path):
+    """Gets the path of the sidecar file with the rejected lines of a store."""
+    return store_path + REJECTED_EXTENSION
+
+
+def is_number_store(file_path):
+    """Checks if a file is a number store."""
+    try:
+        with open(file_path, 'rb') as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def read_header(file_path):
+    """Reads the numpy type, the count and the rejected count of a store."""
+    with open(file_path, 'rb') as file:
+        magic, type_code, count, rejected_count = HEADER.unpack(
+            file.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{file_path} is not a number store")
+    return type_code.rstrip(b"\0").decode("ascii"), count, rejected_count
+
+
+def load_numbers(file_path):
+    """Maps the numbers of a store in memory as a read-only array.
+
+    Nothing is copied, the pages of the file are read when accessed. The
+    array is a numpy memmap, or a typed memoryview without numpy.
+    """
+    type_code, count, _ = read_header(file_path)
+    if np is not None:
+        if count == 0:
+            return np.empty(0, dtype=type_code)
+        return np.memmap(file_path, dtype=type_code, mode="r",
+                         offset=DATA_OFFSET, shape=(count,))
+    array_code = ARRAY_CODES[type_code]
+    if count == 0:
+        return array.array(array_code)
+    with open(file_path, 'rb') as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    size = count * array.array(array_code).itemsize
+    return memoryview(mapping)[DATA_OFFSET:DATA_OFFSET + size].cast(array_code)
+
+
+def read_rejected_lines(file_path):
+    """Reads the (line number, record) of the lines rejected by a store."""
+    try:
+        with open(get_rejected_path(file_path), 'r', encoding="UTF-8") as file:
+            return [(int(line_number), record.rstrip("\n"))
+                    for line_number, record
+                    in (line.split("\t", 1) for line in file)]
+    except FileNotFoundError:
+        return []
+
+
+def convert_text_file(text_path, store_path, number_type="float64"):
+    """Converts a text file with a number per line to a store.
+
+    Lines that float() or int() can't convert are written to the sidecar
+    file. Returns the count of numbers and of rejected lines.
+    """
+    type_code, array_code, convert = NUMBER_TYPES[number_type]
+    count = 0
+    rejected_count = 0
+    with open(text_path, 'r', encoding="UTF-8") as text_file, \
+            open(store_path, 'wb') as store_file, \
+            open(get_rejected_path(store_path), 'w', encoding="UTF-8") as rejected_file:
+        store_file.write(bytes(DATA_OFFSET))
+        batch = array.array(array_code)
+        for line_number, record in enumerate(text_file, 1):
+            try:
+                batch.append(convert(record.strip()))
+            except (ValueError, OverflowError):
+                rejected_file.write(f"{line_number}\t{record.rstrip(chr(10))}\n")
+                rejected_count += 1
+            if len(batch) == BATCH_SIZE:
+                count += write_batch(store_file, batch)
+                batch = array.array(array_code)
+        count += write_batch(store_file, batch)
+        store_file.seek(0)
+        store_file.write(HEADER.pack(MAGIC, type_code.encode("ascii"), count,
+                                     rejected_count))
+    return count, rejected_count
+
+
+def write_batch(store_file, batch):
+    """Writes a batch of numbers in little endian, returns their count."""
+    if sys.byteorder != "little":
+        batch.byteswap()
+    batch.tofile(store_file)
+    return len(batch)
+
+
+def main():
+    """Main function to convert a text file to a number store."""
+    start_time = time.time()
+    file_paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    number_type = "float64"
+    for arg in sys.argv[1:]:
+        if arg.startswith("--type="):
+            number_type = arg[len("--type="):]
+    if len(file_paths) != 2 or number_type not in NUMBER_TYPES:
+        print("Usage: python number_store.py numbers.txt numbers.nums"
+              f" [--type={'|'.join(NUMBER_TYPES)}]")
+        sys.exit(1)
+
+    text_path, store_path = file_paths
+    if not os.path.isfile(text_path):
+        print(f"File {text_path} not found")
+        sys.exit(1)
+    count, rejected_count = convert_text_file(text_path, store_path, number_type)
+    elapsed_time = time.time() - start_time
+    print(f"{count} numbers of type {number_type} written to {store_path}, "
+          f"{rejected_count} rejected lines written to "
+          f"{get_rejected_path(store_path)}\n"
+          f"\nElapsed Time: {elapsed_time:.8f} seconds")
+
+
+if __name__ == '__main__':
+    main()